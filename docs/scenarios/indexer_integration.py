@@ -11,13 +11,27 @@ from scripts.helpers.addressable import get_address
 from scripts.helpers.contracts.fast_withdrawal import FastWithdrawal
 from scripts.etherlink import xtz_fast_withdraw
 from scripts.networks import load_network
-from pytezos import MichelsonType  # type: ignore
-from scripts.helpers.contracts.fast_withdrawal import Withdrawal
+from scripts.helpers.contracts.fast_withdrawal import (
+    Withdrawal,
+    create_withdrawal_from_l2_transaction,
+    decode_michelson_nat,
+    timestamp_to_int,
+)
 from scripts.helpers.formatting import accent, error, wrap
-from scripts.helpers.ticket_content import TicketContent
 from scripts.helpers.timer import Timer
 from scripts.tezos.execute_outbox_message import execute_outbox_message
-from datetime import datetime
+
+# The withdrawal helpers live in scripts.helpers.contracts.fast_withdrawal and
+# are re-exported for the notebooks importing them from here:
+__all__ = [
+    'IndexerTestEnvironment',
+    'create_withdrawal_from_l2_transaction',
+    'decode_michelson_nat',
+    'fast_withdrawal_bridge_operation_query',
+    'random_pkh',
+    'request_bridge_operation_with_high_verbosity',
+    'timestamp_to_int',
+]
 
 _config = load_network()
 
@@ -26,35 +40,6 @@ def random_pkh(client: PyTezosClient) -> str:
     return client.key.generate(export=False).public_key_hash()  # type: ignore
 
 
-def decode_michelson_nat(byte_value: bytes) -> int:
-    nat_type = MichelsonType.match({'prim': 'nat'})
-    decoded_pytezos_value = nat_type.unpack(byte_value)
-    return int(decoded_pytezos_value)  # type: ignore
-
-
-def timestamp_to_int(timestamp: str) -> int:
-    dt_object = datetime.fromisoformat(timestamp)
-    unix_timestamp_float = dt_object.timestamp()
-    assert dt_object.microsecond == 0
-    return int(unix_timestamp_float)
-
-
-def create_withdrawal_from_l2_transaction(l2_transaction: dict) -> Withdrawal:
-    return Withdrawal(
-        withdrawal_id=l2_transaction['kernel_withdrawal_id'],
-        full_amount=int(l2_transaction['amount']) // 10**12,
-        ticketer=l2_transaction['ticket']['ticketer_address'],
-        content=TicketContent(
-            token_id=int(l2_transaction['ticket']['ticket_id']),
-            token_info=l2_transaction['ticket']['metadata'],
-        ),
-        timestamp=timestamp_to_int(l2_transaction['timestamp']),
-        base_withdrawer=l2_transaction['l1_account'],
-        payload=bytes.fromhex(l2_transaction['fast_payload'][2:]),
-        l2_caller=l2_transaction['l2_account'],
-    )
-
-
 @dataclass
 class IndexerTestEnvironment:
     indexer: Client
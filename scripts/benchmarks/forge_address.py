@@ -0,0 +1,54 @@
+"""Compares address forging via `pack(address, 'address')` with the base58check
+fast path in `scripts.helpers.forging`.
+
+Run with: `uv run python -m scripts.benchmarks.forge_address`
+"""
+
+import os
+import timeit
+from typing import Callable
+
+from pytezos.crypto.encoding import base58_encode
+
+from scripts.helpers.forging import forge_address, forge_addresses
+from scripts.helpers.utility import pack
+
+PREFIXES = [b'tz1', b'tz2', b'tz3', b'tz4', b'KT1', b'sr1']
+
+
+def make_addresses(count: int) -> list[str]:
+    return [
+        base58_encode(os.urandom(20), PREFIXES[n % len(PREFIXES)]).decode()
+        for n in range(count)
+    ]
+
+
+def main(count: int = 2000, repeat: int = 5) -> None:
+    addresses = make_addresses(count)
+    assert [pack(a, 'address')[-22:] for a in addresses] == forge_addresses(addresses)
+
+    def cold(forge: Callable[[], object]) -> Callable[[], object]:
+        def run() -> object:
+            forge_address.cache_clear()
+            return forge()
+
+        return run
+
+    cases = {
+        'pack(address)[-22:]': lambda: [pack(a, 'address')[-22:] for a in addresses],
+        'forge_address': cold(lambda: [forge_address(a) for a in addresses]),
+        'forge_addresses': cold(lambda: forge_addresses(addresses)),
+        'forge_address, cached': lambda: [forge_address(a) for a in addresses],
+    }
+    baseline = None
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=1, repeat=repeat)) / count
+        baseline = baseline or seconds
+        print(
+            f'{name:<22} {seconds * 1e6:8.2f} us/address '
+            + f'({baseline / seconds:6.1f}x)'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,20 @@
+import hashlib
 import os
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Iterator
 
 import click
 import requests
 import survey
+from eth_account.signers.local import LocalAccount
+from hexbytes import HexBytes
 from pytezos.client import PyTezosClient
 from pytezos import pytezos
+from pytezos.operation.group import OperationGroup
 from pytezos.rpc.node import RpcError
+from web3 import Web3
 
 from scripts.bootstrap.cli import echo
 from scripts.bootstrap.cli import notice_echo
@@ -14,19 +22,48 @@ from scripts.bootstrap.cli import survey_table
 from scripts.bootstrap.const import KERNEL_ADDRESS
 from scripts.bootstrap.const import MAINNET_TZKT_API_URL
 from scripts.bootstrap.const import MAINNET_WHITELIST
-from scripts.bootstrap.dto import TicketerDTO
+from scripts.bootstrap.dto import BootstrapStateDTO
 from scripts.bootstrap.dto import TicketerParamsDTO
+from scripts.bootstrap.dto import TokenDeploymentDTO
 from scripts.bootstrap.dto import TokenInfoDTO
 from scripts.bootstrap.dto import TokenMetadataDTO
 from scripts.bootstrap.dto import UserInputDTO
 from scripts import cli_options
-from scripts.etherlink import deploy_erc20
 from scripts.helpers.addressable import Addressable
+from scripts.helpers.contracts.ticketer import Ticketer
+from scripts.helpers.contracts.token_bridge_helper import TokenBridgeHelper
 from scripts.helpers.contracts.tokens.token import TokenHelper
+from scripts.helpers.etherlink import make_filename
+from scripts.helpers.etherlink.contract import (
+    get_nonce_manager,
+    load_contract_type,
+    originate_contract,
+)
+from scripts.helpers.ticket_content import TicketContent
+from scripts.helpers.ticket_identity import get_ticket_identity
+from scripts.helpers.utility import (
+    find_op_by_hash,
+    get_addresses_from_op,
+    get_etherlink_account,
+    get_etherlink_web3,
+)
 from scripts.networks import NetworkConfig, available_networks, load_network
-from scripts.tezos import deploy_ticketer
-from scripts.tezos import deploy_token_bridge_helper
-from scripts.tezos import get_ticketer_params
+from scripts.tezos.deploy_ticketer import make_extra_metadata
+
+# Contracts originated per operation group by the pipelined bootstrap; keeps each
+# group well below the operation size limit.
+ORIGINATIONS_PER_GROUP = 4
+
+
+def bootstrap_state_path(user_input: UserInputDTO) -> Path:
+    """The progress file of a bootstrap, one per pair of L1 and L2 nodes (and
+    rollup), so that bootstraps of different networks never mix"""
+
+    network = '\n'.join(
+        [user_input.l1_rpc_url, user_input.l2_rpc_url, user_input.smart_rollup_address]
+    )
+    digest = hashlib.sha256(network.encode()).hexdigest()[:16]
+    return Path(f'.bootstrap-state-{digest}.json')
 
 
 class EtherlinkBootstrapClient:
@@ -38,20 +75,38 @@ class EtherlinkBootstrapClient:
         self._rpc_url = rpc_url
         self._private_key = private_key
 
-    def deploy_erc20_proxy(
+    @cached_property
+    def _web3(self) -> Web3:
+        return get_etherlink_web3(self._rpc_url)
+
+    @cached_property
+    def _account(self) -> LocalAccount:
+        return get_etherlink_account(self._web3, self._private_key)
+
+    def send_erc20_proxy(
         self, ticketer_params: TicketerParamsDTO, metadata: TokenMetadataDTO
     ) -> str:
-        erc20 = deploy_erc20(
-            ticketer_address_bytes=ticketer_params.address_bytes_hex,
-            ticket_content_bytes=ticketer_params.content_bytes_hex,
-            token_name=metadata.name,
-            token_symbol=metadata.symbol,
-            token_decimals=metadata.decimals,
-            kernel_address=KERNEL_ADDRESS,
-            etherlink_private_key=self._private_key,
-            etherlink_rpc_url=self._rpc_url,
+        """Sends an ERC20 Proxy deployment without waiting for its receipt; the
+        nonce manager gives back to back deployments consecutive nonces."""
+
+        erc20_proxy = load_contract_type(self._web3, make_filename('ERC20Proxy'))
+        constructor = erc20_proxy.constructor(
+            bytes.fromhex(ticketer_params.address_bytes_hex),
+            bytes.fromhex(ticketer_params.content_bytes_hex),
+            KERNEL_ADDRESS,
+            metadata.name,
+            metadata.symbol,
+            metadata.decimals,
         )
-        return str(erc20.address)
+        return originate_contract(self._web3, self._account, constructor).hex()
+
+    def wait_erc20_proxy(self, tx_hash: str) -> str:
+        """Waits for an ERC20 Proxy deployment and returns the proxy address"""
+
+        nonces = get_nonce_manager(self._web3, self._account.address)
+        [receipt] = nonces.wait([HexBytes(tx_hash)])
+        assert receipt['status'] == 1, f'ERC20 Proxy deployment failed: {receipt}'
+        return str(receipt['contractAddress'])
 
 
 def ask_origination_confirmation(token_info: TokenInfoDTO) -> None:
@@ -91,53 +146,20 @@ class TokenBootstrap:
         mainnet_asset_id: str,
         is_mainnet: bool,
         tezos_client: PyTezosClient,
-        etherlink_client: EtherlinkBootstrapClient,
         testrunner_account: str,
         use_test_prefix: bool,
         test_version: int,
-        l1_rpc_url: str,
-        l1_private_key: str,
     ):
         self._mainnet_asset_id = mainnet_asset_id
         self._is_mainnet = is_mainnet
         self._tezos_client = tezos_client
-        self._etherlink_client = etherlink_client
         self._l1_testrunner_account = testrunner_account
         self._test_amount_multiplier = 0.2
         self._use_test_prefix = use_test_prefix
         self._test_version = test_version
-        self._l1_rpc_url = l1_rpc_url
-        self._l1_private_key = l1_private_key
         self._token_info: TokenInfoDTO
 
-    def run(self, whitelist_counter: int) -> None:
-        survey.printers.info(
-            f'Whitelisting Token having asset_id {self._mainnet_asset_id} in Tezos Mainnet, parameters:',
-            mark=f'[{whitelist_counter}]',
-        )
-
-        self._fetch_mainnet_token_metadata()
-        ask_origination_confirmation(self._token_info)
-
-        asset_id = self.deploy_test_token()
-        # asset_id = self.prepare_l1_token()
-        ticketer_data = self.deploy_ticketer(asset_id)
-        erc20_proxy_address = self.deploy_erc20_proxy(ticketer_data.ticketer_params)
-        self.deploy_helper(ticketer_data.ticketer.address, erc20_proxy_address)
-
-    def prepare_l1_token(self) -> str:
-        contract_address, token_id = self._mainnet_asset_id.split('_')
-        try:
-            self._tezos_client.contract(contract_address)
-        except (RpcError, AssertionError):
-            # have to deploy test copy of mainnet whitelisted token
-            return self.deploy_test_token()
-        else:
-            # looks like we already on mainnet
-            self._fetch_mainnet_token_metadata()
-            return self._mainnet_asset_id
-
-    def _fetch_mainnet_token_metadata(self) -> None:
+    def fetch_mainnet_token_metadata(self) -> None:
         contract_address, token_id = self._mainnet_asset_id.split('_')
 
         token_data = requests.get(
@@ -161,142 +183,75 @@ class TokenBootstrap:
             supply=int(token_data['totalSupply']),
         )
 
-    def deploy_test_token(self) -> str:
-        contract_address, token_id = self._mainnet_asset_id.split('_')
-
-        survey.printers.text(
-            '',
-            end='\r',
-        )
-        survey.printers.text('\n' * 5, re=True)
-        survey.printers.text('', end='\r', re=True)
-        state = ''
-        with survey.graphics.SpinProgress(
-            prefix='Origination of testing Token Contract ',
-            suffix=lambda x: state,
-        ):
-            token = TokenHelper.get_cls(self._token_info.standard)
+    @property
+    def mainnet_asset_id(self) -> str:
+        return self._mainnet_asset_id
 
-            state = ' processing transaction...'
-            supply = self._token_info.supply
-            round_mask = 10 ** (len(str(supply)) - 2)
-            test_amount = (
-                int(supply * self._test_amount_multiplier / round_mask) * round_mask
-            )
-            balances: dict[Addressable, int] = {
-                self._tezos_client.key.public_key_hash(): abs(supply - test_amount),
-                self._l1_testrunner_account: test_amount,
-            }
-
-            metadata_encoded = {
-                k: str(v).encode()
-                for k, v in self._token_info.metadata.model_dump().items()
-            }
-            opg = token.originate(self._tezos_client, balances, int(token_id), metadata_encoded).send()  # type: ignore
-            self._tezos_client.wait(opg)
-            deployed_token = token.from_opg(self._tezos_client, opg)
-
-        asset_id = f'{deployed_token.address}_{deployed_token.token_id}'
-        survey.printers.done(
-            f'FA Contract deployed: Token `{self._token_info.metadata.name}` with asset_id {asset_id}.',
-            re=True,
-        )
-        return asset_id
+    @property
+    def token_info(self) -> TokenInfoDTO:
+        return self._token_info
 
-    def deploy_ticketer(self, asset_id: str) -> TicketerDTO:
-        contract_address, token_id_str = asset_id.split('_')
-        token_id = int(token_id_str)
+    def originate_test_token(self) -> OperationGroup:
+        """Origination of a test copy of the mainnet token; most of the supply
+        goes to the deployer and a share to the testrunner account."""
 
-        survey.printers.text(
-            '',
-            end='\r',
+        _, token_id = self._mainnet_asset_id.split('_')
+        token = TokenHelper.get_cls(self._token_info.standard)
+        supply = self._token_info.supply
+        round_mask = 10 ** (len(str(supply)) - 2)
+        test_amount = (
+            int(supply * self._test_amount_multiplier / round_mask) * round_mask
         )
-        survey.printers.text('\n' * 3, re=True)
-        survey.printers.text('', end='\r', re=True)
-        state = ''
-        with survey.graphics.SpinProgress(
-            prefix='Ticketer Contract Origination ',
-            suffix=lambda x: state,
-        ):
-            state = ' processing transaction...'
-            ticketer = deploy_ticketer(
-                token_address=contract_address,
-                token_type=self._token_info.standard,
-                token_id=token_id,
-                token_name=self._token_info.metadata.name,
-                token_decimals=self._token_info.metadata.decimals,
-                token_symbol=self._token_info.metadata.symbol,
-                tezos_private_key=self._l1_private_key,
-                tezos_rpc_url=self._l1_rpc_url,
-            )
-
-            state = ' fetching ticketer params...'
-            ticketer_params_dict = get_ticketer_params(
-                ticketer_address=ticketer.address,
-                tezos_private_key=self._l1_private_key,
-                tezos_rpc_url=self._l1_rpc_url,
-            )
-
-            ticket_hash = ticketer.read_ticket().hash()
-
-            ticketer_params = TicketerParamsDTO(
-                address_bytes_hex=ticketer_params_dict['address_bytes'],
-                content_bytes_hex=ticketer_params_dict['content_bytes'],
-            )
-
-        survey.printers.done(
-            f'Ticketer Contract deployed for Token `{self._token_info.metadata.name}`: {ticketer.address}.',
-            re=True,
-        )
-        survey.printers.done(f'Ticket Hash: `{ticket_hash}`.')
-        survey.printers.done(
-            f'Ticket Content: `0x{ticketer_params.content_bytes_hex}`.'
-        )
-        return TicketerDTO(
-            ticketer=ticketer,
-            ticketer_params=ticketer_params,
-            ticket_hash=ticket_hash,
+        balances: dict[Addressable, int] = {
+            self._tezos_client.key.public_key_hash(): abs(supply - test_amount),
+            self._l1_testrunner_account: test_amount,
+        }
+
+        metadata_encoded = {
+            k: str(v).encode()
+            for k, v in self._token_info.metadata.model_dump().items()
+        }
+        return token.originate(self._tezos_client, balances, int(token_id), metadata_encoded)  # type: ignore
+
+    def load_token(self, asset_id: str) -> TokenHelper:
+        contract_address, token_id = asset_id.split('_')
+        token = TokenHelper.get_cls(self._token_info.standard)
+        return token.from_address(
+            self._tezos_client, contract_address, token_id=int(token_id)
         )
 
-    def deploy_erc20_proxy(self, ticketer_params: TicketerParamsDTO) -> str:
-        survey.printers.text(
-            '',
-            end='\r',
+    def make_extra_metadata(self) -> dict[str, str]:
+        metadata = self._token_info.metadata
+        return make_extra_metadata(metadata.name, metadata.symbol, metadata.decimals)
+
+    def originate_ticketer(self, asset_id: str) -> OperationGroup:
+        token = self.load_token(asset_id)
+        return Ticketer.originate(self._tezos_client, token, self.make_extra_metadata())
+
+    def make_ticketer_params(
+        self, asset_id: str, ticketer_address: str
+    ) -> tuple[TicketerParamsDTO, int]:
+        """Ticketer params and ticket hash computed locally from the content the
+        Ticketer was originated with, without reading its storage."""
+
+        token = self.load_token(asset_id)
+        token_info = token.make_token_info_bytes(self.make_extra_metadata())
+        identity = get_ticket_identity(ticketer_address, TicketContent(0, token_info))
+        ticketer_params = TicketerParamsDTO(
+            address_bytes_hex=identity.address_bytes,
+            content_bytes_hex=identity.content_bytes,
         )
-        survey.printers.text('\n' * 3, re=True)
-        survey.printers.text('', end='\r', re=True)
-        with survey.graphics.SpinProgress(
-            prefix='Etherlink ERC20 Proxy Contract Origination ',
-            suffix=' processing transaction...',
-        ):
-            erc20_proxy_address = self._etherlink_client.deploy_erc20_proxy(
-                ticketer_params=ticketer_params,
-                metadata=self._token_info.metadata,
-            )
-
-        survey.printers.done(
-            f'Etherlink ERC20 Proxy Contract deployed for Token `{self._token_info.metadata.name}`: {erc20_proxy_address}.',
-            re=True,
-        )
-        return erc20_proxy_address.lower()
-
-    def deploy_helper(self, ticketer_address: str, erc20_proxy_address: str) -> None:
-        survey.printers.text('', end='\r')
-        with survey.graphics.SpinProgress(
-            prefix='Token Bridge Helper Contract Origination ',
-            suffix=' processing transaction...',
-        ):
-            helper = deploy_token_bridge_helper(
-                ticketer_address=ticketer_address,
-                erc20_proxy_address=erc20_proxy_address,
-                tezos_private_key=self._l1_private_key,
-                tezos_rpc_url=self._l1_rpc_url,
-                token_symbol=self._token_info.metadata.symbol,
-            )
-
-        survey.printers.done(
-            f'Token Bridge Helper Contract deployed for Token `{self._token_info.metadata.name}`: {helper.address}.',
-            re=True,
+        return ticketer_params, identity.hash
+
+    def originate_helper(
+        self, asset_id: str, ticketer_address: str, erc20_proxy_address: str
+    ) -> OperationGroup:
+        return TokenBridgeHelper.originate(
+            client=self._tezos_client,
+            ticketer=Ticketer.from_address(self._tezos_client, ticketer_address),
+            erc_proxy=bytes.fromhex(erc20_proxy_address.replace('0x', '')),
+            token=self.load_token(asset_id),
+            symbol=self._token_info.metadata.symbol,
         )
 
 
@@ -305,20 +260,170 @@ class RollupBootstrap:
         self,
         is_mainnet: bool,
         tezos_client: PyTezosClient,
+        etherlink_client: EtherlinkBootstrapClient,
         tokens: list[TokenBootstrap],
+        state: BootstrapStateDTO,
+        state_path: Path,
     ):
         self._is_mainnet = is_mainnet
         self._tezos_client = tezos_client
+        self._etherlink_client = etherlink_client
         self._tokens = tokens
+        self._state = state
+        self._state_path = state_path
 
     def run(self) -> None:
         self.deploy_whitelist()
         # deploy_ticket_router_tester
 
     def deploy_whitelist(self) -> None:
+        """Deploys the whitelist stage by stage instead of token by token: all
+        test tokens, then all Ticketers, all ERC20 Proxies and all Token Bridge
+        Helpers. Tezos originations are batched into shared operation groups
+        and ERC20 Proxies are deployed back to back; progress is saved to the
+        state file after every step, so a rerun resumes where it stopped. The
+        state file is removed once the whitelist is deployed."""
+
         survey.printers.info('Bootstrapping Whitelist...')
+        with ThreadPoolExecutor() as executor:
+            list(
+                executor.map(TokenBootstrap.fetch_mainnet_token_metadata, self._tokens)
+            )
         for index, token_bootstrap in enumerate(self._tokens):
-            token_bootstrap.run(index + 1)
+            survey.printers.info(
+                f'Whitelisting Token having asset_id {token_bootstrap.mainnet_asset_id} in Tezos Mainnet, parameters:',
+                mark=f'[{index + 1}]',
+            )
+            ask_origination_confirmation(token_bootstrap.token_info)
+
+        for token_bootstrap, address in self._originate_in_groups(
+            'Test Token',
+            lambda deployment: deployment.asset_id is None,
+            lambda token_bootstrap, _: token_bootstrap.originate_test_token(),
+        ):
+            _, token_id = token_bootstrap.mainnet_asset_id.split('_')
+            self._deployment(token_bootstrap).asset_id = f'{address}_{token_id}'
+
+        for token_bootstrap, address in self._originate_in_groups(
+            'Ticketer',
+            lambda deployment: deployment.ticketer_address is None,
+            lambda token_bootstrap, deployment: token_bootstrap.originate_ticketer(
+                str(deployment.asset_id)
+            ),
+        ):
+            deployment = self._deployment(token_bootstrap)
+            ticketer_params, ticket_hash = token_bootstrap.make_ticketer_params(
+                str(deployment.asset_id), address
+            )
+            deployment.ticketer_address = address
+            deployment.ticketer_params = ticketer_params
+            deployment.ticket_hash = str(ticket_hash)
+
+        self._deploy_erc20_proxies()
+
+        for token_bootstrap, address in self._originate_in_groups(
+            'Token Bridge Helper',
+            lambda deployment: deployment.token_bridge_helper_address is None,
+            lambda token_bootstrap, deployment: token_bootstrap.originate_helper(
+                str(deployment.asset_id),
+                str(deployment.ticketer_address),
+                str(deployment.erc20_proxy_address),
+            ),
+        ):
+            self._deployment(token_bootstrap).token_bridge_helper_address = address
+
+        for token_bootstrap in self._tokens:
+            deployment = self._deployment(token_bootstrap)
+            survey.printers.done(
+                f'Token `{token_bootstrap.token_info.metadata.name}`: '
+                + f'asset_id {deployment.asset_id}, '
+                + f'Ticketer {deployment.ticketer_address}, '
+                + f'Ticket Hash `{deployment.ticket_hash}`, '
+                + f'ERC20 Proxy {deployment.erc20_proxy_address}, '
+                + f'Token Bridge Helper {deployment.token_bridge_helper_address}.'
+            )
+        # Done: a later bootstrap of this network starts from scratch.
+        self._state_path.unlink(missing_ok=True)
+
+    def _deployment(self, token_bootstrap: TokenBootstrap) -> TokenDeploymentDTO:
+        return self._state.tokens.setdefault(
+            token_bootstrap.mainnet_asset_id, TokenDeploymentDTO()
+        )
+
+    def _originate_in_groups(
+        self,
+        title: str,
+        is_pending: Callable[[TokenDeploymentDTO], bool],
+        make_origination: Callable[
+            [TokenBootstrap, TokenDeploymentDTO], OperationGroup
+        ],
+    ) -> Iterator[tuple[TokenBootstrap, str]]:
+        """Originates a contract for every pending token, several per operation
+        group, yielding each token with its new contract address. The state is
+        saved after each group."""
+
+        pending = [t for t in self._tokens if is_pending(self._deployment(t))]
+        for start in range(0, len(pending), ORIGINATIONS_PER_GROUP):
+            group = pending[start : start + ORIGINATIONS_PER_GROUP]
+            survey.printers.text('', end='\r')
+            with survey.graphics.SpinProgress(
+                prefix=f'{title} Contracts Origination ',
+                suffix=f' processing transaction with {len(group)} originations...',
+            ):
+                opg = self._tezos_client.bulk(
+                    *[make_origination(t, self._deployment(t)) for t in group]
+                ).send()
+                self._tezos_client.wait(opg)
+                op = find_op_by_hash(self._tezos_client, opg)
+                addresses = get_addresses_from_op(op)
+            assert len(addresses) == len(group), 'unexpected originated contracts'
+
+            for token_bootstrap, address in zip(group, addresses):
+                yield token_bootstrap, address
+                survey.printers.done(
+                    f'{title} Contract deployed for Token `{token_bootstrap.token_info.metadata.name}`: {address}.',
+                    re=token_bootstrap is group[0],
+                )
+            self._state.save(self._state_path)
+
+    def _deploy_erc20_proxies(self) -> None:
+        """Sends the pending ERC20 Proxy deployments back to back, then waits
+        for their receipts. Each tx hash is saved as soon as it is sent and
+        each address as soon as it lands, so a rerun waits for the deployments
+        already sent instead of sending them again."""
+
+        pending = [
+            t for t in self._tokens if self._deployment(t).erc20_proxy_address is None
+        ]
+        if not pending:
+            return
+        survey.printers.text('', end='\r')
+        with survey.graphics.SpinProgress(
+            prefix='Etherlink ERC20 Proxy Contracts Origination ',
+            suffix=f' processing {len(pending)} transactions...',
+        ):
+            for token_bootstrap in pending:
+                deployment = self._deployment(token_bootstrap)
+                if deployment.erc20_proxy_tx_hash is not None:
+                    continue
+                deployment.erc20_proxy_tx_hash = (
+                    self._etherlink_client.send_erc20_proxy(
+                        deployment.ticketer_params,  # type: ignore
+                        token_bootstrap.token_info.metadata,
+                    )
+                )
+                self._state.save(self._state_path)
+        for token_bootstrap in pending:
+            deployment = self._deployment(token_bootstrap)
+            address = self._etherlink_client.wait_erc20_proxy(
+                str(deployment.erc20_proxy_tx_hash)
+            )
+            deployment.erc20_proxy_address = address.lower()
+            self._state.save(self._state_path)
+            survey.printers.done(
+                f'Etherlink ERC20 Proxy Contract deployed for Token `{token_bootstrap.token_info.metadata.name}`: {address}.',
+                re=token_bootstrap is pending[0],
+            )
 
 
 def _network_prefill(cfg: NetworkConfig) -> dict[str, Any]:
@@ -550,9 +655,15 @@ class RollupBootstrapFactory:
             private_key=user_input.l2_private_key,
         )
 
-        test_version: int = (
-            cls._bump_test_version() if user_input.use_test_prefix else 0
-        )
+        # A bootstrap that stopped halfway resumes with the same test version,
+        # so that the remaining contracts get matching names.
+        state_path = bootstrap_state_path(user_input)
+        state = BootstrapStateDTO.load(state_path)
+        if not state.tokens:
+            state.test_version = (
+                cls._bump_test_version() if user_input.use_test_prefix else 0
+            )
+        test_version = state.test_version
 
         tokens = []
         for mainnet_asset_id in MAINNET_WHITELIST:
@@ -560,19 +671,19 @@ class RollupBootstrapFactory:
                 mainnet_asset_id=mainnet_asset_id,
                 is_mainnet=user_input.is_mainnet,
                 tezos_client=tezos_client,
-                etherlink_client=etherlink_client,
                 testrunner_account=user_input.l1_testrunner_account,
                 use_test_prefix=user_input.use_test_prefix,
                 test_version=test_version,
-                l1_rpc_url=user_input.l1_rpc_url,
-                l1_private_key=user_input.l1_private_key,
             )
             tokens.append(token_bootstrap)
 
         return RollupBootstrap(
             is_mainnet=user_input.is_mainnet,
             tezos_client=tezos_client,
+            etherlink_client=etherlink_client,
             tokens=tokens,
+            state=state,
+            state_path=state_path,
         )
 
     @staticmethod
@@ -1,3 +1,6 @@
+from pathlib import Path
+from typing import Optional
+
 from pydantic import BaseModel
 
 from scripts.bootstrap.const import DEFAULT_TOKEN_ID
@@ -39,3 +42,34 @@ class UserInputDTO(BaseModel):
     l2_rpc_url: str
     l1_testrunner_account: str
     use_test_prefix: bool
+
+
+class TokenDeploymentDTO(BaseModel):
+    """Contracts deployed so far for one whitelisted asset."""
+
+    asset_id: Optional[str] = None
+    ticketer_address: Optional[str] = None
+    ticketer_params: Optional[TicketerParamsDTO] = None
+    ticket_hash: Optional[str] = None
+    erc20_proxy_tx_hash: Optional[str] = None
+    erc20_proxy_address: Optional[str] = None
+    token_bridge_helper_address: Optional[str] = None
+
+
+class BootstrapStateDTO(BaseModel):
+    """Progress of a pipelined bootstrap, keyed by mainnet asset_id. Saved after
+    every step so that a failed run resumes where it stopped."""
+
+    test_version: int = 0
+    tokens: dict[str, TokenDeploymentDTO] = {}
+
+    @classmethod
+    def load(cls, path: Path) -> 'BootstrapStateDTO':
+        if not path.exists():
+            return cls()
+        return cls.model_validate_json(path.read_text())
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        tmp.write_text(self.model_dump_json(indent=2))
+        tmp.replace(path)
@@ -6,13 +6,22 @@ All subcommands are registered flat under one group. Per-network option defaults
 so commands carry no baked-in defaults and the same CLI works on any network.
 """
 
+import os
+from pathlib import Path
 from typing import Any
 
 import click
 
+from scripts.helpers.contract_scripts import persist_contract_scripts
+from scripts.helpers.etherlink.queued_deposits import (
+    index_queued_deposits_from,
+    persist_queued_deposits,
+)
+from scripts.helpers.ticket_identity import persist_ticket_identities
 from scripts.networks import NetworkConfig, load_network
 
 from scripts.tezos.fa_deposit import fa_deposit_command
+from scripts.tezos.fa_deposit_bulk import fa_deposit_bulk_command
 from scripts.tezos.get_ticketer_params import get_ticketer_params_command
 from scripts.tezos.deploy_ticketer import deploy_ticketer_command
 from scripts.tezos.deploy_token import deploy_token_command
@@ -21,12 +30,16 @@ from scripts.tezos.deploy_token_bridge_helper import deploy_token_bridge_helper_
 from scripts.tezos.xtz_deposit import xtz_deposit_command
 from scripts.tezos.xtz_deposit_michelson import xtz_deposit_michelson_command
 from scripts.tezos.execute_outbox_message import execute_outbox_message_command
+from scripts.tezos.execute_outbox_messages import execute_outbox_messages_command
+from scripts.tezos.outbox_executor import outbox_executor_command
 from scripts.tezos.deploy_fast_withdrawal import deploy_fast_withdrawal_command
 from scripts.tezos.build_contracts import (
     build_contracts_command as build_tezos_contracts_command,
 )
 from scripts.tezos.build_contracts import build_fast_withdrawal_command
 from scripts.etherlink.fa_withdraw import fa_withdraw_command
+from scripts.etherlink.fa_withdraw_bulk import fa_withdraw_bulk_command
+from scripts.etherlink.claim_deposits import claim_deposits_command
 from scripts.etherlink.xtz_withdraw import xtz_withdraw_command
 from scripts.etherlink.xtz_fast_withdraw import xtz_fast_withdraw_command
 from scripts.etherlink.deploy_erc20 import deploy_erc20_command
@@ -39,13 +52,22 @@ from scripts.rollup_node.get_proof import get_proof_command
 from scripts.rollup_node.scan_outbox import scan_outbox_command
 from scripts.monitoring.deposits import monitor_deposits_command
 from scripts.monitoring.withdrawals import monitor_withdrawals_command
+from scripts.monitoring.follow import monitor_command
+from scripts.monitoring.exporter import monitor_exporter_command
+from scripts.monitoring.latency import monitor_latency_command
+from scripts.provider.liquidity import forecast_liquidity_command
+from scripts.provider.mirror import mirror_withdrawals_command
+from scripts.provider.payouts import payout_fast_withdrawals_command
 from scripts.bootstrap.bootstrap import rollout_command
 from scripts.bridge_token import bridge_token_command
 
 # Every subcommand, registered flat under `bridge`.
 ALL_COMMANDS: list[click.Command] = [
     fa_deposit_command,
+    fa_deposit_bulk_command,
     fa_withdraw_command,
+    fa_withdraw_bulk_command,
+    claim_deposits_command,
     xtz_deposit_command,
     xtz_deposit_michelson_command,
     xtz_withdraw_command,
@@ -59,6 +81,8 @@ ALL_COMMANDS: list[click.Command] = [
     deploy_fast_withdrawal_command,
     get_ticketer_params_command,
     execute_outbox_message_command,
+    execute_outbox_messages_command,
+    outbox_executor_command,
     parse_withdrawal_event_command,
     get_proof_command,
     scan_outbox_command,
@@ -68,6 +92,12 @@ ALL_COMMANDS: list[click.Command] = [
     test_contracts_command,
     monitor_deposits_command,
     monitor_withdrawals_command,
+    monitor_command,
+    monitor_exporter_command,
+    monitor_latency_command,
+    payout_fast_withdrawals_command,
+    mirror_withdrawals_command,
+    forecast_liquidity_command,
     rollout_command,
 ]
 
@@ -100,6 +130,18 @@ def bridge(ctx: click.Context) -> None:
 
     defaults = _network_defaults(load_network())
     ctx.default_map = {name: defaults for name in bridge.commands}
+    cache_path = os.environ.get('TICKET_IDENTITY_CACHE')
+    if cache_path:
+        persist_ticket_identities(Path(cache_path).expanduser())
+    scripts_path = os.environ.get('CONTRACT_SCRIPT_CACHE')
+    if scripts_path:
+        persist_contract_scripts(Path(scripts_path).expanduser())
+    deposits_path = os.environ.get('QUEUED_DEPOSIT_INDEX')
+    if deposits_path:
+        persist_queued_deposits(Path(deposits_path).expanduser())
+    deposits_start_block = os.environ.get('QUEUED_DEPOSIT_START_BLOCK')
+    if deposits_start_block:
+        index_queued_deposits_from(int(deposits_start_block))
 
 
 for _command in ALL_COMMANDS:
@@ -2,6 +2,8 @@ from scripts.etherlink.deploy_erc20 import deploy_erc20
 from scripts.etherlink.test_contracts import test_contracts
 from scripts.etherlink.build_contracts import build_contracts
 from scripts.etherlink.fa_withdraw import fa_withdraw
+from scripts.etherlink.fa_withdraw_bulk import fa_withdraw_bulk
+from scripts.etherlink.claim_deposits import claim_deposits
 from scripts.etherlink.xtz_withdraw import xtz_withdraw
 from scripts.etherlink.parse_withdrawal_event import parse_withdrawal_event
 from scripts.etherlink.xtz_fast_withdraw import xtz_fast_withdraw
@@ -14,6 +16,8 @@ __all__ = [
     'test_contracts',
     'build_contracts',
     'fa_withdraw',
+    'fa_withdraw_bulk',
+    'claim_deposits',
     'parse_withdrawal_event',
     'xtz_withdraw',
     'xtz_fast_withdraw',
@@ -0,0 +1,344 @@
+"""Service claiming queued FA deposits on Etherlink as soon as they appear.
+
+The kernel queues FA deposits and the L2 mint happens only once the deposit's
+nonce is claimed. The service tails the `QueuedDeposit` events through the
+shared `QueuedDepositIndex`, and every `interval` seconds sends the claims of
+all unclaimed nonces back to back, `window` at a time, while the fees spent
+stay within the budget. A sent claim is kept in flight until its receipt
+arrives, across rounds if sending or waiting fails, and its nonce is not
+claimed again meanwhile. Queue depth, claim results, fees and the claim
+latency (from the block of the `QueuedDeposit` event to the claim receipt)
+are served as Prometheus metrics.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+import click
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+from web3.types import TxParams
+
+from scripts import cli_options
+from scripts.helpers.etherlink import FaWithdrawalPrecompileHelper
+from scripts.helpers.etherlink.queued_deposits import QueuedDeposit
+from scripts.helpers.formatting import accent, echo_variable, error
+from scripts.helpers.utility import get_etherlink_account, get_etherlink_web3
+from scripts.monitoring.exporter import (
+    MetricsSnapshot,
+    host_option,
+    render_family,
+    serve_metrics,
+)
+from scripts.monitoring.latency import QUANTILES, LatencyHistogram
+
+
+@dataclass
+class ClaimerStats:
+    queue_depth: int = 0
+    indexed_block: int = 0
+    claimed: int = 0
+    failed: int = 0
+    # Claimed by someone else (e.g. the watchtower) before we did:
+    skipped: int = 0
+    fees_spent: int = 0
+    budget_exhausted: bool = False
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+def estimate_fee(transaction: TxParams) -> int:
+    gas_price = transaction.get('gasPrice') or transaction.get('maxFeePerGas') or 0
+    return int(transaction.get('gas', 0)) * int(gas_price)
+
+
+@dataclass(frozen=True)
+class InFlightClaim:
+    deposit: QueuedDeposit
+    tx_hash: HexBytes
+    # Estimated fee, counted as spent until the receipt tells the actual one:
+    fee: int
+
+
+class DepositClaimer:
+    """Claims every unclaimed deposit of the index on `tick`, spending at most
+    `fee_budget` wei over its lifetime."""
+
+    def __init__(
+        self,
+        claimer: FaWithdrawalPrecompileHelper,
+        fee_budget: int,
+        window: int,
+    ) -> None:
+        self.claimer = claimer
+        self.index = claimer.queued_deposits
+        self.fee_budget = fee_budget
+        self.window = window
+        self.stats = ClaimerStats()
+        # Sent claims waiting for their receipt, by deposit nonce:
+        self.in_flight: dict[int, InFlightClaim] = {}
+        self.block_timestamps: dict[int, int] = {}
+
+    def tick(self) -> None:
+        self.index.sync()
+        # Claims left in flight by a failed round are settled first:
+        self.settle()
+        pending = [d for d in self.index.pending() if d.nonce not in self.in_flight]
+        for start in range(0, len(pending), self.window):
+            if self.stats.budget_exhausted:
+                break
+            self.claim(pending[start : start + self.window])
+        self.stats.queue_depth = len(self.index.pending())
+        self.stats.indexed_block = (self.index.next_block or 1) - 1
+
+    def claim(self, deposits: Sequence[QueuedDeposit]) -> None:
+        """Sends the claims of `deposits` back to back, then waits for all of
+        their receipts. A claim reverting in gas estimation is already done."""
+
+        gone = []
+        for deposit in deposits:
+            try:
+                transaction = self.claimer.build_claim(deposit.nonce)
+            except ContractLogicError:
+                gone.append(deposit.nonce)
+                continue
+            fee = estimate_fee(transaction)
+            if self.stats.fees_spent + fee > self.fee_budget:
+                self.stats.budget_exhausted = True
+                click.echo(error('Fee budget exhausted, claims paused'), err=True)
+                break
+            self.stats.fees_spent += fee
+            tx_hash = self.claimer.send(transaction)
+            self.in_flight[deposit.nonce] = InFlightClaim(deposit, tx_hash, fee)
+
+        self.stats.skipped += len(gone)
+        self.index.mark_claimed(gone)
+        self.settle()
+
+    def settle(self) -> None:
+        """Waits for the receipts of the claims in flight, one at a time, so
+        that a timeout keeps the ones not received yet for the next round."""
+
+        claimed = []
+        try:
+            for nonce, claim in list(self.in_flight.items()):
+                [receipt] = self.claimer.nonces.wait([claim.tx_hash])
+                del self.in_flight[nonce]
+                self.stats.fees_spent += (
+                    receipt['gasUsed'] * receipt['effectiveGasPrice'] - claim.fee
+                )
+                if receipt['status'] == 1:
+                    claimed.append(nonce)
+                    self.stats.claimed += 1
+                    queued_at = self.block_timestamp(claim.deposit.block_number)
+                    self.stats.latency.add(time.time() - queued_at)
+                else:
+                    self.stats.failed += 1
+        finally:
+            self.index.mark_claimed(claimed)
+
+    def block_timestamp(self, block_number: int) -> int:
+        if block_number not in self.block_timestamps:
+            block = self.claimer.web3.eth.get_block(block_number)
+            # Deposits are claimed roughly in block order, so only the recent
+            # blocks are worth keeping:
+            if len(self.block_timestamps) >= 1024:
+                self.block_timestamps.clear()
+            self.block_timestamps[block_number] = int(block['timestamp'])
+        return self.block_timestamps[block_number]
+
+
+def render_claimer_metrics(
+    stats: ClaimerStats,
+    fee_budget: int,
+    ticked_at: float,
+    tick_errors: int,
+) -> str:
+    """Renders the claimer state in the Prometheus text exposition format."""
+
+    lines = render_family(
+        'bridge_claimer_queue_depth',
+        'gauge',
+        'Queued FA deposits not claimed yet.',
+        [({}, stats.queue_depth)],
+    )
+    lines += render_family(
+        'bridge_claimer_indexed_block',
+        'gauge',
+        'Last Etherlink block the QueuedDeposit events are indexed up to.',
+        [({}, stats.indexed_block)],
+    )
+    lines += render_family(
+        'bridge_claimer_claims_total',
+        'counter',
+        'Claims by result; skipped ones were claimed by someone else.',
+        [
+            ({'result': 'claimed'}, stats.claimed),
+            ({'result': 'failed'}, stats.failed),
+            ({'result': 'skipped'}, stats.skipped),
+        ],
+    )
+    lines += render_family(
+        'bridge_claimer_fees_spent_xtz',
+        'counter',
+        'Fees paid for the claims.',
+        [({}, float(Web3.from_wei(stats.fees_spent, 'ether')))],
+    )
+    lines += render_family(
+        'bridge_claimer_fee_budget_remaining_xtz',
+        'gauge',
+        'Fees the claimer may still spend.',
+        [({}, float(Web3.from_wei(max(fee_budget - stats.fees_spent, 0), 'ether')))],
+    )
+    quantiles = [(q, stats.latency.quantile(q)) for q in QUANTILES]
+    lines += render_family(
+        'bridge_claimer_claim_latency_seconds',
+        'summary',
+        'Seconds from the block of a queued deposit to its claim receipt.',
+        [({'quantile': str(q)}, value) for q, value in quantiles if value is not None],
+    )
+    lines.append(f'bridge_claimer_claim_latency_seconds_count {stats.latency.count}')
+    lines += render_family(
+        'bridge_claimer_last_tick_timestamp_seconds',
+        'gauge',
+        'Unix time of the last successful claiming round.',
+        [({}, ticked_at)],
+    )
+    lines += render_family(
+        'bridge_claimer_tick_errors_total',
+        'counter',
+        'Claiming rounds that failed (they are retried on the next one).',
+        [({}, tick_errors)],
+    )
+    return '\n'.join(lines) + '\n'
+
+
+class ClaimLoop(threading.Thread):
+    """Runs a claiming round every `interval` seconds and re-renders the
+    metrics snapshot. Failures are counted and retried on the next round."""
+
+    def __init__(
+        self,
+        claimer: DepositClaimer,
+        snapshot: MetricsSnapshot,
+        interval: int,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.claimer = claimer
+        self.snapshot = snapshot
+        self.interval = interval
+        self.errors = 0
+        self.ticked_at = 0.0
+
+    def render(self) -> None:
+        self.snapshot.set(
+            render_claimer_metrics(
+                self.claimer.stats,
+                self.claimer.fee_budget,
+                self.ticked_at,
+                self.errors,
+            )
+        )
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.claimer.tick()
+                self.ticked_at = time.time()
+            except Exception as exc:
+                self.errors += 1
+                click.echo(error(f'Claiming round failed: {exc}'), err=True)
+            self.render()
+            time.sleep(self.interval)
+
+
+def claim_deposits(
+    fee_budget: float,
+    window: int,
+    interval: int,
+    start_block: Optional[int],
+    host: str,
+    port: int,
+    withdraw_precompile: str,
+    etherlink_private_key: str,
+    etherlink_rpc_url: str,
+) -> None:
+    """Claims queued FA deposits as they appear and serves claimer metrics"""
+
+    web3 = get_etherlink_web3(etherlink_rpc_url)
+    account = get_etherlink_account(web3, etherlink_private_key)
+    precompile = FaWithdrawalPrecompileHelper.from_address(
+        web3=web3, account=account, address=withdraw_precompile
+    )
+    index = precompile.queued_deposits
+    if start_block is not None and index.next_block is None:
+        index.next_block = start_block
+    claimer = DepositClaimer(precompile, Web3.to_wei(fee_budget, 'ether'), window)
+
+    click.echo('Claiming queued FA deposits:')
+    echo_variable('  - ', 'Claimer', account.address)
+    echo_variable('  - ', 'Etherlink RPC node', etherlink_rpc_url)
+    echo_variable('  - ', 'Fee budget', f'{fee_budget} XTZ')
+    snapshot = MetricsSnapshot()
+    loop = ClaimLoop(claimer, snapshot, interval)
+    loop.render()
+    loop.start()
+    click.echo(
+        'Serving metrics on '
+        + accent(f'http://{host}:{port}/metrics')
+        + f', claiming every {interval}s'
+    )
+    serve_metrics(snapshot, host, port)
+
+
+fee_budget_option = click.option(
+    '--fee-budget',
+    default=1.0,
+    show_default=True,
+    help='Max XTZ the service may spend on claim fees; claims pause once spent.',
+)
+window_option = click.option(
+    '--window',
+    default=32,
+    show_default=True,
+    help='Max claims sent before waiting for their receipts.',
+)
+interval_option = click.option(
+    '--interval',
+    default=5,
+    show_default=True,
+    help='Seconds between claiming rounds.',
+)
+start_block_option = click.option(
+    '--start-block',
+    type=int,
+    default=None,
+    help='Etherlink block to start indexing QueuedDeposit events from, when '
+    + 'there is no saved index (default: `QUEUED_DEPOSIT_START_BLOCK`, or '
+    + '100,000 blocks back from head).',
+)
+port_option = click.option(
+    '--port',
+    default=9465,
+    show_default=True,
+    help='Port to serve /metrics on.',
+)
+
+
+claim_deposits_command = cli_options.command(
+    claim_deposits,
+    name='claim_deposits',
+    options=[
+        fee_budget_option,
+        window_option,
+        interval_option,
+        start_block_option,
+        host_option,
+        port_option,
+        cli_options.withdraw_precompile,
+        cli_options.etherlink_private_key,
+        cli_options.etherlink_rpc_url,
+    ],
+)
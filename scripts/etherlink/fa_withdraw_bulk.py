@@ -0,0 +1,289 @@
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+import click
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+from web3.types import TxReceipt
+
+from scripts import cli_options
+from scripts.helpers.contracts.ticketer import Ticketer
+from scripts.helpers.etherlink import FaWithdrawalPrecompileHelper
+from scripts.helpers.formatting import accent, echo_variable, error, wrap
+from scripts.helpers.records import read_records
+from scripts.helpers.snapshot import at_block
+from scripts.helpers.ticket_identity import TicketIdentity, get_ticket_identity
+from scripts.helpers.utility import (
+    get_etherlink_account,
+    get_etherlink_web3,
+    get_tezos_client,
+    make_address_bytes,
+)
+from scripts.networks import TokenConfig, load_network
+
+
+@dataclass(frozen=True)
+class WithdrawalRequest:
+    row: int
+    receiver: str
+    amount: int
+    token: str
+
+
+@dataclass(frozen=True)
+class TokenRoute:
+    """Everything a withdrawal of one token needs, computed once per token:
+    the ERC20 Proxy (ticket owner), the ticketer and content bytes, and the
+    forged router address that ends the routing info."""
+
+    erc20_proxy: str
+    ticketer: bytes
+    content: bytes
+    router: str
+
+
+def read_withdrawals(path: Path) -> list[WithdrawalRequest]:
+    """Reads `receiver, amount, token` rows from a CSV file (with a header) or
+    from JSON lines; `token` is a token symbol or L2 address from the network
+    config."""
+
+    return [
+        WithdrawalRequest(
+            row=row,
+            receiver=str(fields['receiver']).strip(),
+            amount=int(fields['amount']),
+            token=str(fields['token']).strip(),
+        )
+        for row, fields in enumerate(read_records(path))
+    ]
+
+
+def find_token(tokens: Sequence[TokenConfig], token: str) -> TokenConfig:
+    key = token.lower().removeprefix('0x')
+    for config in tokens:
+        if token == config.symbol or key == config.l2_token_address:
+            return config
+    raise click.BadParameter(f'Unknown token `{token}`, not in the network config')
+
+
+def resolve_routes(
+    tezos_rpc_url: str,
+    tezos_private_key: str,
+    tokens: Sequence[TokenConfig],
+    requested: set[str],
+) -> dict[str, TokenRoute]:
+    """Reads the ticket content of every requested token's ticketer, all at
+    the same block, and forges the bytes once per token."""
+
+    manager = get_tezos_client(tezos_rpc_url, tezos_private_key)
+    routes = {}
+    with at_block(manager):
+        for token in sorted(requested):
+            config = find_token(tokens, token)
+            ticketer = Ticketer.from_address(manager, config.l1_ticketer_address)
+            identity = get_ticket_identity(ticketer.address, ticketer.read_content())
+            routes[token] = make_route(config, identity)
+    return routes
+
+
+def make_route(config: TokenConfig, identity: TicketIdentity) -> TokenRoute:
+    return TokenRoute(
+        # The config keeps the address lowercase; web3 only takes the
+        # checksummed form as an `address` argument:
+        erc20_proxy=Web3.to_checksum_address('0x' + config.l2_token_address),
+        ticketer=bytes.fromhex(identity.address_bytes),
+        content=bytes.fromhex(identity.content_bytes),
+        router=identity.address_bytes,
+    )
+
+
+def parse_outbox_message(
+    receipt: TxReceipt, kernel_address: str
+) -> Optional[tuple[int, int]]:
+    """Outbox level and index from the kernel log of a withdrawal receipt (the
+    last two words of its data), as `parse_withdrawal_event` does."""
+
+    for log in receipt['logs']:
+        if log['address'].lower() == kernel_address.lower():
+            data = bytes(log['data'])
+            level = int.from_bytes(data[-64:-32], 'big')
+            index = int.from_bytes(data[-32:], 'big')
+            return level, index
+    return None
+
+
+def done_rows(output: Path) -> set[int]:
+    """Rows of the input already handled by an earlier run: sent (even if its
+    receipt was never recorded, so that it is not sent twice), included or
+    failed"""
+
+    if not output.exists():
+        return set()
+    rows = set()
+    for line in output.read_text().splitlines():
+        try:
+            rows.add(json.loads(line)['row'])
+        except (ValueError, KeyError):
+            # A line cut short by an interrupted run; that row is retried.
+            continue
+    return rows
+
+
+def submit_withdrawals(
+    precompile: FaWithdrawalPrecompileHelper,
+    withdrawals: Sequence[WithdrawalRequest],
+    routes: dict[str, TokenRoute],
+    kernel_address: str,
+    window: int,
+) -> Iterator[dict[str, Any]]:
+    """Sends the withdrawals `window` at a time back to back (nonces are
+    assigned locally), then waits for the window's receipts. Yields a record
+    with a `None` status as soon as a withdrawal is sent, then its result
+    once the receipt arrives; a withdrawal that fails to build (e.g. reverts
+    in gas estimation) yields a failed result and is not sent."""
+
+    for start in range(0, len(withdrawals), window):
+        batch = withdrawals[start : start + window]
+        sent, tx_hashes = [], []
+        for withdrawal in batch:
+            route = routes[withdrawal.token]
+            try:
+                # A malformed receiver fails to forge, as a failed row too:
+                routing_info = make_address_bytes(withdrawal.receiver) + route.router
+                transaction = precompile.build_withdraw(
+                    ticket_owner=route.erc20_proxy,
+                    routing_info=bytes.fromhex(routing_info),
+                    amount=withdrawal.amount,
+                    ticketer=route.ticketer,
+                    content=route.content,
+                )
+            except (ContractLogicError, ValueError) as exc:
+                yield {
+                    **asdict(withdrawal),
+                    'tx_hash': None,
+                    'status': 0,
+                    'error': str(exc),
+                }
+                continue
+            tx_hash = precompile.send(transaction)
+            sent.append(withdrawal)
+            tx_hashes.append(tx_hash)
+            # Recorded before waiting, so that a rerun never sends it again:
+            yield {
+                **asdict(withdrawal),
+                'tx_hash': HexBytes(tx_hash).hex(),
+                'status': None,
+            }
+        for withdrawal, receipt in zip(sent, precompile.nonces.wait(tx_hashes)):
+            outbox_message = parse_outbox_message(receipt, kernel_address)
+            yield {
+                **asdict(withdrawal),
+                'tx_hash': receipt['transactionHash'].hex(),
+                'status': receipt['status'],
+                'outbox_level': outbox_message[0] if outbox_message else None,
+                'outbox_index': outbox_message[1] if outbox_message else None,
+            }
+
+
+def fa_withdraw_bulk(
+    input_file: Path,
+    output: Optional[Path],
+    window: int,
+    withdraw_precompile: str,
+    kernel_address: str,
+    tezos_private_key: str,
+    tezos_rpc_url: str,
+    etherlink_private_key: str,
+    etherlink_rpc_url: str,
+) -> Path:
+    """Withdraws FA tokens (ERC20) from L2 to many L1 receivers at once"""
+
+    output = output or input_file.with_suffix('.results.jsonl')
+    withdrawals = read_withdrawals(input_file)
+    submitted = done_rows(output)
+    pending = [w for w in withdrawals if w.row not in submitted]
+
+    web3 = get_etherlink_web3(etherlink_rpc_url)
+    account = get_etherlink_account(web3, etherlink_private_key)
+    click.echo('Making bulk FA withdrawal:')
+    echo_variable('  - ', 'Executor', account.address)
+    echo_variable('  - ', 'Etherlink RPC node', etherlink_rpc_url)
+    echo_variable('  - ', 'Withdrawals', f'{len(pending)} of {len(withdrawals)}')
+    echo_variable('  - ', 'Results file', str(output))
+    if not pending:
+        return output
+
+    routes = resolve_routes(
+        tezos_rpc_url,
+        tezos_private_key,
+        load_network().tokens,
+        {w.token for w in pending},
+    )
+    precompile = FaWithdrawalPrecompileHelper.from_address(
+        web3=web3, account=account, address=withdraw_precompile
+    )
+    failed = 0
+    with output.open('a') as results:
+        for result in submit_withdrawals(
+            precompile, pending, routes, kernel_address, window
+        ):
+            results.write(json.dumps(result) + '\n')
+            results.flush()
+            if result['status'] is None:
+                continue
+            failed += result['status'] != 1
+            description = (
+                f'[{result["row"]}] {result["amount"]} {result["token"]} to '
+                + f'{result["receiver"]}'
+            )
+            if result['tx_hash'] is None:
+                click.echo(error(f'{description} not sent: {result["error"]}'))
+            else:
+                click.echo(
+                    f'{description}, tx hash: ' + wrap(accent(result['tx_hash']))
+                )
+    if failed:
+        click.echo(error(f'{failed} withdrawals failed, see {output}'))
+    return output
+
+
+input_file_option = click.option(
+    '--input-file',
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help='CSV (with a `receiver,amount,token` header) or JSON lines file of '
+    + 'withdrawals; `token` is a symbol or L2 address from the network config.',
+)
+output_option = click.option(
+    '--output',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help='JSON lines file the results are appended to; rows already there are '
+    + 'skipped on a rerun (default: `<input>.results.jsonl`).',
+)
+window_option = click.option(
+    '--window',
+    default=32,
+    show_default=True,
+    help='Max withdrawals sent before waiting for their receipts.',
+)
+
+
+fa_withdraw_bulk_command = cli_options.command(
+    fa_withdraw_bulk,
+    name='fa_withdraw_bulk',
+    options=[
+        input_file_option,
+        output_option,
+        window_option,
+        cli_options.withdraw_precompile,
+        cli_options.kernel_address,
+        cli_options.tezos_private_key,
+        cli_options.tezos_rpc_url,
+        cli_options.etherlink_private_key,
+        cli_options.etherlink_rpc_url,
+    ],
+)
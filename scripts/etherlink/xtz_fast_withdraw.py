@@ -15,6 +15,7 @@ from scripts.helpers.formatting import (
     wrap,
     format_int,
 )
+from scripts.helpers.etherlink import get_nonce_manager
 from scripts import cli_options
 
 
@@ -55,17 +56,16 @@ def make_fast_withdrawal(
         payload,
     )
 
+    nonces = get_nonce_manager(web3, etherlink_account.address)
     transaction = call.build_transaction(
         {
             'from': etherlink_account.address,
             'value': web3.to_wei(wei_amount, 'wei'),
-            'nonce': web3.eth.get_transaction_count(etherlink_account.address),
-            'chainId': web3.eth.chain_id,
+            'chainId': nonces.chain_id,
         }
     )
 
-    signed_txn = web3.eth.account.sign_transaction(transaction, etherlink_account.key)
-    txn_hash = web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+    txn_hash = nonces.send(etherlink_account, transaction)
     txn_receipt = web3.eth.wait_for_transaction_receipt(txn_hash)
 
     return txn_receipt
@@ -2,7 +2,7 @@ from typing import Union
 from pytezos.client import PyTezosClient
 from eth_account.signers.local import LocalAccount
 from scripts.helpers.etherlink import EvmContractHelper
-from scripts.helpers.utility import pack
+from scripts.helpers.forging import forge_address
 from scripts.helpers.contracts.contract import ContractHelper
 
 
@@ -33,12 +33,11 @@ def get_etherlink_address(client_or_contract: EtherlinkAddressable) -> str:
 
 
 def tezos_address_to_bytes(tezos_entity: Addressable) -> bytes:
-    """Forges Tezos contract address (KT1, tz1, tz2, tz3) to bytes.
+    """Forges Tezos contract address (KT1, tz1, tz2, tz3, tz4, sr1) to bytes.
     Forged contract consists of binary suffix/prefix and body
     (blake2b hash digest)"""
 
-    # packing address to bytes and taking the last 22 bytes:
-    return pack(get_address(tezos_entity), 'address')[-22:]
+    return forge_address(get_address(tezos_entity))
 
 
 def etherlink_address_to_bytes(etherlink_entity: EtherlinkAddressable) -> bytes:
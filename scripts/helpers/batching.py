@@ -0,0 +1,60 @@
+from typing import Callable, Iterator, Optional, Sequence, TypeVar
+
+import click
+from pytezos.client import PyTezosClient
+from pytezos.contract.call import ContractCall
+from pytezos.operation.group import OperationGroup
+from pytezos.rpc.node import RpcError
+
+from scripts.helpers.formatting import error
+
+T = TypeVar('T')
+
+
+def autofill_in_groups(
+    manager: PyTezosClient,
+    items: Sequence[T],
+    make_call: Callable[[T], ContractCall | OperationGroup],
+    batch_size: int,
+) -> Iterator[tuple[list[T], Optional[OperationGroup]]]:
+    """Simulates the calls made of `items` in order, in as few groups as the
+    limits allow: a group of `batch_size` that fails simulation (gas, storage
+    or size limits, or a failing content) is halved until it passes. A single
+    failing item is yielded with no group. The next group is only simulated
+    once the caller asks for it, so it may depend on the previous ones."""
+
+    start = 0
+    while start < len(items):
+        size = min(batch_size, len(items) - start)
+        while True:
+            group = list(items[start : start + size])
+            try:
+                opg = manager.bulk(*[make_call(item) for item in group]).autofill()
+                break
+            except RpcError as exc:
+                if size == 1:
+                    click.echo(error(f'Cannot inject operation {group[0]}: {exc}'))
+                    opg = None
+                    break
+                size //= 2
+        start += size
+        yield group, opg
+
+
+def inject_in_groups(
+    manager: PyTezosClient,
+    items: Sequence[T],
+    make_call: Callable[[T], ContractCall | OperationGroup],
+    batch_size: int,
+) -> Iterator[tuple[list[T], Optional[str]]]:
+    """Injects the groups of `autofill_in_groups`, yielding each one with its
+    operation hash (None for a skipped item). Each group is confirmed before
+    the next one is simulated."""
+
+    for group, opg in autofill_in_groups(manager, items, make_call, batch_size):
+        if opg is None:
+            yield group, None
+            continue
+        signed = opg.sign()
+        signed.inject(min_confirmations=1)
+        yield group, signed.hash()
@@ -0,0 +1,102 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional, Type
+
+from pytezos.client import PyTezosClient
+from pytezos.context.impl import ExecutionContext
+from pytezos.contract.interface import ContractInterface
+from pytezos.michelson.program import MichelsonProgram
+from pytezos.rpc.node import RpcNode
+from pytezos.rpc.shell import ShellQuery
+
+
+class ContractScriptCache:
+    """Keeps contract code on disk, one JSON file per `(chain id, address)`, so
+    that every RPC node of a network shares the entries. Code never changes
+    after origination, so entries are never invalidated."""
+
+    def __init__(self) -> None:
+        self.path: Optional[Path] = None
+
+    def make_path(self, chain_id: str, address: str) -> Optional[Path]:
+        if self.path is None:
+            return None
+        return self.path / chain_id / f'{address}.json'
+
+    def load(self, chain_id: str, address: str) -> Optional[list[Any]]:
+        path = self.make_path(chain_id, address)
+        if path is None or not path.exists():
+            return None
+        code: list[Any] = json.loads(path.read_text())
+        return code
+
+    def save(self, chain_id: str, address: str, code: list[Any]) -> None:
+        path = self.make_path(chain_id, address)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        tmp.write_text(json.dumps(code))
+        tmp.replace(path)
+
+
+# Process-wide on-disk cache, disabled until `persist_contract_scripts` is called:
+contract_scripts = ContractScriptCache()
+
+
+def persist_contract_scripts(path: Path) -> None:
+    """Keeps downloaded contract code in the `path` directory across runs"""
+
+    contract_scripts.path = path
+
+
+def get_rpc_url(client: PyTezosClient) -> str:
+    url: str = client.shell.node.uri[0]
+    return url
+
+
+@lru_cache(maxsize=16)
+def get_chain_id(rpc_url: str) -> str:
+    """Chain id of the node at `rpc_url`, asked once per process"""
+
+    chain_id: str = ShellQuery(RpcNode(rpc_url)).chains.main.chain_id()
+    return chain_id
+
+
+@lru_cache(maxsize=256)
+def load_contract_class(
+    rpc_url: str, address: str
+) -> tuple[list[Any], Type[ContractInterface]]:
+    """Contract code and the ContractInterface class parsed from it, read from
+    the on-disk cache when possible and from the node otherwise."""
+
+    chain_id = None if contract_scripts.path is None else get_chain_id(rpc_url)
+    code = None if chain_id is None else contract_scripts.load(chain_id, address)
+    if code is None:
+        shell = ShellQuery(RpcNode(rpc_url))
+        code = shell.contracts[address].script()['code']
+        if chain_id is not None:
+            contract_scripts.save(chain_id, address, code)
+    context = ExecutionContext(script={'code': code})  # type: ignore[no-untyped-call]
+    program = MichelsonProgram.load(context, with_code=True)
+    cls = type(ContractInterface.__name__, (ContractInterface,), {'program': program})
+    return code, cls
+
+
+def load_contract(client: PyTezosClient, address: str) -> ContractInterface:
+    """Builds the interface of a deployed contract bound to `client`, like
+    `client.contract(address)` but with the code and entrypoints cached in
+    process and, if enabled, on disk"""
+
+    rpc_url = get_rpc_url(client)
+    code, cls = load_contract_class(rpc_url, address)
+    context = ExecutionContext(  # type: ignore[no-untyped-call]
+        shell=client.shell,
+        key=client.key,
+        address=address,
+        script={'code': code},
+        mode=client.context.mode,
+        ipfs_gateway=client.context.ipfs_gateway,
+    )
+    return cls(context)
@@ -1,7 +1,9 @@
+from pytezos.contract.data import ContractData
 from pytezos.contract.interface import ContractInterface
 from pytezos.client import PyTezosClient
 from pytezos.operation.group import OperationGroup
 from dataclasses import dataclass, replace
+from scripts.helpers.snapshot import read_storage
 from scripts.helpers.utility import (
     load_contract_from_address,
     find_op_by_hash,
@@ -47,7 +49,7 @@ class ContractHelper(ABC):
         return replace(
             self,
             client=client,
-            contract=client.contract(self.contract.address),
+            contract=load_contract_from_address(client, self.address),
         )
 
     @classmethod
@@ -60,8 +62,14 @@ class ContractHelper(ABC):
         """Loads contract from given address using given client"""
 
         return cls(
-            contract=client.contract(address),
+            contract=load_contract_from_address(client, address),
             client=client,
             address=address,
             **init_params,
         )
+
+    def read_storage(self) -> ContractData:
+        """Returns contract storage, read at the pinned block inside
+        `at_block` (and cached there) or at head otherwise"""
+
+        return read_storage(self.contract)
@@ -1,15 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, replace
+from datetime import datetime
 from os.path import join
-from typing import Any, Optional, Tuple, Union
+from typing import Any, Optional, Sequence, Tuple, Union
 
+from pytezos import MichelsonType  # type: ignore
 from pytezos.client import PyTezosClient
 from pytezos.contract.call import ContractCall
+from pytezos.michelson.types.big_map import BigMapType
 from pytezos.operation.group import OperationGroup
 
 from scripts.helpers.addressable import Addressable, get_address
 from scripts.helpers.contracts.contract import ContractHelper
 from scripts.helpers.metadata import Metadata
-from scripts.helpers.utility import get_build_dir
+from scripts.helpers.snapshot import get_block_hash
+from scripts.helpers.utility import get_build_dir, make_rpc_session
 from scripts.helpers.utility import originate_from_file
 from scripts.helpers.ticket_content import TicketContent
 
@@ -45,6 +50,38 @@ class Withdrawal:
         return replace(self, **kwargs)
 
 
+def decode_michelson_nat(byte_value: bytes) -> int:
+    nat_type = MichelsonType.match({'prim': 'nat'})
+    decoded_pytezos_value = nat_type.unpack(byte_value)
+    return int(decoded_pytezos_value)  # type: ignore
+
+
+def timestamp_to_int(timestamp: str) -> int:
+    dt_object = datetime.fromisoformat(timestamp)
+    unix_timestamp_float = dt_object.timestamp()
+    assert dt_object.microsecond == 0
+    return int(unix_timestamp_float)
+
+
+def create_withdrawal_from_l2_transaction(l2_transaction: dict) -> Withdrawal:
+    """Builds the FastWithdrawal key of a withdrawal from its indexer
+    `l2_transaction` row (the amount is converted from wei to mutez)"""
+
+    return Withdrawal(
+        withdrawal_id=l2_transaction['kernel_withdrawal_id'],
+        full_amount=int(l2_transaction['amount']) // 10**12,
+        ticketer=l2_transaction['ticket']['ticketer_address'],
+        content=TicketContent(
+            token_id=int(l2_transaction['ticket']['ticket_id']),
+            token_info=l2_transaction['ticket']['metadata'],
+        ),
+        timestamp=timestamp_to_int(l2_transaction['timestamp']),
+        base_withdrawer=l2_transaction['l1_account'],
+        payload=bytes.fromhex(l2_transaction['fast_payload'][2:]),
+        l2_caller=l2_transaction['l2_account'],
+    )
+
+
 @dataclass
 class PaidOut:
     provider: str
@@ -144,6 +181,50 @@ class FastWithdrawal(ContractHelper):
         status = self.contract.get_status(withdrawal.as_tuple()).run_view()  # type: ignore
         return Status.from_dict(status)
 
+    def get_withdrawals_big_map(self) -> BigMapType:
+        """Returns the `withdrawals` big_map (its pointer and types)"""
+
+        big_map = self.read_storage()['withdrawals'].data
+        assert isinstance(big_map, BigMapType)
+        return big_map
+
+    def get_statuses(
+        self,
+        withdrawals: Sequence[Withdrawal],
+        concurrency: int = 8,
+        block_hash: Optional[str] = None,
+    ) -> list[Status]:
+        """Returns statuses of many withdrawals, all read at the same block
+        (head by default), without a `get_status` view simulation each: the
+        `withdrawals` big_map key hashes are computed locally and the values
+        are fetched concurrently over one pooled session."""
+
+        big_map = self.get_withdrawals_big_map()
+        value_type = type(big_map).args[1]
+        key_hashes: list[str] = [
+            big_map.get_key_hash(w.as_tuple())  # type: ignore[no-untyped-call]
+            for w in withdrawals
+        ]
+        block_hash = block_hash or get_block_hash(self.client)
+        base_url = self.client.shell.node.uri[0].rstrip('/')
+        big_map_url = (
+            f'{base_url}/chains/main/blocks/{block_hash}/context/big_maps/{big_map.ptr}'
+        )
+        session = make_rpc_session(concurrency)
+
+        def read_status(key_hash: str) -> Status:
+            response = session.get(f'{big_map_url}/{key_hash}', timeout=60)
+            if response.status_code == 404:
+                return Status.from_dict(None)
+            response.raise_for_status()
+            value = value_type.from_micheline_value(response.json())
+            return Status.from_dict(value.to_python_object())
+
+        unique = list(set(key_hashes))
+        with session, ThreadPoolExecutor(max_workers=concurrency) as executor:
+            statuses = dict(zip(unique, executor.map(read_status, unique)))
+        return [statuses[key_hash] for key_hash in key_hashes]
+
     def get_config_view(self) -> dict[str, Any]:
         """Returns FastWithdrawal contract configuration"""
 
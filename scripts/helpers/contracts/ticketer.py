@@ -12,6 +12,7 @@ from scripts.helpers.contracts.tokens.token import TokenInfo
 from scripts.helpers.metadata import Metadata
 from scripts.helpers.ticket import Ticket
 from scripts.helpers.ticket_content import TicketContent
+from scripts.helpers.ticket_identity import get_ticket_identity
 from scripts.helpers.utility import get_build_dir
 from scripts.helpers.utility import originate_from_file
 
@@ -60,7 +61,7 @@ class Ticketer(ContractHelper):
     def read_content(self) -> TicketContent:
         """Returns content of the ticketer"""
 
-        raw_content = self.contract.storage['content']()
+        raw_content = self.read_storage()['content']()
         return TicketContent(
             token_id=raw_content[0],
             token_info=raw_content[1],
@@ -84,7 +85,7 @@ class Ticketer(ContractHelper):
     def get_token(self) -> TokenHelper:
         """Returns token helper"""
 
-        token = self.contract.storage['token']()
+        token = self.read_storage()['token']()
         assert isinstance(token, dict)
         return TokenHelper.from_dict(self.client, token)
 
@@ -106,4 +107,5 @@ class Ticketer(ContractHelper):
     def get_content_bytes_hex(self) -> str:
         """Returns content of the ticketer as bytes hex string"""
 
-        return self.read_ticket().content.to_bytes_hex()
+        content = self.read_content()
+        return get_ticket_identity(self.address, content).content_bytes
@@ -62,6 +62,6 @@ class TokenBridgeHelper(ContractHelper):
     def get_ticketer(self) -> Ticketer:
         """Returns ticketer"""
 
-        ticketer_address = self.contract.storage['ticketer']()
+        ticketer_address = self.read_storage()['ticketer']()
         assert isinstance(ticketer_address, str)
         return Ticketer.from_address(self.client, ticketer_address)
@@ -61,7 +61,7 @@ class CtezToken(FA12):
 
         address = get_address(client_or_contract)
         try:
-            balance = self.contract.storage['ledger'][address]()
+            balance = self.read_storage()['ledger'][address]()
         except KeyError:
             balance = 0
         assert isinstance(balance, int)
@@ -22,7 +22,7 @@ class FA12(TokenHelper):
         return self.contract.approve(
             {
                 'spender': get_address(operator),
-                'value': self.contract.storage['total_supply'](),
+                'value': self.read_storage()['total_supply'](),
             }
         )
 
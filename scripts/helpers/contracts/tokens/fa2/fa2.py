@@ -52,7 +52,7 @@ class FA2(TokenHelper):
     def get_balance(self, client_or_contract: Addressable) -> int:
         address = get_address(client_or_contract)
         key = (address, self.token_id)
-        balance = self.contract.storage['ledger'][key]()  # type: ignore
+        balance = self.read_storage()['ledger'][key]()  # type: ignore
         assert isinstance(balance, int)
         return balance
 
@@ -5,11 +5,20 @@ from scripts.helpers.etherlink.fa_withdrawal_precompile import (
 from scripts.helpers.etherlink.xtz_withdrawal_precompile import (
     XtzWithdrawalPrecompileHelper,
 )
+from scripts.helpers.etherlink.queued_deposits import (
+    QueuedDeposit,
+    QueuedDepositIndex,
+    get_queued_deposit_index,
+    make_deposit_key,
+    persist_queued_deposits,
+)
 from scripts.helpers.etherlink.contract import (
     load_contract_type,
     originate_contract,
     make_filename,
     EvmContractHelper,
+    NonceManager,
+    get_nonce_manager,
 )
 
 
@@ -22,4 +31,11 @@ __all__ = [
     'originate_contract',
     'make_filename',
     'EvmContractHelper',
+    'NonceManager',
+    'get_nonce_manager',
+    'QueuedDeposit',
+    'QueuedDepositIndex',
+    'get_queued_deposit_index',
+    'make_deposit_key',
+    'persist_queued_deposits',
 ]
@@ -3,11 +3,83 @@ from web3 import Web3
 from os.path import join, dirname
 from eth_account.signers.local import LocalAccount
 import json
+import threading
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import cached_property
+from typing import Optional, Sequence
 from hexbytes import HexBytes
 from typing import TypeVar, Type, Tuple, Any
-from web3.types import TxReceipt, TxParams
+from eth_typing import ChecksumAddress
+from web3.types import Nonce, TxReceipt, TxParams
+
+
+class NonceManager:
+    """Hands out the nonces of one account locally so that many transactions
+    can be signed and sent back to back, without a `get_transaction_count`
+    round trip (or a wait for inclusion) per transaction. The chain id is
+    fetched once too.
+
+    Use `get_nonce_manager` to share one manager per node and account."""
+
+    def __init__(self, web3: Web3, address: ChecksumAddress) -> None:
+        self.web3 = web3
+        self.address = address
+        self._next_nonce: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @cached_property
+    def chain_id(self) -> int:
+        return self.web3.eth.chain_id
+
+    def reset(self) -> None:
+        """Forgets the local nonce: the next one is read from the node again"""
+
+        with self._lock:
+            self._next_nonce = None
+
+    def send(self, account: LocalAccount, transaction: TxParams) -> HexBytes:
+        """Signs `transaction` with the next nonce and sends it without waiting
+        for inclusion. Sends are serialized so that the node receives the
+        transactions in nonce order."""
+
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = self.web3.eth.get_transaction_count(
+                    self.address, 'pending'
+                )
+            transaction = {**transaction, 'nonce': Nonce(self._next_nonce)}
+            signed_txn = self.web3.eth.account.sign_transaction(
+                transaction, private_key=account.key
+            )
+            try:
+                tx_hash = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            except Exception:
+                # The nonce may or may not have been consumed; resync with the node.
+                self._next_nonce = None
+                raise
+            self._next_nonce += 1
+            return tx_hash
+
+    def wait(self, tx_hashes: Sequence[HexBytes]) -> list[TxReceipt]:
+        """Waits for the receipts of transactions sent back to back. They are
+        included in nonce order, so waiting for them one by one takes about as
+        long as waiting for the last one."""
+
+        return [self.web3.eth.wait_for_transaction_receipt(h) for h in tx_hashes]
+
+
+_nonce_managers: dict[tuple[str, ChecksumAddress], NonceManager] = {}
+_nonce_managers_lock = threading.Lock()
+
+
+def get_nonce_manager(web3: Web3, address: ChecksumAddress) -> NonceManager:
+    """The shared nonce manager of `address` on the node behind `web3`"""
+
+    key = (str(web3.provider), address)
+    with _nonce_managers_lock:
+        if key not in _nonce_managers:
+            _nonce_managers[key] = NonceManager(web3, address)
+        return _nonce_managers[key]
 
 
 def make_filename(contract_name: str) -> str:
@@ -51,17 +123,20 @@ def originate_contract(
     # gas_price = gas_price or web3.eth.gas_price
     gas_limit = gas_limit or 30_000_000
     gas_price = gas_price or web3.to_wei('1', 'gwei')
-    nonce = nonce or web3.eth.get_transaction_count(account.address)
+    nonces = get_nonce_manager(web3, account.address)
 
     transaction_parameters = {
         'from': account.address,
         # TODO: consider remove:
         # 'gas': gas_limit,
         # 'gasPrice': gas_price,
-        'nonce': nonce,
+        'chainId': nonces.chain_id,
     }
     transaction = constructor.build_transaction(transaction_parameters)
+    if nonce is None:
+        return nonces.send(account, transaction)
 
+    transaction['nonce'] = nonce
     signed_txn = web3.eth.account.sign_transaction(transaction, private_key=account.key)
     tx_hash = web3.eth.send_raw_transaction(signed_txn.rawTransaction)
     return tx_hash
@@ -95,20 +170,26 @@ class EvmContractHelper:
         contract = web3.eth.contract(address=address, abi=contract_type.abi)  # type: ignore
         return cls(contract=contract, web3=web3, account=account, address=address)
 
+    @property
+    def nonces(self) -> NonceManager:
+        return get_nonce_manager(self.web3, self.account.address)
+
     def _tx_params(self) -> TxParams:
-        """Common transaction params (sender, nonce, chain id) for this account."""
+        """Common transaction params (sender, chain id) for this account; the
+        nonce is assigned by the nonce manager when the transaction is sent."""
 
         return {
             'from': self.account.address,
-            'nonce': self.web3.eth.get_transaction_count(self.account.address),
-            'chainId': self.web3.eth.chain_id,
+            'chainId': self.nonces.chain_id,
         }
 
+    def send(self, params: TxParams) -> HexBytes:
+        """Signs and sends the transaction without waiting for its receipt"""
+
+        return self.nonces.send(self.account, params)
+
     def legacy_send(self, params: TxParams) -> TxReceipt:
-        signed_txn = self.web3.eth.account.sign_transaction(params, self.account.key)
-        txn_hash = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
-        txn_receipt = self.web3.eth.wait_for_transaction_receipt(txn_hash)
-        return txn_receipt
+        return self.web3.eth.wait_for_transaction_receipt(self.send(params))
 
     @classmethod
     def originate_from_file(
@@ -1,18 +1,23 @@
-from collections.abc import Iterator
 from os.path import dirname, join
+from typing import Optional
 
-from web3 import Web3
-from web3.types import TxReceipt
+from web3.exceptions import ContractLogicError
+from web3.types import TxParams, TxReceipt
 
 from scripts.helpers.etherlink.contract import EvmContractHelper
+from scripts.helpers.etherlink.queued_deposits import (
+    DepositKey,
+    QueuedDepositIndex,
+    get_queued_deposit_index,
+)
 
 
 class FaWithdrawalPrecompileHelper(EvmContractHelper):
     """Wraps the FA bridge precompile (0xff..02): the `withdraw` entrypoint (L2->L1)
     and the deposit-claim side. The new kernel queues FA deposits; the L2 mint
     happens only once the deposit's `QueuedDeposit` nonce is claimed. That nonce
-    surfaces only in the event (indexed by `ticketHash` + `proxy`); we match
-    `receiver` and take the newest.
+    surfaces only in the event, so lookups go through the shared
+    `QueuedDepositIndex` of the precompile.
     """
 
     filename = join(dirname(__file__), 'abi', 'fa_bridge.json')
@@ -28,63 +33,91 @@ class FaWithdrawalPrecompileHelper(EvmContractHelper):
     ) -> TxReceipt:
         """Withdraws a wrapped FA token (ERC20) from L2 back to L1."""
 
+        return self.legacy_send(
+            self.build_withdraw(ticket_owner, routing_info, amount, ticketer, content)
+        )
+
+    def build_withdraw(
+        self,
+        ticket_owner: str,
+        routing_info: bytes,
+        amount: int,
+        ticketer: bytes,
+        content: bytes,
+    ) -> TxParams:
+        """Builds (without sending) the `withdraw` transaction; the nonce is
+        assigned on `send`, so many of them can be pipelined."""
+
         call = self.contract.functions.withdraw(
             ticket_owner, routing_info, amount, ticketer, content
         )
-        return self.legacy_send(call.build_transaction(self._tx_params()))
+        transaction: TxParams = call.build_transaction(self._tx_params())
+        return transaction
 
     def claim(self, nonce: int) -> TxReceipt:
         """Claims a single queued deposit by its nonce, finalising the L2 mint."""
 
+        receipt = self.legacy_send(self.build_claim(nonce))
+        if receipt['status'] == 1:
+            self.queued_deposits.mark_claimed([nonce])
+        return receipt
+
+    def build_claim(self, nonce: int) -> TxParams:
+        """Builds (without sending) the `claim` transaction of a queued deposit."""
+
         call = self.contract.functions.claim(nonce)
-        return self.legacy_send(call.build_transaction(self._tx_params()))
+        transaction: TxParams = call.build_transaction(self._tx_params())
+        return transaction
+
+    @property
+    def queued_deposits(self) -> QueuedDepositIndex:
+        return get_queued_deposit_index(self.contract)
 
     def latest_queued_nonce(
         self, ticket_hash: int, erc20_proxy: str, receiver: str
     ) -> int:
-        """The newest queued-deposit nonce for the token/receiver, or -1 if none."""
+        """The newest queued-deposit nonce for the token/receiver, or -1 if none.
+        Only the indexed blocks are searched; see `index_queued_deposits_from`
+        for deposits older than the default lookback."""
 
-        return next(self._iter_nonces(ticket_hash, erc20_proxy, receiver), -1)
+        self.queued_deposits.sync()
+        nonces = self.queued_deposits.find(ticket_hash, erc20_proxy, receiver)
+        return nonces[-1] if nonces else -1
 
     def queued_nonces_since(
         self, ticket_hash: int, erc20_proxy: str, receiver: str, since_nonce: int
     ) -> list[int]:
-        """Nonces greater than `since_nonce` (ascending); stops at the first one
-        <= it, since nonces are monotonic."""
+        """Nonces greater than `since_nonce` (ascending), within the indexed
+        blocks like `latest_queued_nonce`."""
 
-        fresh: list[int] = []
-        for nonce in self._iter_nonces(ticket_hash, erc20_proxy, receiver):
-            if nonce <= since_nonce:
-                break
-            fresh.append(nonce)
-        return sorted(fresh)
+        self.queued_deposits.sync()
+        nonces = self.queued_deposits.find(ticket_hash, erc20_proxy, receiver)
+        return [nonce for nonce in nonces if nonce > since_nonce]
 
-    def _iter_nonces(
-        self,
-        ticket_hash: int,
-        erc20_proxy: str,
-        receiver: str,
-        chunk: int = 100,
-        max_blocks: int = 2_000,
-    ) -> Iterator[int]:
-        """Yields matching nonces newest-first, scanning the L2 head backward in
-        `chunk`-sized windows (the node caps the getLogs range). Lazy: the caller
-        stops it once satisfied, so the common lookup is a single getLogs call."""
-
-        receiver = Web3.to_checksum_address(receiver)
-        proxy = Web3.to_checksum_address(erc20_proxy)
-        hi = int(self.web3.eth.block_number)
-        floor = max(hi - max_blocks, 0)
-        while hi >= floor:
-            lo = max(hi - chunk + 1, floor)
-            events = self.contract.events.QueuedDeposit().get_logs(  # type: ignore[attr-defined]
-                fromBlock=lo,
-                toBlock=hi,
-                argument_filters={'ticketHash': ticket_hash, 'proxy': proxy},
-            )
-            # get_logs returns ascending; reverse for newest-first within the chunk.
-            for event in reversed(events):
-                args = event['args']
-                if Web3.to_checksum_address(args['receiver']) == receiver:
-                    yield int(args['nonce'])
-            hi = lo - 1
+    def claim_all_pending(
+        self, key: Optional[DepositKey] = None, window: int = 32
+    ) -> list[TxReceipt]:
+        """Claims every indexed deposit not known to be claimed (only those of
+        `key`, see `make_deposit_key`, if given), `window` at a time back to
+        back. Deposits whose claim reverts in gas estimation are already
+        claimed, e.g. by the watchtower, and are only marked as such."""
+
+        index = self.queued_deposits
+        index.sync()
+        pending = index.pending(key)
+        receipts: list[TxReceipt] = []
+        for start in range(0, len(pending), window):
+            claimed, sent, tx_hashes = [], [], []
+            for deposit in pending[start : start + window]:
+                try:
+                    transaction = self.build_claim(deposit.nonce)
+                except ContractLogicError:
+                    claimed.append(deposit.nonce)
+                    continue
+                tx_hashes.append(self.send(transaction))
+                sent.append(deposit.nonce)
+            batch = self.nonces.wait(tx_hashes)
+            claimed += [n for n, r in zip(sent, batch) if r['status'] == 1]
+            index.mark_claimed(claimed)
+            receipts += batch
+        return receipts
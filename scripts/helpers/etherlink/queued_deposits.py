@@ -0,0 +1,202 @@
+"""Local index of the FA bridge `QueuedDeposit` events.
+
+The kernel queues FA deposits and the L2 mint happens only once the deposit's
+nonce is claimed, but the nonce surfaces only in the event. Instead of scanning
+the logs backward for every receiver, the index ingests all `QueuedDeposit`
+events forward once, in getLogs ranges sized to what the node accepts, and
+answers nonce lookups locally. It can be saved to a JSON file so that later
+runs only read the blocks produced since.
+"""
+
+import hashlib
+import json
+import threading
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from requests.exceptions import RequestException
+from web3 import Web3
+from web3.contract import Contract  # type: ignore
+
+# Blocks read back from head by an index with no saved state and no start block
+# (about a day of Etherlink blocks); older deposits are not found unless the
+# start block is set, see `index_queued_deposits_from`:
+DEFAULT_LOOKBACK = 100_000
+MIN_RANGE = 1
+MAX_RANGE = 10_000
+
+DepositKey = tuple[int, str, str]
+
+
+@dataclass(frozen=True)
+class QueuedDeposit:
+    nonce: int
+    ticket_hash: int
+    proxy: str
+    receiver: str
+    amount: int
+    inbox_level: int
+    inbox_msg_id: int
+    block_number: int
+
+    @property
+    def key(self) -> DepositKey:
+        return self.ticket_hash, self.proxy, self.receiver
+
+
+def make_deposit_key(ticket_hash: int, erc20_proxy: str, receiver: str) -> DepositKey:
+    return (
+        ticket_hash,
+        Web3.to_checksum_address(erc20_proxy),
+        Web3.to_checksum_address(receiver),
+    )
+
+
+class QueuedDepositIndex:
+    """`QueuedDeposit` events of the precompile `contract` keyed by
+    `(ticketHash, proxy, receiver)`, plus the nonces known to be claimed.
+    `sync` reads the new blocks; queries never reach the node."""
+
+    def __init__(
+        self,
+        contract: Contract,
+        start_block: Optional[int] = None,
+        path: Optional[Path] = None,
+    ) -> None:
+        self.contract = contract
+        self.path = path
+        self.next_block = start_block
+        self.range = MAX_RANGE
+        self.deposits: dict[int, QueuedDeposit] = {}
+        self.nonces: dict[DepositKey, list[int]] = {}
+        self.claimed: set[int] = set()
+        self.lock = threading.RLock()
+        if path is not None and path.exists():
+            self.load(path)
+
+    def add(self, deposit: QueuedDeposit) -> None:
+        if deposit.nonce in self.deposits:
+            return
+        self.deposits[deposit.nonce] = deposit
+        # Events are ingested in order, so the per-key lists stay ascending:
+        self.nonces.setdefault(deposit.key, []).append(deposit.nonce)
+
+    def fetch(self, from_block: int, to_block: int) -> list[QueuedDeposit]:
+        events = self.contract.events.QueuedDeposit().get_logs(  # type: ignore[attr-defined]
+            fromBlock=from_block, toBlock=to_block
+        )
+        return [
+            QueuedDeposit(
+                nonce=int(event['args']['nonce']),
+                ticket_hash=int(event['args']['ticketHash']),
+                proxy=Web3.to_checksum_address(event['args']['proxy']),
+                receiver=Web3.to_checksum_address(event['args']['receiver']),
+                amount=int(event['args']['amount']),
+                inbox_level=int(event['args']['inboxLevel']),
+                inbox_msg_id=int(event['args']['inboxMsgId']),
+                block_number=int(event['blockNumber']),
+            )
+            for event in events
+        ]
+
+    def sync(self, to_block: Optional[int] = None) -> int:
+        """Ingests the events up to `to_block` (head by default) and returns
+        the number of new deposits. A range the node rejects (too many logs,
+        timeout) is halved and retried; each accepted one doubles the next."""
+
+        with self.lock:
+            head = int(self.contract.w3.eth.block_number)
+            to_block = head if to_block is None else min(to_block, head)
+            if self.next_block is None:
+                self.next_block = max(head - DEFAULT_LOOKBACK, 0)
+            found = 0
+            while self.next_block <= to_block:
+                hi = min(self.next_block + self.range - 1, to_block)
+                try:
+                    deposits = self.fetch(self.next_block, hi)
+                except (ValueError, RequestException):
+                    if self.range == MIN_RANGE:
+                        raise
+                    self.range = max(self.range // 2, MIN_RANGE)
+                    continue
+                for deposit in deposits:
+                    self.add(deposit)
+                found += len(deposits)
+                self.next_block = hi + 1
+                self.range = min(self.range * 2, MAX_RANGE)
+            if self.path is not None:
+                self.save(self.path)
+            return found
+
+    def find(self, ticket_hash: int, erc20_proxy: str, receiver: str) -> list[int]:
+        """Nonces of the indexed deposits of the token to `receiver`, ascending"""
+
+        key = make_deposit_key(ticket_hash, erc20_proxy, receiver)
+        return list(self.nonces.get(key, []))
+
+    def pending(self, key: Optional[DepositKey] = None) -> list[QueuedDeposit]:
+        """Deposits not known to be claimed, oldest first; of one key if given"""
+
+        nonces = self.nonces.get(key, []) if key else sorted(self.deposits)
+        return [self.deposits[n] for n in nonces if n not in self.claimed]
+
+    def mark_claimed(self, nonces: Iterable[int]) -> None:
+        with self.lock:
+            self.claimed.update(nonces)
+            if self.path is not None:
+                self.save(self.path)
+
+    def load(self, path: Path) -> None:
+        data = json.loads(path.read_text())
+        self.next_block = data['next_block']
+        for fields in data['deposits']:
+            self.add(QueuedDeposit(*fields))
+        self.claimed = set(data['claimed'])
+
+    def save(self, path: Path) -> None:
+        data = {
+            'next_block': self.next_block,
+            'deposits': [astuple(d) for d in self.deposits.values()],
+            'claimed': sorted(self.claimed),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        tmp.write_text(json.dumps(data))
+        tmp.replace(path)
+
+
+# Indexes shared by the helpers of one precompile, saved in this directory if set:
+_indexes: dict[tuple[str, str], QueuedDepositIndex] = {}
+_indexes_lock = threading.Lock()
+_indexes_path: Optional[Path] = None
+_start_block: Optional[int] = None
+
+
+def persist_queued_deposits(path: Path) -> None:
+    """Keeps the queued deposit indexes in the `path` directory across runs"""
+
+    global _indexes_path
+    _indexes_path = path
+
+
+def index_queued_deposits_from(block: int) -> None:
+    """Makes the shared indexes with no saved state start at `block` instead
+    of `DEFAULT_LOOKBACK` blocks back from head"""
+
+    global _start_block
+    _start_block = block
+
+
+def get_queued_deposit_index(contract: Contract) -> QueuedDepositIndex:
+    """The shared index of the precompile `contract` on the node behind it"""
+
+    key = (str(contract.w3.provider), contract.address)
+    with _indexes_lock:
+        if key not in _indexes:
+            path = None
+            if _indexes_path is not None:
+                network = hashlib.sha256(key[0].encode()).hexdigest()[:16]
+                path = _indexes_path / network / f'{contract.address}.json'
+            _indexes[key] = QueuedDepositIndex(contract, _start_block, path)
+        return _indexes[key]
@@ -0,0 +1,101 @@
+"""Pure-Python base58check forging of Tezos addresses.
+
+`forge_address` produces the same 22 bytes as packing the address with the
+`address` Michelson type and dropping the `050a00000016` header, without going
+through the pytezos type machinery: a base58check decode, a table lookup and a
+concatenation.
+"""
+
+import hashlib
+from functools import lru_cache
+from typing import Iterable
+
+ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+# Maps each ASCII character to its base58 digit, and the others to 0xff.
+DIGITS = bytes(ALPHABET.find(chr(code)) % 256 for code in range(256))
+
+# base58 version prefix -> (address prefix, forged header, forged padding).
+# Implicit accounts are forged as 0x00 + curve tag + hash, originated contracts
+# and smart rollups as their tag + hash + 0x00 padding.
+ADDRESS_ENCODINGS: dict[bytes, tuple[str, bytes, bytes]] = {
+    b'\x06\xa1\x9f': ('tz1', b'\x00\x00', b''),
+    b'\x06\xa1\xa1': ('tz2', b'\x00\x01', b''),
+    b'\x06\xa1\xa4': ('tz3', b'\x00\x02', b''),
+    b'\x06\xa1\xa6': ('tz4', b'\x00\x03', b''),
+    b'\x02\x5a\x79': ('KT1', b'\x01', b'\x00'),
+    b'\x06\x7c\x75': ('sr1', b'\x03', b'\x00'),
+}
+FORGED_HEADERS = {
+    header: prefix for prefix, (_, header, _) in ADDRESS_ENCODINGS.items()
+}
+HASH_LENGTH = 20
+FORGED_LENGTH = 22
+
+
+def checksum(payload: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+
+
+def base58check_decode(value: str) -> bytes:
+    """Decodes a base58check string into its payload (version prefix included)."""
+
+    digits = value.encode('latin-1', errors='replace').translate(DIGITS)
+    if digits and max(digits) >= 58:
+        raise ValueError(f'Invalid base58 character in `{value}`')
+    number = 0
+    for digit in digits:
+        number = number * 58 + digit
+    leading_zeros = len(value) - len(value.lstrip('1'))
+    data = b'\x00' * leading_zeros + number.to_bytes(
+        (number.bit_length() + 7) // 8, 'big'
+    )
+    payload, check = data[:-4], data[-4:]
+    if checksum(payload) != check:
+        raise ValueError(f'Invalid base58check checksum in `{value}`')
+    return payload
+
+
+def base58check_encode(payload: bytes) -> str:
+    """Encodes a payload (version prefix included) as a base58check string."""
+
+    data = payload + checksum(payload)
+    number = int.from_bytes(data, 'big')
+    chars = []
+    while number:
+        number, remainder = divmod(number, 58)
+        chars.append(ALPHABET[remainder])
+    leading_zeros = len(data) - len(data.lstrip(b'\x00'))
+    return '1' * leading_zeros + ''.join(reversed(chars))
+
+
+@lru_cache(maxsize=4096)
+def forge_address(address: str) -> bytes:
+    """Forges a tz1/tz2/tz3/tz4/KT1/sr1 address into its 22-byte binary form.
+    Memoized: the same ticketers, routers and receivers come up over and over."""
+
+    payload = base58check_decode(address)
+    prefix, digest = payload[:3], payload[3:]
+    if prefix not in ADDRESS_ENCODINGS or len(digest) != HASH_LENGTH:
+        raise ValueError(f'Unsupported Tezos address `{address}`')
+    _, header, padding = ADDRESS_ENCODINGS[prefix]
+    return header + digest + padding
+
+
+def unforge_address(data: bytes) -> str:
+    """Decodes a 22-byte forged address back into its base58check form."""
+
+    if len(data) != FORGED_LENGTH:
+        raise ValueError(f'Forged address must be 22 bytes, got {len(data)}')
+    header = data[:2] if data[0] == 0 else data[:1]
+    if header not in FORGED_HEADERS:
+        raise ValueError(f'Unsupported forged address `{data.hex()}`')
+    digest = data[len(header) : len(header) + HASH_LENGTH]
+    return base58check_encode(FORGED_HEADERS[header] + digest)
+
+
+def forge_addresses(addresses: Iterable[str]) -> list[bytes]:
+    """Forges many addresses at once; repeated addresses are decoded once."""
+
+    addresses = list(addresses)
+    forged = {address: forge_address(address) for address in set(addresses)}
+    return [forged[address] for address in addresses]
@@ -0,0 +1,14 @@
+import csv
+import json
+from pathlib import Path
+from typing import Any
+
+
+def read_records(path: Path) -> list[dict[str, Any]]:
+    """Reads the rows of a bulk command's input file: a CSV file with a header
+    row, or JSON lines (any other extension); blank lines are skipped."""
+
+    with path.open() as file:
+        if path.suffix == '.csv':
+            return list(csv.DictReader(file))
+        return [json.loads(line) for line in file if line.strip()]
@@ -1,5 +1,10 @@
-from scripts.helpers.rollup_node.proof import (
+from scripts.helpers.rollup_node.client import (
+    EndpointStats,
     Proof,
+    RollupNodeClient,
+    get_client,
+)
+from scripts.helpers.rollup_node.proof import (
     get_proof,
     get_cemented_messages,
     get_messages,
@@ -12,7 +17,10 @@ from scripts.helpers.rollup_node.ticket_table import (
 
 # Allowing reimporting from this module:
 __all__ = [
+    'EndpointStats',
     'Proof',
+    'RollupNodeClient',
+    'get_client',
     'get_proof',
     'get_cemented_messages',
     'get_messages',
@@ -0,0 +1,144 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional, TypedDict
+from urllib.parse import urlencode, urlparse, urlunparse
+
+import requests
+
+# Statuses worth retrying: the node (or a proxy in front of it) is overloaded or
+# restarting. Other error statuses carry a node error payload and are returned
+# as is, like any other response.
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class Proof(TypedDict):
+    commitment: str
+    proof: str
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.requests if self.requests else 0.0
+
+
+class RollupNodeClient:
+    """Rollup node RPC client: one pooled keep-alive session, request timeouts,
+    exponential-backoff retries on connection errors and overload statuses, and
+    per-endpoint latency counters (see `stats`)."""
+
+    def __init__(
+        self,
+        url: str,
+        timeout: tuple[float, float] = (5.0, 30.0),
+        retries: int = 5,
+        backoff: float = 0.5,
+        pool_size: int = 16,
+    ) -> None:
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.stats: dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def make_url(self, path: str, params: Optional[dict[str, Any]] = None) -> str:
+        parts = urlparse(self.url)
+        parts = parts._replace(path=path, query=urlencode(params or {}))
+        return urlunparse(parts)
+
+    def _record(self, endpoint: str, seconds: float, retries: int, ok: bool) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.retries += retries
+            stats.failures += not ok
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+
+    def get(
+        self, endpoint: str, path: str, params: Optional[dict[str, Any]] = None
+    ) -> Any:
+        """GETs `path` and decodes the JSON body. `endpoint` names the call in
+        `stats`, so that e.g. all outbox levels are counted together."""
+
+        url = self.make_url(path, params)
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    result = response.json()
+                    self._record(endpoint, time.monotonic() - start, attempt, True)
+                    return result
+                error: Exception = requests.HTTPError(
+                    f'{response.status_code} from {url}', response=response
+                )
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                error = exc
+            if attempt >= self.retries:
+                self._record(endpoint, time.monotonic() - start, attempt, False)
+                raise error
+            # Full jitter keeps concurrent callers from retrying in lockstep.
+            time.sleep(random.uniform(0, self.backoff * 2**attempt))
+            attempt += 1
+
+    def get_proof(self, outbox_level: int, index: int) -> Proof:
+        proof: Proof = self.get(
+            'proofs/outbox',
+            f'global/block/head/helpers/proofs/outbox/{outbox_level}/messages',
+            dict(index=index),
+        )
+        return proof
+
+    def get_cemented_messages(self, outbox_level: int) -> Any:
+        return self.get(
+            'cemented/outbox',
+            f'global/block/cemented/outbox/{outbox_level}/messages',
+        )
+
+    def get_cemented_level(self) -> int:
+        """The L1 level of the last cemented commitment: outbox messages up to
+        this level can be executed."""
+
+        return int(self.get('cemented/level', 'global/block/cemented/level'))
+
+    def get_messages(self, outbox_level: int) -> Any:
+        return self.get(
+            'head/outbox',
+            f'global/block/head/outbox/{outbox_level}/messages',
+        )
+
+    def get_durable_storage_value(self, key: str) -> Optional[str]:
+        value: Optional[str] = self.get(
+            'durable/value',
+            'global/block/head/durable/wasm_2_0_0/value',
+            dict(key=key),
+        )
+        return value
+
+    def close(self) -> None:
+        self.session.close()
+
+
+@lru_cache(maxsize=None)
+def get_client(url: str) -> RollupNodeClient:
+    """The shared client of a rollup node, so that the module-level helpers
+    reuse its pooled connections across calls."""
+
+    return RollupNodeClient(url)
@@ -1,41 +1,15 @@
-import requests
-from typing import Any, TypedDict
-from urllib.parse import urlparse, urlunparse, urlencode
+from typing import Any
 
-
-class Proof(TypedDict):
-    commitment: str
-    proof: str
-
-
-# TODO: add RollupNodeProvider and retry in the case of the following errors:
-# - requests.exceptions.ConnectionError: HTTPSConnectionPool
+from scripts.helpers.rollup_node.client import Proof, get_client
 
 
 def get_proof(rollup_rpc_url: str, outbox_level: int, index: int) -> Proof:
-    parts = urlparse(rollup_rpc_url)
-    parts = parts._replace(
-        path=f'global/block/head/helpers/proofs/outbox/{outbox_level}/messages',
-        query=urlencode(dict(index=index)),
-    )
-    url = urlunparse(parts)
-    proof: Proof = requests.get(url).json()
-    return proof
+    return get_client(rollup_rpc_url).get_proof(outbox_level, index)
 
 
 def get_cemented_messages(rollup_rpc_url: str, outbox_level: int) -> Any:
-    parts = urlparse(rollup_rpc_url)
-    parts = parts._replace(
-        path=f'global/block/cemented/outbox/{outbox_level}/messages',
-    )
-    url = urlunparse(parts)
-    return requests.get(url).json()
+    return get_client(rollup_rpc_url).get_cemented_messages(outbox_level)
 
 
 def get_messages(rollup_rpc_url: str, outbox_level: int) -> Any:
-    parts = urlparse(rollup_rpc_url)
-    parts = parts._replace(
-        path=f'global/block/head/outbox/{outbox_level}/messages',
-    )
-    url = urlunparse(parts)
-    return requests.get(url).json()
+    return get_client(rollup_rpc_url).get_messages(outbox_level)
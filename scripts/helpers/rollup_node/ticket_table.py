@@ -1,5 +1,4 @@
-from urllib.parse import urlparse, urlunparse, urlencode
-import requests
+from scripts.helpers.rollup_node.client import get_client
 from scripts.helpers.ticket import Ticket
 from typing import Optional
 
@@ -18,13 +17,7 @@ def make_ticket_table_key(ticket: Ticket, owner_address: str) -> str:
 def get_durable_storage_value(rollup_node_url: str, key: str) -> Optional[str]:
     """Get a durable storage value from the given rollup node URL by given key."""
 
-    parts = urlparse(rollup_node_url)
-    parts = parts._replace(
-        path='global/block/head/durable/wasm_2_0_0/value',
-        query=urlencode(dict(key=key)),
-    )
-    url = urlunparse(parts)
-    return requests.get(url).json()  # type: ignore
+    return get_client(rollup_node_url).get_durable_storage_value(key)
 
 
 def get_tickets_count(rollup_node_url: str, ticket: Ticket, owner_address: str) -> int:
@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from typing import Any
+
+from pytezos.client import PyTezosClient
+
+
+@dataclass(frozen=True)
+class RollupTiming:
+    """Smart rollup timing L1 protocol constants: the commitment period and
+    the challenge window in blocks, and the seconds per L1 block."""
+
+    commitment_period: int
+    challenge_window: int
+    block_time: int
+
+    @classmethod
+    def from_constants(cls, constants: dict[str, Any]) -> 'RollupTiming':
+        return cls(
+            commitment_period=int(
+                constants['smart_rollup_commitment_period_in_blocks']
+            ),
+            challenge_window=int(constants['smart_rollup_challenge_window_in_blocks']),
+            block_time=int(constants['minimal_block_delay']),
+        )
+
+    @classmethod
+    def from_client(cls, client: PyTezosClient) -> 'RollupTiming':
+        return cls.from_constants(client.shell.head.context.constants())
+
+    @property
+    def settlement_delay(self) -> int:
+        """Seconds from a withdrawal on L2 to its outbox message being
+        executable on L1"""
+
+        return (self.commitment_period + self.challenge_window) * self.block_time
@@ -17,6 +17,7 @@ from scripts.helpers.addressable import (
     get_etherlink_address,
     make_deposit_routing_info,
 )
+from scripts.helpers.etherlink import get_nonce_manager
 from scripts.helpers.ticket import Ticket
 from scripts.helpers.contracts.ticketer import Ticketer
 from scripts.helpers.contracts.ticket_router_tester import TicketRouterTester
@@ -120,12 +121,11 @@ def etherlink_legacy_transfer(
         'to': receiever_address,
         'gasPrice': web3.to_wei('1', 'gwei'),
         'value': web3.to_wei(value_wei, 'wei'),
-        'nonce': web3.eth.get_transaction_count(etherlink_account.address),
     }
 
     transaction['gas'] = web3.eth.estimate_gas(transaction)
-    signed_tx = etherlink_account.sign_transaction(transaction)  # type: ignore
-    tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+    nonces = get_nonce_manager(web3, etherlink_account.address)
+    tx_hash = nonces.send(etherlink_account, transaction)
 
     click.echo('Successfully transfered, tx hash: ' + wrap(accent(tx_hash.hex())))
     return tx_hash
@@ -0,0 +1,107 @@
+"""Block-pinned reads of Tezos contract state.
+
+Within `with at_block(client):` head is resolved once and every helper read
+(`ContractHelper.read_storage`, big_map lookups, ticket balances) is made at that
+block and cached, so a command sees one consistent state and never reads the
+same storage twice.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from pytezos.client import PyTezosClient
+from pytezos.context.impl import ExecutionContext
+from pytezos.contract.data import ContractData
+from pytezos.contract.interface import ContractInterface
+
+
+class BlockSnapshot:
+    """Storage and big_map values of the contracts read at `block_hash`."""
+
+    def __init__(self, block_hash: str) -> None:
+        self.block_hash = block_hash
+        self.storages: dict[str, ContractData] = {}
+        self.big_map_values: dict[tuple[Optional[str], int, str], Any] = {}
+
+    def read_storage(self, contract: ContractInterface) -> ContractData:
+        address = contract.address
+        assert address is not None, 'Only deployed contracts can be pinned'
+        if address not in self.storages:
+            context = SnapshotContext(self, contract.context)
+            self.storages[address] = type(contract)(context).storage
+        return self.storages[address]
+
+    def get_big_map_value(
+        self,
+        key: tuple[Optional[str], int, str],
+        fetch: Callable[[], Any],
+    ) -> Any:
+        if key not in self.big_map_values:
+            self.big_map_values[key] = fetch()
+        return self.big_map_values[key]
+
+
+class SnapshotContext(ExecutionContext):
+    """Copy of a contract's execution context pinned to the snapshot block;
+    big_map lookups made through it are memoized in the snapshot."""
+
+    def __init__(self, snapshot: BlockSnapshot, context: ExecutionContext) -> None:
+        super().__init__(  # type: ignore[no-untyped-call]
+            shell=context.shell,
+            key=context.key,
+            address=context.address,
+            block_id=snapshot.block_hash,
+            script=context.script,
+            mode=context.mode,
+            ipfs_gateway=context.ipfs_gateway,
+        )
+        self.snapshot = snapshot
+
+    def get_big_map_value(self, ptr: int, key_hash: str) -> Any:
+        return self.snapshot.get_big_map_value(
+            (self.address, ptr, key_hash),
+            lambda: super(SnapshotContext, self).get_big_map_value(ptr, key_hash),
+        )
+
+
+current_snapshot: ContextVar[Optional[BlockSnapshot]] = ContextVar(
+    'current_snapshot', default=None
+)
+
+
+@contextmanager
+def at_block(
+    client: PyTezosClient,
+    block_hash: Optional[str] = None,
+) -> Iterator[BlockSnapshot]:
+    """Pins helper reads to `block_hash` (head, resolved once, by default).
+    Nested calls reuse the outer snapshot unless given another block."""
+
+    snapshot = current_snapshot.get()
+    if snapshot is None or (block_hash and block_hash != snapshot.block_hash):
+        snapshot = BlockSnapshot(block_hash or client.shell.head.hash())
+    token = current_snapshot.set(snapshot)
+    try:
+        yield snapshot
+    finally:
+        current_snapshot.reset(token)
+
+
+def get_block_hash(client: PyTezosClient) -> str:
+    """Hash of the pinned block, or of the current head outside `at_block`."""
+
+    snapshot = current_snapshot.get()
+    if snapshot is not None:
+        return snapshot.block_hash
+    block_hash: str = client.shell.head.hash()
+    return block_hash
+
+
+def read_storage(contract: ContractInterface) -> ContractData:
+    """Contract storage at the pinned block, or at head outside `at_block`."""
+
+    snapshot = current_snapshot.get()
+    if snapshot is None:
+        return contract.storage
+    return snapshot.read_storage(contract)
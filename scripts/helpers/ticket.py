@@ -1,17 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
 from pytezos.client import PyTezosClient
 from pytezos.rpc.query import RpcQuery
 from dataclasses import dataclass, replace
 from pytezos.operation.group import OperationGroup
-from typing import Optional
-from scripts.helpers.utility import to_micheline
+from typing import Any, Optional, Sequence
+from scripts.helpers.snapshot import get_block_hash
+from scripts.helpers.utility import make_rpc_session, to_micheline
 from scripts.helpers.addressable import (
     Addressable,
     get_address,
 )
 from scripts.helpers.ticket_content import TicketContent
-from scripts.helpers.utility import make_address_bytes
-from web3 import Web3
-from eth_abi import decode  # type: ignore
+from scripts.helpers.ticket_identity import get_ticket_identity
 
 
 def get_ticket_balance(
@@ -22,7 +22,7 @@ def get_ticket_balance(
 ) -> int:
 
     owner_address = get_address(owner)
-    last_block_hash = client.shell.head.hash()
+    last_block_hash = get_block_hash(client)
     query = RpcQuery(
         node=client.shell.node,
         path='/chains/{}/blocks/{}/context/contracts/{}/ticket_balance',
@@ -39,6 +39,80 @@ def get_ticket_balance(
     return int(result)
 
 
+def get_ticket_balances(
+    client: PyTezosClient,
+    owners: Sequence[Addressable],
+    tickets: Sequence[tuple[str, TicketContent]],
+    concurrency: int = 8,
+    block_hash: Optional[str] = None,
+) -> list[list[int]]:
+    """Returns balances of every owner (rows) in every `(ticketer, content)`
+    ticket (columns), all read at the same block (head by default).
+
+    Requests go out concurrently over one pooled session. Originated contracts
+    asked for several tickets are read with a single `all_ticket_balances`
+    call; implicit accounts (which that RPC does not support) and single-ticket
+    queries use one `ticket_balance` call per pair."""
+
+    block_hash = block_hash or get_block_hash(client)
+    base_url = client.shell.node.uri[0].rstrip('/')
+    contracts_url = f'{base_url}/chains/main/blocks/{block_hash}/context/contracts'
+    content_type = to_micheline(TicketContent.michelson_type)
+    queried = [
+        {
+            'ticketer': ticketer,
+            'content_type': content_type,
+            'content': content.to_micheline(),
+        }
+        for ticketer, content in tickets
+    ]
+    session = make_rpc_session(concurrency)
+
+    def request(method: str, url: str, **kwargs: Any) -> Any:
+        response = session.request(method, url, timeout=60, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def read_owner(owner: str) -> list[int]:
+        raw_tickets = request('GET', f'{contracts_url}/{owner}/all_ticket_balances')
+        amounts = [0] * len(queried)
+        for raw_ticket in raw_tickets:
+            for column, ticket in enumerate(queried):
+                if (
+                    raw_ticket['ticketer'] == ticket['ticketer']
+                    and raw_ticket['content_type'] == ticket['content_type']
+                    and raw_ticket['content'] == ticket['content']
+                ):
+                    amounts[column] += int(raw_ticket['amount'])
+        return amounts
+
+    def read_pair(owner: str, column: int) -> int:
+        url = f'{contracts_url}/{owner}/ticket_balance'
+        return int(request('POST', url, json=queried[column]))
+
+    addresses = [get_address(owner) for owner in owners]
+    with session, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        rows = {
+            address: executor.submit(read_owner, address)
+            for address in set(addresses)
+            if address.startswith('KT1') and len(queried) > 1
+        }
+        cells = {
+            (address, column): executor.submit(read_pair, address, column)
+            for address in set(addresses)
+            if address not in rows
+            for column in range(len(queried))
+        }
+        return [
+            (
+                rows[address].result()
+                if address in rows
+                else [cells[address, column].result() for column in range(len(queried))]
+            )
+            for address in addresses
+        ]
+
+
 @dataclass
 class Ticket:
     owner: Addressable
@@ -104,15 +178,7 @@ class Ticket:
         """Returns hash of the ticket. It is used in the L2 TicketTable to
         identify the ticket."""
 
-        data = Web3.solidity_keccak(
-            ['bytes22', 'bytes'],
-            [
-                '0x' + make_address_bytes(self.ticketer),
-                '0x' + self.content.to_bytes_hex(),
-            ],
-        )
-        ticket_hash: int = decode(['uint256'], data)[0]
-        return ticket_hash
+        return get_ticket_identity(self.ticketer, self.content).hash
 
 
 def deserialize_ticket(owner: Addressable, raw_ticket: dict) -> Ticket:
@@ -135,7 +201,7 @@ def get_all_tickets(
     """Returns all tickets of given address"""
 
     address = address or client.key.public_key_hash()
-    last_block_hash = client.shell.head.hash()
+    last_block_hash = get_block_hash(client)
     query = RpcQuery(
         node=client.shell.node,
         path='/chains/{}/blocks/{}/context/contracts/{}/all_ticket_balances',
@@ -1,7 +1,5 @@
-from scripts.helpers.utility import to_michelson_type
-from pytezos.michelson.types.base import MichelsonType
+from scripts.helpers.utility import match_michelson_type, to_michelson_type
 from dataclasses import dataclass
-from scripts.helpers.utility import to_micheline
 from typing import (
     Optional,
     Any,
@@ -34,9 +32,8 @@ class TicketContent:
         """This function allows to make ticket payload bytes to be used in
         L2 Etherlink Bridge contracts"""
 
-        michelson_type = MichelsonType.match(to_micheline(self.michelson_type))
-        micheline_value = self.to_micheline()
-        value = michelson_type.from_micheline_value(micheline_value)
+        michelson_type = match_michelson_type(self.michelson_type)
+        value = michelson_type.from_python_object(self.to_tuple())
         payload: str = value.forge('legacy_optimized').hex()
         return payload
 
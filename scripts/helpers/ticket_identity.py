@@ -0,0 +1,100 @@
+import atexit
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from eth_abi import decode  # type: ignore
+from web3 import Web3
+
+from scripts.helpers.ticket_content import TicketContent
+from scripts.helpers.utility import make_address_bytes
+
+
+@dataclass(frozen=True)
+class TicketIdentity:
+    """Everything derived from a ticket's ticketer and content alone: the forged
+    ticketer address and content bytes (hex) and the L2 TicketTable hash."""
+
+    address_bytes: str
+    content_bytes: str
+    hash: int
+
+    @classmethod
+    def compute(cls, ticketer: str, content: TicketContent) -> 'TicketIdentity':
+        address_bytes = make_address_bytes(ticketer)
+        content_bytes = content.to_bytes_hex()
+        data = Web3.solidity_keccak(
+            ['bytes22', 'bytes'],
+            ['0x' + address_bytes, '0x' + content_bytes],
+        )
+        ticket_hash: int = decode(['uint256'], data)[0]
+        return cls(address_bytes, content_bytes, ticket_hash)
+
+
+def make_key(ticketer: str, content: TicketContent) -> str:
+    token_info = content.token_info.hex() if content.token_info is not None else ''
+    return f'{ticketer}:{content.token_id}:{token_info}'
+
+
+class TicketIdentityCache:
+    """Memoizes `(ticketer, content) -> TicketIdentity`; can be saved to and
+    loaded from a JSON file so that later runs skip the forging entirely."""
+
+    def __init__(self) -> None:
+        self.identities: dict[str, TicketIdentity] = {}
+        # Whether identities were computed since the last load or save:
+        self.changed = False
+
+    def get(self, ticketer: str, content: TicketContent) -> TicketIdentity:
+        key = make_key(ticketer, content)
+        identity = self.identities.get(key)
+        if identity is None:
+            identity = TicketIdentity.compute(ticketer, content)
+            self.identities[key] = identity
+            self.changed = True
+        return identity
+
+    def load(self, path: Path) -> None:
+        if not path.exists():
+            return
+        for key, (address_bytes, content_bytes, ticket_hash) in json.loads(
+            path.read_text()
+        ).items():
+            self.identities[key] = TicketIdentity(
+                address_bytes, content_bytes, int(ticket_hash, 16)
+            )
+
+    def save(self, path: Path) -> None:
+        """Writes the identities to `path`, unless nothing new was computed"""
+
+        if not self.changed:
+            return
+        data = {
+            key: [identity.address_bytes, identity.content_bytes, hex(identity.hash)]
+            for key, identity in self.identities.items()
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        tmp.write_text(json.dumps(data))
+        tmp.replace(path)
+        self.changed = False
+
+
+# Process-wide cache used by `Ticket.hash` and `get_ticket_identity`:
+ticket_identities = TicketIdentityCache()
+
+
+def get_ticket_identity(
+    ticketer: str, content: TicketContent, cache: Optional[TicketIdentityCache] = None
+) -> TicketIdentity:
+    """Returns memoized forged bytes and hash of the ticket"""
+
+    return (cache or ticket_identities).get(ticketer, content)
+
+
+def persist_ticket_identities(path: Path) -> None:
+    """Loads the process-wide cache from `path` and saves it back on exit"""
+
+    ticket_identities.load(path)
+    atexit.register(ticket_identities.save, path)
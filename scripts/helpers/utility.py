@@ -6,9 +6,13 @@ from os.path import dirname
 from os.path import join
 from pytezos.michelson.parse import michelson_to_micheline
 from pytezos.michelson.types.base import MichelsonType
-from typing import Any
+from functools import lru_cache
+import requests
+from typing import Any, Type
 from web3 import Web3
 from eth_account.signers.local import LocalAccount
+from scripts.helpers.contract_scripts import load_contract
+from scripts.helpers.forging import forge_address
 
 
 # Default address used as a placeholder in the contract storage
@@ -41,6 +45,17 @@ def get_address_from_op(op: dict) -> str:
     return originated_contract
 
 
+def get_addresses_from_op(op: dict) -> list[str]:
+    """Returns addresses of all contracts originated by given operation dict,
+    in the order of the operation contents"""
+
+    addresses = []
+    for content in op['contents']:
+        op_result: dict = content['metadata']['operation_result']
+        addresses.extend(op_result.get('originated_contracts', []))
+    return addresses
+
+
 def get_build_dir() -> str:
     """Returns path to the build directory"""
 
@@ -52,9 +67,7 @@ def load_contract_from_address(
 ) -> ContractInterface:
     """Loads contract from given address using given client"""
 
-    contract = client.contract(contract_address)
-    contract = contract.using(shell=client.shell, key=client.key)
-    return contract
+    return load_contract(client, contract_address)
 
 
 def to_micheline(type_expression: str) -> dict:
@@ -66,11 +79,18 @@ def to_micheline(type_expression: str) -> dict:
     return michelson_to_micheline(type_expression)  # type: ignore
 
 
+@lru_cache(maxsize=None)
+def match_michelson_type(type_expression: str) -> Type[MichelsonType]:
+    """Parses Michelson type expression string to a MichelsonType class.
+    Parsed types are immutable, so each expression is parsed once per process"""
+
+    return MichelsonType.match(to_micheline(type_expression))
+
+
 def to_michelson_type(object: Any, type_expression: str) -> MichelsonType:
     """Converts Python object to Michelson type using given type expression"""
 
-    micheline_expression = to_micheline(type_expression)
-    michelson_type = MichelsonType.match(micheline_expression)
+    michelson_type = match_michelson_type(type_expression)
     return michelson_type.from_python_object(object)
 
 
@@ -82,12 +102,11 @@ def pack(object: Any, type_expression: str) -> bytes:
 
 # TODO: rename tezos_address_to_bytes_hex, make entity Addressable, move to addressable.py, reuse tezos_address_to_bytes
 def make_address_bytes(address: str) -> str:
-    """Forges Tezos contract address (KT1, tz1, tz2, tz3) to bytes hex.
+    """Forges Tezos contract address (KT1, tz1, tz2, tz3, tz4, sr1) to bytes hex.
     Forged contract consists of binary suffix/prefix and body
     (blake2b hash digest)"""
 
-    # packing address to bytes and taking the last 22 bytes:
-    return pack(address, 'address')[-22:].hex()
+    return forge_address(address).hex()
 
 
 def originate_from_file(
@@ -101,6 +120,17 @@ def originate_from_file(
     return contract.originate(initial_storage=storage)
 
 
+def make_rpc_session(concurrency: int) -> requests.Session:
+    """HTTP session keeping up to `concurrency` connections alive, for many
+    concurrent node RPC reads"""
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
 def get_tezos_client(shell: str, key: str) -> PyTezosClient:
     """Returns PyTezosClient using given shell and key"""
 
@@ -1,15 +1,19 @@
 """Shared helpers for the bridge monitoring scripts.
 
 Both scripts read the indexer URL from the active network config (`NETWORK` env),
-sample the most recent N `bridge_operation` rows, and print client-side breakdowns
-as accented tables — the same look as the other CLI tools.
+page through the most recent `bridge_operation` rows (or the full history), fold
+each page into client-side breakdowns and print them as accented tables — the
+same look as the other CLI tools. In `--exact` mode the counting is done by the
+indexer instead: one batched document of grouped aggregates, no rows transferred.
 """
 
 from collections import Counter
-from typing import Any
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
 
 import click
-from gql import Client
+from gql import Client, gql
 from gql.transport.requests import RequestsHTTPTransport
 from graphql import DocumentNode
 from tabulate import tabulate
@@ -17,6 +21,105 @@ from tabulate import tabulate
 from scripts.helpers.formatting import accent
 from scripts.networks import load_network
 
+# Maps a `bridge_operation` row to the label it is counted under.
+OperationKey = Callable[[dict], str]
+
+COUNT_QUERY = gql(
+    """
+    query CountOperations($where: bridge_operation_bool_exp!) {
+        bridge_operation_aggregate(where: $where) {
+            aggregate { count }
+        }
+    }
+    """
+)
+
+INDEXER_STATUS_QUERY = gql(
+    """
+    query IndexerStatus {
+        dipdup_head(where: {name: {_eq: "tzkt"}}) { level }
+        dipdup_index { name level }
+    }
+    """
+)
+
+# Discovers the labels to group by: distinct statuses/kinds of the operations
+# matching `$where`, and the known tokens.
+GROUPS_QUERY = gql(
+    """
+    query OperationGroups($where: bridge_operation_bool_exp!) {
+        status: bridge_operation(where: $where, distinct_on: status) { status }
+        kind: bridge_operation(where: $where, distinct_on: kind) { kind }
+        tezos_token { id symbol }
+    }
+    """
+)
+
+
+def field_at(operation: dict, path: str) -> Any:
+    """The value at a dotted `path` of a row, or None if any hop is missing."""
+
+    value: Any = operation
+    for name in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+def token_label(token: dict) -> str:
+    """The label a token is counted under: its symbol, else its id (address)."""
+
+    # Fall back to the token id when the symbol is not in the indexer (e.g.
+    # freshly bootstrapped test tokens not yet known to the metadata service).
+    return token.get('symbol') or token.get('id') or 'unknown'
+
+
+@dataclass(frozen=True)
+class OperationSpec:
+    """What to fetch and how to break it down for one operation type.
+
+    `query` must take `$limit: Int!`, `$where: bridge_operation_bool_exp!` and
+    `$order_by: [bridge_operation_order_by!]`, and select `id`, `created_at`,
+    `updated_at` (the keyset cursors) and `is_completed` besides whatever
+    `breakdowns` read.
+    `token_filter` maps a token id to the `bridge_operation_bool_exp` fragment
+    selecting this type's operations of that token (for `--exact` counting).
+    """
+
+    title: str
+    operation_type: str
+    query: DocumentNode
+    breakdowns: dict[str, OperationKey]
+    token_filter: Callable[[str], dict[str, Any]]
+
+    @property
+    def where(self) -> dict[str, Any]:
+        return {'type': {'_eq': self.operation_type}}
+
+
+@dataclass
+class Breakdowns:
+    """Running `label -> count` counters, one per breakdown, folded page by page
+    so that memory stays bounded by the number of labels, not of rows."""
+
+    spec: OperationSpec
+    counters: dict[str, Counter] = field(init=False)
+    total: int = field(init=False, default=0)
+
+    def __post_init__(self) -> None:
+        self.counters = {name: Counter() for name in self.spec.breakdowns}
+
+    def fold(self, operations: Iterable[dict]) -> None:
+        for operation in operations:
+            for name, key in self.spec.breakdowns.items():
+                self.counters[name][key(operation)] += 1
+            self.total += 1
+
+    def print(self) -> None:
+        for name, counter in self.counters.items():
+            print_breakdown(f'{self.spec.title} by {name}', counter)
+
 
 def make_client() -> tuple[Client, str]:
     """GraphQL client for the active network's bridge indexer."""
@@ -26,14 +129,187 @@ def make_client() -> tuple[Client, str]:
     return Client(transport=transport), url
 
 
-def run_query(client: Client, query: DocumentNode, limit: int) -> dict[str, Any]:
+def run_query(
+    client: Client, query: DocumentNode, variables: dict[str, Any]
+) -> dict[str, Any]:
     with client as session:
-        result: dict[str, Any] = session.execute(
-            query, variable_values={'limit': limit}
-        )
+        result: dict[str, Any] = session.execute(query, variable_values=variables)
         return result
 
 
+def count_operations(client: Client, where: dict[str, Any]) -> int:
+    """Total number of `bridge_operation` rows matching `where`."""
+
+    data = run_query(client, COUNT_QUERY, {'where': where})
+    return int(data['bridge_operation_aggregate']['aggregate']['count'])
+
+
+def indexer_lag(client: Client) -> dict[str, int]:
+    """How many L1 blocks each indexer index trails the indexed chain head by.
+    Operations newer than that are not in the counters yet, whatever the mode."""
+
+    data = run_query(client, INDEXER_STATUS_QUERY, {})
+    heads = data['dipdup_head']
+    if not heads:
+        return {}
+    head = int(heads[0]['level'])
+    return {
+        index['name']: max(head - int(index['level']), 0)
+        for index in data['dipdup_index']
+    }
+
+
+def keyset_after(operation: dict, column: str, ascending: bool) -> dict[str, Any]:
+    """Keyset filter for the rows after `operation` in `column, id` order: ties
+    on `column` are broken by `id`, so no row is skipped or repeated across pages
+    even when many share a timestamp."""
+
+    op = '_gt' if ascending else '_lt'
+    value = operation[column]
+    return {
+        '_or': [
+            {column: {op: value}},
+            {column: {'_eq': value}, 'id': {op: operation['id']}},
+        ]
+    }
+
+
+def iter_pages(
+    client: Client,
+    spec: OperationSpec,
+    page_size: int,
+    limit: Optional[int] = None,
+    *,
+    column: str = 'created_at',
+    ascending: bool = False,
+    cursor: Optional[dict] = None,
+    where: Optional[dict[str, Any]] = None,
+) -> Iterator[list[dict]]:
+    """Yields `spec` rows (narrowed by `where`) ordered by `column, id` — newest
+    first by default — one page per request, until `limit` rows were yielded (or
+    all of them when `limit` is None). `cursor` resumes right after a row seen
+    earlier in the same order.
+
+    Pages are cursored by the last row seen rather than by offset, so each request
+    is an index range scan on the indexer side and deep pages stay as cheap as the
+    first one."""
+
+    direction = 'asc' if ascending else 'desc'
+    order_by = [{column: direction}, {'id': direction}]
+    base = spec.where if where is None else {'_and': [spec.where, where]}
+    remaining = limit
+    with client as session:
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page_where = (
+                base
+                if cursor is None
+                else {'_and': [base, keyset_after(cursor, column, ascending)]}
+            )
+            data = session.execute(
+                spec.query,
+                variable_values={
+                    'limit': size,
+                    'where': page_where,
+                    'order_by': order_by,
+                },
+            )
+            page: list[dict] = data['bridge_operation']
+            if page:
+                yield page
+                cursor = page[-1]
+            if remaining is not None:
+                remaining -= len(page)
+            if len(page) < size:
+                return
+
+
+def collect_breakdowns(
+    client: Client,
+    spec: OperationSpec,
+    page_size: int,
+    limit: Optional[int] = None,
+) -> Breakdowns:
+    """Streams `spec` rows page by page into fresh breakdown counters."""
+
+    breakdowns = Breakdowns(spec)
+    for page in iter_pages(client, spec, page_size, limit):
+        breakdowns.fold(page)
+    return breakdowns
+
+
+def group_filters(client: Client, spec: OperationSpec) -> dict[str, dict[str, dict]]:
+    """`breakdown -> label -> where fragment` for every label the indexer knows.
+
+    Status and kind labels come from the same key functions the client-side
+    breakdowns use, so both modes print identical labels."""
+
+    data = run_query(client, GROUPS_QUERY, {'where': spec.where})
+    groups: dict[str, dict[str, dict]] = {}
+    for name, key in spec.breakdowns.items():
+        filters: dict[str, dict] = {}
+        if name == 'token':
+            for token in data['tezos_token']:
+                # Tokens sharing a symbol are summed under one label.
+                label = token_label(token)
+                token_where = spec.token_filter(token['id'])
+                if label in filters:
+                    token_where = {'_or': [filters[label], token_where]}
+                filters[label] = token_where
+        else:
+            for row in data[name]:
+                value = row[name]
+                condition = {'_is_null': True} if value is None else {'_eq': value}
+                filters[key(row)] = {name: condition}
+        groups[name] = filters
+    return groups
+
+
+def aggregate_breakdowns(
+    client: Client, spec: OperationSpec, where: Optional[dict[str, Any]] = None
+) -> Breakdowns:
+    """Exact breakdowns over the whole history (narrowed by `where`), counted
+    by the indexer.
+
+    All `(breakdown, label)` counts plus the total go out as aliased
+    `bridge_operation_aggregate` fields of a single GraphQL document, so the
+    cost is two round trips regardless of history size. Operations that match
+    no known label (e.g. a token missing from `tezos_token`) are reported as
+    'unknown'."""
+
+    base = spec.where if where is None else {'_and': [spec.where, where]}
+    groups = group_filters(client, spec)
+    labels: dict[str, tuple[str, str]] = {}
+    variables: dict[str, Any] = {'total': base}
+    for name, filters in groups.items():
+        for label, fragment in filters.items():
+            alias = f'g{len(labels)}'
+            labels[alias] = (name, label)
+            variables[alias] = {'_and': [base, fragment]}
+
+    declarations = ', '.join(
+        f'${alias}: bridge_operation_bool_exp!' for alias in variables
+    )
+    fields = '\n'.join(
+        f'{alias}: bridge_operation_aggregate(where: ${alias}) {{ aggregate {{ count }} }}'
+        for alias in variables
+    )
+    document = gql(f'query GroupedCounts({declarations}) {{\n{fields}\n}}')
+    data = run_query(client, document, variables)
+
+    breakdowns = Breakdowns(spec)
+    breakdowns.total = int(data['total']['aggregate']['count'])
+    for alias, (name, label) in labels.items():
+        count = int(data[alias]['aggregate']['count'])
+        if count:
+            breakdowns.counters[name][label] += count
+    for counter in breakdowns.counters.values():
+        missing = breakdowns.total - sum(counter.values())
+        if missing > 0:
+            counter['unknown'] += missing
+    return breakdowns
+
+
 def print_breakdown(title: str, counter: Counter) -> None:
     """Prints a `label -> count` breakdown as a table, busiest first."""
 
@@ -51,7 +327,60 @@ def print_coverage(fetched: int, total: int, limit: int) -> None:
     if total > fetched:
         click.echo(
             accent(f'Sampled the {fetched} most recent of {total} total. ')
-            + f'Raise --limit (now {limit}) to include older operations.'
+            + f'Raise --limit (now {limit}) or pass --full-history '
+            + 'to include older operations.'
         )
     else:
         click.echo(f'Covered all {total} operations.')
+
+
+def monitor_operations(
+    spec: OperationSpec,
+    limit: int,
+    full_history: bool,
+    page_size: int,
+    exact: bool,
+) -> None:
+    """Prints `spec` breakdowns from the active network's indexer: the `limit`
+    most recent operations, all of them with `full_history`, or exact
+    server-side counts with `exact`."""
+
+    client, url = make_client()
+    click.echo(f'Indexer: {url}')
+
+    if exact:
+        breakdowns = aggregate_breakdowns(client, spec)
+        breakdowns.print()
+        click.echo()
+        click.echo(f'Counted all {breakdowns.total} operations on the indexer.')
+        return
+
+    breakdowns = collect_breakdowns(
+        client, spec, page_size, None if full_history else limit
+    )
+    breakdowns.print()
+    total = breakdowns.total if full_history else count_operations(client, spec.where)
+    print_coverage(breakdowns.total, total, limit)
+
+
+full_history_option = click.option(
+    '--full-history',
+    is_flag=True,
+    default=False,
+    help='Stream the whole history page by page instead of sampling --limit.',
+)
+
+page_size_option = click.option(
+    '--page-size',
+    default=1000,
+    show_default=True,
+    help='Rows per indexer request; pages are folded in as they arrive.',
+)
+
+exact_option = click.option(
+    '--exact',
+    is_flag=True,
+    default=False,
+    help='Count the whole history on the indexer with grouped aggregates '
+    + '(no rows are downloaded); --limit and --page-size are ignored.',
+)
@@ -1,32 +1,33 @@
 """Deposit statistics from the bridge indexer: totals, by token, by status."""
 
-from collections import Counter
-
 import click
 from gql import gql
 
 from scripts import cli_options
 from scripts.monitoring.common import (
-    make_client,
-    print_breakdown,
-    print_coverage,
-    run_query,
+    OperationSpec,
+    exact_option,
+    full_history_option,
+    monitor_operations,
+    page_size_option,
+    token_label,
 )
 
 QUERY = gql(
     """
-    query Deposits($limit: Int!) {
-        bridge_operation(
-            where: {type: {_eq: "deposit"}}
-            order_by: {created_at: desc}
-            limit: $limit
-        ) {
+    query Deposits(
+        $limit: Int!
+        $where: bridge_operation_bool_exp!
+        $order_by: [bridge_operation_order_by!]
+    ) {
+        bridge_operation(where: $where, order_by: $order_by, limit: $limit) {
+            id
+            created_at
+            updated_at
+            is_completed
             status
             deposit { l1_transaction { ticket { token { symbol id } } } }
         }
-        bridge_operation_aggregate(where: {type: {_eq: "deposit"}}) {
-            aggregate { count }
-        }
     }
     """
 )
@@ -38,11 +39,21 @@ def deposit_token(operation: dict) -> str:
     deposit = operation.get('deposit') or {}
     l1_transaction = deposit.get('l1_transaction') or {}
     ticket = l1_transaction.get('ticket') or {}
-    token = ticket.get('token') or {}
-    # Fall back to the token id (address) when the symbol is not in the indexer
-    # (e.g. freshly bootstrapped test tokens not yet known to the metadata service).
-    return token.get('symbol') or token.get('id') or 'unknown'
-
+    return token_label(ticket.get('token') or {})
+
+
+DEPOSITS = OperationSpec(
+    title='Deposits',
+    operation_type='deposit',
+    query=QUERY,
+    breakdowns={
+        'token': deposit_token,
+        'status': lambda operation: operation['status'],
+    },
+    token_filter=lambda token_id: {
+        'deposit': {'l1_transaction': {'ticket': {'token': {'id': {'_eq': token_id}}}}}
+    },
+)
 
 limit_option = click.option(
     '--limit',
@@ -52,23 +63,16 @@ limit_option = click.option(
 )
 
 
-def monitor_deposits(limit: int) -> None:
+def monitor_deposits(
+    limit: int, full_history: bool, page_size: int, exact: bool
+) -> None:
     """Prints deposit stats from the active network's indexer (NETWORK env)."""
 
-    client, url = make_client()
-    click.echo(f'Indexer: {url}')
-
-    data = run_query(client, QUERY, limit)
-    operations = data['bridge_operation']
-    total = data['bridge_operation_aggregate']['aggregate']['count']
-
-    print_breakdown('Deposits by token', Counter(map(deposit_token, operations)))
-    print_breakdown('Deposits by status', Counter(op['status'] for op in operations))
-    print_coverage(len(operations), total, limit)
+    monitor_operations(DEPOSITS, limit, full_history, page_size, exact)
 
 
 monitor_deposits_command = cli_options.command(
     monitor_deposits,
     name='monitor_deposits',
-    options=[limit_option],
+    options=[limit_option, full_history_option, page_size_option, exact_option],
 )
@@ -0,0 +1,289 @@
+"""Prometheus/OpenMetrics exporter for the bridge operation statistics.
+
+Serves the `monitor` breakdowns (per token, status and kind) and the indexer lag
+as metrics on a local `/metrics` endpoint. A background thread refreshes them
+incrementally from a checkpoint of its own (the one of `bridge monitor` would be
+rewritten by both processes); scrapes only read
+the last rendered snapshot, so they are O(1) and never reach the indexer.
+"""
+
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterable, Optional
+
+import click
+
+from scripts import cli_options
+from scripts.helpers.formatting import accent, error
+from scripts.monitoring.common import indexer_lag, make_client, page_size_option
+from scripts.monitoring.follow import (
+    Checkpoint,
+    FollowedOperations,
+    default_checkpoint_path,
+)
+from scripts.networks import load_network
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _value(value: float) -> str:
+    # Full precision: `:g` would round timestamps and large counters to six
+    # significant digits.
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def _sample(name: str, labels: dict[str, str], value: float) -> str:
+    rendered = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+    if rendered:
+        return f'{name}{{{rendered}}} {_value(value)}'
+    return f'{name} {_value(value)}'
+
+
+def render_family(
+    name: str, kind: str, help: str, samples: Iterable[tuple[dict[str, str], float]]
+) -> list[str]:
+    lines = [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+    lines += [_sample(name, labels, value) for labels, value in samples]
+    return lines
+
+
+def render_metrics(
+    followed: list[FollowedOperations],
+    lag: dict[str, int],
+    refreshed_at: float,
+    refresh_errors: int,
+) -> str:
+    """Renders the current counters in the Prometheus text exposition format."""
+
+    lines = render_family(
+        'bridge_operations_total',
+        'counter',
+        'Bridge operations seen by the indexer.',
+        (({'type': f.spec.operation_type}, f.breakdowns.total) for f in followed),
+    )
+    lines += render_family(
+        'bridge_operations_in_flight',
+        'gauge',
+        'Bridge operations not completed yet.',
+        (({'type': f.spec.operation_type}, len(f.pending)) for f in followed),
+    )
+    names = sorted({name for f in followed for name in f.spec.breakdowns})
+    for name in names:
+        lines += render_family(
+            f'bridge_operations_by_{name}',
+            'gauge',
+            f'Bridge operations by {name}.',
+            (
+                ({'type': f.spec.operation_type, name: label}, count)
+                for f in followed
+                if name in f.breakdowns.counters
+                for label, count in sorted(f.breakdowns.counters[name].items())
+            ),
+        )
+    lines += render_family(
+        'bridge_indexer_lag_blocks',
+        'gauge',
+        'L1 blocks each indexer index trails the indexed head by.',
+        (({'index': index}, blocks) for index, blocks in sorted(lag.items())),
+    )
+    lines += render_family(
+        'bridge_exporter_last_refresh_timestamp_seconds',
+        'gauge',
+        'Unix time of the last successful refresh.',
+        [({}, refreshed_at)],
+    )
+    lines += render_family(
+        'bridge_exporter_refresh_errors_total',
+        'counter',
+        'Refreshes that failed (the previous snapshot kept being served).',
+        [({}, refresh_errors)],
+    )
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsSnapshot:
+    """The last rendered metrics page, swapped atomically by the refresher."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._body = b''
+
+    def set(self, text: str) -> None:
+        body = text.encode()
+        with self._lock:
+            self._body = body
+
+    def get(self) -> bytes:
+        with self._lock:
+            return self._body
+
+
+def serve_metrics(snapshot: MetricsSnapshot, host: str, port: int) -> None:
+    """Serves `snapshot` on `http://host:port/metrics` until interrupted."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = snapshot.get()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class Refresher(threading.Thread):
+    """Ticks the followed counters every `interval` seconds and re-renders the
+    snapshot. Failures keep the previous snapshot and are counted."""
+
+    def __init__(
+        self,
+        state: Checkpoint,
+        snapshot: MetricsSnapshot,
+        interval: int,
+        page_size: int,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.state = state
+        self.snapshot = snapshot
+        self.interval = interval
+        self.page_size = page_size
+        self.client, _ = make_client()
+        self.errors = 0
+        self.refreshed_at = 0.0
+        self.lag: dict[str, int] = {}
+
+    def refresh(self) -> None:
+        if self.state.is_new:
+            for followed in self.state:
+                followed.seed(self.client, self.page_size)
+            self.state.is_new = False
+        for followed in self.state:
+            followed.tick(self.client, self.page_size)
+        self.state.save()
+        self.lag = indexer_lag(self.client)
+        self.refreshed_at = time.time()
+
+    def render(self) -> None:
+        self.snapshot.set(
+            render_metrics(list(self.state), self.lag, self.refreshed_at, self.errors)
+        )
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as exc:
+                self.errors += 1
+                click.echo(error(f'Refresh failed: {exc}'), err=True)
+            self.render()
+            time.sleep(self.interval)
+
+
+host_option = click.option(
+    '--host',
+    default='127.0.0.1',
+    show_default=True,
+    help='Address to serve /metrics on.',
+)
+
+port_option = click.option(
+    '--port',
+    default=9464,
+    show_default=True,
+    help='Port to serve /metrics on.',
+)
+
+interval_option = click.option(
+    '--interval',
+    default=30,
+    show_default=True,
+    help='Seconds between background refreshes from the indexer.',
+)
+
+
+def default_exporter_checkpoint_path() -> Path:
+    return Path(f'.monitor-exporter-{load_network().name}.json')
+
+
+def exporter_checkpoint_path(checkpoint: Optional[Path]) -> Path:
+    """The exporter checkpoint, refusing the one `bridge monitor` keeps: both
+    processes would rewrite it and lose each other's ticks."""
+
+    path = checkpoint or default_exporter_checkpoint_path()
+    if path.resolve() == default_checkpoint_path().resolve():
+        raise click.BadParameter(
+            f'{path} is the `monitor` checkpoint; the exporter needs its own.',
+            param_hint='--checkpoint',
+        )
+    return path
+
+
+exporter_checkpoint_option = click.option(
+    '--checkpoint',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help='Checkpoint file, not shared with `monitor` '
+    + '(default: `.monitor-exporter-<network>.json` in the current dir).',
+)
+
+
+def monitor_exporter(
+    host: str,
+    port: int,
+    interval: int,
+    checkpoint: Optional[Path],
+    page_size: int,
+) -> None:
+    """Serves deposit/withdrawal stats and indexer lag as Prometheus metrics."""
+
+    state = Checkpoint(exporter_checkpoint_path(checkpoint), load_network().name)
+    snapshot = MetricsSnapshot()
+    refresher = Refresher(state, snapshot, interval, page_size)
+    refresher.render()
+    refresher.start()
+    click.echo(
+        'Serving metrics on '
+        + accent(f'http://{host}:{port}/metrics')
+        + f', refreshing every {interval}s'
+    )
+    serve_metrics(snapshot, host, port)
+
+
+monitor_exporter_command = cli_options.command(
+    monitor_exporter,
+    name='monitor_exporter',
+    options=[
+        host_option,
+        port_option,
+        interval_option,
+        exporter_checkpoint_option,
+        page_size_option,
+    ],
+)
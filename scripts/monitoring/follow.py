@@ -0,0 +1,269 @@
+"""Incremental deposit/withdrawal statistics with a persisted checkpoint.
+
+Instead of re-sampling the newest operations on every run, `bridge monitor` keeps
+running counters plus a cursor on `bridge_operation.updated_at` in a local JSON
+checkpoint, and each tick fetches only the rows created or changed since then. A
+cold start seeds the counters from exact server-side aggregates (see
+`aggregate_breakdowns`) rather than scanning the history.
+
+Operations that are not completed yet are remembered by id with the labels they
+were counted under, so that a later status/kind change moves the operation to its
+new labels instead of counting it twice. Completed operations are final in the
+indexer and are forgotten, which keeps the checkpoint bounded by the number of
+in-flight operations.
+"""
+
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import click
+from gql import Client
+
+from scripts import cli_options
+from scripts.helpers.formatting import accent
+from scripts.monitoring.common import (
+    Breakdowns,
+    OperationSpec,
+    aggregate_breakdowns,
+    iter_pages,
+    keyset_after,
+    make_client,
+    page_size_option,
+)
+from scripts.monitoring.deposits import DEPOSITS
+from scripts.monitoring.withdrawals import WITHDRAWALS
+from scripts.networks import load_network
+
+SPECS = [DEPOSITS, WITHDRAWALS]
+
+
+@dataclass
+class TickResult:
+    created: int = 0
+    updated: int = 0
+
+
+@dataclass
+class FollowedOperations:
+    """Running breakdowns for one operation type and the state needed to keep
+    them current: the `updated_at`/id cursor and the in-flight operations."""
+
+    spec: OperationSpec
+    breakdowns: Breakdowns
+    cursor: Optional[dict] = None
+    # operation id -> {breakdown: label} it is currently counted under
+    pending: dict[str, dict[str, str]] = field(default_factory=dict)
+
+    def labels(self, operation: dict) -> dict[str, str]:
+        return {name: key(operation) for name, key in self.spec.breakdowns.items()}
+
+    def apply(self, operation: dict) -> bool:
+        """Counts a created or changed operation; True if it was seen before."""
+
+        previous = self.pending.pop(operation['id'], None)
+        if previous is None:
+            self.breakdowns.total += 1
+        else:
+            for name, label in previous.items():
+                counter = self.breakdowns.counters[name]
+                counter[label] -= 1
+                if counter[label] <= 0:
+                    del counter[label]
+
+        labels = self.labels(operation)
+        for name, label in labels.items():
+            self.breakdowns.counters[name][label] += 1
+        if not operation['is_completed']:
+            self.pending[operation['id']] = labels
+        return previous is not None
+
+    def seed(self, client: Client, page_size: int) -> None:
+        """Initialises the counters without scanning the history: exact totals
+        from grouped aggregates, the in-flight operations, and a cursor at the
+        most recently updated row. The aggregates and the in-flight scan stop
+        at the cursor, so rows written meanwhile are left to the first tick
+        instead of being counted twice."""
+
+        newest = [
+            operation
+            for page in iter_pages(client, self.spec, 1, 1, column='updated_at')
+            for operation in page
+        ]
+        self.pending = {}
+        if not newest:
+            self.breakdowns = Breakdowns(self.spec)
+            self.cursor = None
+            return
+        seen = {'_not': keyset_after(newest[0], 'updated_at', ascending=True)}
+        self.breakdowns = aggregate_breakdowns(client, self.spec, seen)
+        in_flight = {'_and': [seen, {'is_completed': {'_eq': False}}]}
+        for page in iter_pages(client, self.spec, page_size, where=in_flight):
+            for operation in page:
+                self.pending[operation['id']] = self.labels(operation)
+        self.cursor = _cursor(newest[0])
+
+    def tick(self, client: Client, page_size: int) -> TickResult:
+        """Folds in every row created or updated since the cursor."""
+
+        result = TickResult()
+        pages = iter_pages(
+            client,
+            self.spec,
+            page_size,
+            column='updated_at',
+            ascending=True,
+            cursor=self.cursor,
+        )
+        for page in pages:
+            for operation in page:
+                if self.apply(operation):
+                    result.updated += 1
+                else:
+                    result.created += 1
+            self.cursor = _cursor(page[-1])
+        return result
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'cursor': self.cursor,
+            'total': self.breakdowns.total,
+            'counters': {
+                name: dict(counter)
+                for name, counter in self.breakdowns.counters.items()
+            },
+            'pending': self.pending,
+        }
+
+    @classmethod
+    def from_dict(
+        cls, spec: OperationSpec, data: Optional[dict[str, Any]]
+    ) -> 'FollowedOperations':
+        followed = cls(spec=spec, breakdowns=Breakdowns(spec))
+        if data is None:
+            return followed
+        followed.cursor = data['cursor']
+        followed.pending = data['pending']
+        followed.breakdowns.total = data['total']
+        for name, counter in data['counters'].items():
+            followed.breakdowns.counters[name] = Counter(counter)
+        return followed
+
+
+def _cursor(operation: dict) -> dict:
+    return {'id': operation['id'], 'updated_at': operation['updated_at']}
+
+
+class Checkpoint:
+    """The followed counters of every operation type, persisted as JSON."""
+
+    def __init__(self, path: Path, network: str) -> None:
+        self.path = path
+        self.network = network
+        data: dict[str, Any] = {}
+        if path.exists():
+            data = json.loads(path.read_text())
+            if data.get('network') != network:
+                raise click.ClickException(
+                    f'Checkpoint {path} belongs to network `{data.get("network")}`, '
+                    + f'not `{network}`.'
+                )
+        self.followed = {
+            spec.title: FollowedOperations.from_dict(spec, data.get(spec.title))
+            for spec in SPECS
+        }
+        self.is_new = not data
+
+    def save(self) -> None:
+        data = {
+            'network': self.network,
+            **{title: f.to_dict() for title, f in self.followed.items()},
+        }
+        # Write-then-rename so that a crash mid-write never loses the checkpoint.
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp.write_text(json.dumps(data))
+        tmp.replace(self.path)
+
+    def __iter__(self) -> Iterator[FollowedOperations]:
+        return iter(self.followed.values())
+
+
+def default_checkpoint_path() -> Path:
+    return Path(f'.monitor-{load_network().name}.json')
+
+
+follow_option = click.option(
+    '--follow',
+    is_flag=True,
+    default=False,
+    help='Keep running, fetching new/changed operations every --interval seconds.',
+)
+
+interval_option = click.option(
+    '--interval',
+    default=60,
+    show_default=True,
+    help='Seconds between ticks in --follow mode.',
+)
+
+checkpoint_option = click.option(
+    '--checkpoint',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help='Checkpoint file (default: `.monitor-<network>.json` in the current dir).',
+)
+
+
+def monitor(
+    follow: bool,
+    interval: int,
+    checkpoint: Optional[Path],
+    page_size: int,
+) -> None:
+    """Prints deposit and withdrawal stats, updated incrementally from a local
+    checkpoint: each run only fetches operations created or changed since the
+    previous one."""
+
+    client, url = make_client()
+    click.echo(f'Indexer: {url}')
+    state = Checkpoint(checkpoint or default_checkpoint_path(), load_network().name)
+
+    if state.is_new:
+        click.echo(f'No checkpoint at {state.path}, seeding from indexer aggregates.')
+        for followed in state:
+            followed.seed(client, page_size)
+        state.save()
+
+    try:
+        while True:
+            summary = []
+            for followed in state:
+                result = followed.tick(client, page_size)
+                summary.append(
+                    f'{followed.spec.title.lower()}: +{result.created} new, '
+                    + f'{result.updated} updated, {followed.breakdowns.total} total'
+                )
+                state.save()
+            if not follow:
+                break
+            stamp = datetime.now().strftime('%H:%M:%S')
+            click.echo(accent(stamp) + ' ' + '; '.join(summary))
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+    for followed in state:
+        followed.breakdowns.print()
+        click.echo()
+        click.echo(f'{len(followed.pending)} {followed.spec.title.lower()} in flight.')
+
+
+monitor_command = cli_options.command(
+    monitor,
+    name='monitor',
+    options=[follow_option, interval_option, checkpoint_option, page_size_option],
+)
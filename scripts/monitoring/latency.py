@@ -0,0 +1,311 @@
+"""Deposit/withdrawal latency distributions from the bridge indexer.
+
+Each operation type is read with its own query, selecting the timestamps its
+`stages` measure, such as the L1 deposit and the L2 mint, or the L2 withdrawal
+and its L1 execution; the shared monitoring queries stay unchanged. The rows are
+streamed once, page by page, and every completed stage is added to a
+log-bucketed histogram per token and per withdrawal kind, so p50/p90/p99 come
+out of a single pass with memory bounded by the bucket count.
+
+The indexer records no cementation time, so that stage is estimated from levels:
+an outbox message is executable once the commitment covering its level is
+cemented, at least a challenge window after the commitment's inbox level.
+"""
+
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+import click
+from gql import gql
+from pytezos import pytezos
+from tabulate import tabulate
+
+from scripts import cli_options
+from scripts.helpers.formatting import accent
+from scripts.monitoring.common import (
+    OperationSpec,
+    field_at,
+    full_history_option,
+    iter_pages,
+    make_client,
+    page_size_option,
+)
+from scripts.helpers.rollup_timing import RollupTiming
+from scripts.monitoring.deposits import DEPOSITS
+from scripts.monitoring.withdrawals import WITHDRAWALS
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Breakdowns latencies are grouped by; status is left out as only completed
+# stages are measured anyway.
+LATENCY_BREAKDOWNS = ('token', 'kind')
+
+DEPOSIT_LATENCY_QUERY = gql(
+    """
+    query DepositLatencies(
+        $limit: Int!
+        $where: bridge_operation_bool_exp!
+        $order_by: [bridge_operation_order_by!]
+    ) {
+        bridge_operation(where: $where, order_by: $order_by, limit: $limit) {
+            id
+            created_at
+            updated_at
+            is_completed
+            status
+            deposit {
+                l1_transaction { timestamp ticket { token { symbol id } } }
+                l2_transaction { timestamp }
+            }
+        }
+    }
+    """
+)
+
+WITHDRAWAL_LATENCY_QUERY = gql(
+    """
+    query WithdrawalLatencies(
+        $limit: Int!
+        $where: bridge_operation_bool_exp!
+        $order_by: [bridge_operation_order_by!]
+    ) {
+        bridge_operation(where: $where, order_by: $order_by, limit: $limit) {
+            id
+            created_at
+            updated_at
+            is_completed
+            status
+            kind
+            withdrawal {
+                l2_transaction { timestamp ticket { token { symbol id } } }
+                outbox_message { level commitment { inbox_level } }
+                l1_transaction { timestamp }
+            }
+        }
+    }
+    """
+)
+
+# Seconds an operation took through a stage, None if it has not completed it.
+Stage = Callable[[dict], Optional[float]]
+
+
+@dataclass
+class LatencyHistogram:
+    """Log-bucketed histogram of durations in seconds.
+
+    Bucket `i` holds durations in `(growth**(i-1), growth**i]`, so a quantile is
+    reported with at most `growth - 1` relative error (5% by default) whatever
+    the range, and memory grows with the log of the longest duration only.
+    """
+
+    growth: float = 1.05
+    buckets: Counter = field(default_factory=Counter)
+    count: int = 0
+    max: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        seconds = max(seconds, 0.0)
+        index = math.ceil(math.log(seconds, self.growth)) if seconds > 1 else 0
+        self.buckets[index] += 1
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The upper bound of the bucket holding the `q` quantile (capped by the
+        largest duration seen), or None when the histogram is empty."""
+
+        if not self.count:
+            return None
+        rank = max(math.ceil(q * self.count), 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return float(min(self.growth**index, self.max))
+        return self.max
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '-'
+    seconds = round(seconds)
+    parts = []
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            parts.append(f'{seconds // size}{unit}')
+            seconds %= size
+    if seconds or not parts:
+        parts.append(f'{seconds}s')
+    return ' '.join(parts[:2])
+
+
+@dataclass
+class StageLatencies:
+    """Histograms of one stage: overall and per `(breakdown, label)`."""
+
+    overall: LatencyHistogram = field(default_factory=LatencyHistogram)
+    groups: dict[tuple[str, str], LatencyHistogram] = field(
+        default_factory=lambda: defaultdict(LatencyHistogram)
+    )
+
+    def add(self, labels: dict[str, str], seconds: float) -> None:
+        self.overall.add(seconds)
+        for name, label in labels.items():
+            self.groups[name, label].add(seconds)
+
+
+def between(start_path: str, end_path: str) -> Stage:
+    """The stage between the timestamps at two dotted paths of a row"""
+
+    def measure(operation: dict) -> Optional[float]:
+        start = parse_timestamp(field_at(operation, start_path))
+        end = parse_timestamp(field_at(operation, end_path))
+        if start is None or end is None:
+            return None
+        return (end - start).total_seconds()
+
+    return measure
+
+
+def until_cementable(timing: RollupTiming) -> Stage:
+    """The stage from an L2 withdrawal to its outbox message becoming
+    executable, estimated from the outbox level (the L1 level the withdrawal
+    was included at) and the inbox level of the commitment covering it."""
+
+    def measure(operation: dict) -> Optional[float]:
+        outbox_message = field_at(operation, 'withdrawal.outbox_message') or {}
+        inbox_level = field_at(outbox_message, 'commitment.inbox_level')
+        if outbox_message.get('level') is None or inbox_level is None:
+            return None
+        blocks = int(inbox_level) + timing.challenge_window - outbox_message['level']
+        return float(blocks * timing.block_time)
+
+    return measure
+
+
+@dataclass(frozen=True)
+class LatencySpec:
+    """An operation type read with a query selecting what its stages need"""
+
+    operations: OperationSpec
+    stages: dict[str, Stage]
+
+
+def latency_specs(timing: RollupTiming) -> list[LatencySpec]:
+    return [
+        LatencySpec(
+            replace(DEPOSITS, query=DEPOSIT_LATENCY_QUERY),
+            {
+                'L1 deposit -> L2 mint': between(
+                    'deposit.l1_transaction.timestamp',
+                    'deposit.l2_transaction.timestamp',
+                ),
+            },
+        ),
+        LatencySpec(
+            replace(WITHDRAWALS, query=WITHDRAWAL_LATENCY_QUERY),
+            {
+                'L2 withdrawal -> cementation (estimated)': until_cementable(timing),
+                'L2 withdrawal -> L1 execution': between(
+                    'withdrawal.l2_transaction.timestamp',
+                    'withdrawal.l1_transaction.timestamp',
+                ),
+            },
+        ),
+    ]
+
+
+@dataclass
+class Latencies:
+    """Latency histograms for every stage of one operation type."""
+
+    spec: LatencySpec
+    stages: dict[str, StageLatencies] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.stages = {name: StageLatencies() for name in self.spec.stages}
+
+    def fold(self, operations: Iterable[dict]) -> None:
+        for operation in operations:
+            labels = {
+                name: key(operation)
+                for name, key in self.spec.operations.breakdowns.items()
+                if name in LATENCY_BREAKDOWNS
+            }
+            for name, measure in self.spec.stages.items():
+                seconds = measure(operation)
+                if seconds is not None:
+                    self.stages[name].add(labels, seconds)
+
+    def print(self) -> None:
+        headers = ['', 'count'] + [f'p{q * 100:g}' for q in QUANTILES]
+        for stage, latencies in self.stages.items():
+            for name in LATENCY_BREAKDOWNS:
+                if name not in self.spec.operations.breakdowns:
+                    continue
+                histograms = sorted(
+                    (
+                        (label, histogram)
+                        for (group, label), histogram in latencies.groups.items()
+                        if group == name
+                    ),
+                    key=lambda item: item[1].count,
+                    reverse=True,
+                )
+                histograms.append(('ALL', latencies.overall))
+                rows = [
+                    [label, histogram.count]
+                    + [format_duration(histogram.quantile(q)) for q in QUANTILES]
+                    for label, histogram in histograms
+                ]
+                click.echo()
+                title = self.spec.operations.title
+                click.echo(accent(f'{title}: {stage}, by {name}'))
+                click.echo(tabulate(rows, headers=headers, tablefmt='simple'))
+
+
+limit_option = click.option(
+    '--limit',
+    default=1000,
+    show_default=True,
+    help='How many of the most recent operations of each type to sample.',
+)
+
+
+def monitor_latency(
+    limit: int, full_history: bool, page_size: int, tezos_rpc_url: str
+) -> None:
+    """Prints deposit and withdrawal latency percentiles per token and kind."""
+
+    client, url = make_client()
+    timing = RollupTiming.from_client(pytezos.using(shell=tezos_rpc_url))
+    click.echo(f'Indexer: {url}')
+    for spec in latency_specs(timing):
+        latencies = Latencies(spec)
+        for page in iter_pages(
+            client, spec.operations, page_size, None if full_history else limit
+        ):
+            latencies.fold(page)
+        latencies.print()
+    click.echo()
+    click.echo('Percentiles are bucket upper bounds, accurate to within 5%.')
+
+
+monitor_latency_command = cli_options.command(
+    monitor_latency,
+    name='monitor_latency',
+    options=[
+        limit_option,
+        full_history_option,
+        page_size_option,
+        cli_options.tezos_rpc_url,
+    ],
+)
@@ -1,17 +1,17 @@
 """Withdrawal statistics from the bridge indexer: totals, by token, by status,
 and by kind (regular vs the fast-withdrawal variants)."""
 
-from collections import Counter
-
 import click
 from gql import gql
 
 from scripts import cli_options
 from scripts.monitoring.common import (
-    make_client,
-    print_breakdown,
-    print_coverage,
-    run_query,
+    OperationSpec,
+    exact_option,
+    full_history_option,
+    monitor_operations,
+    page_size_option,
+    token_label,
 )
 
 # bridge_operation.kind for withdrawals; null means a regular (slow) withdrawal.
@@ -24,19 +24,20 @@ KIND_LABELS = {
 
 QUERY = gql(
     """
-    query Withdrawals($limit: Int!) {
-        bridge_operation(
-            where: {type: {_eq: "withdrawal"}}
-            order_by: {created_at: desc}
-            limit: $limit
-        ) {
+    query Withdrawals(
+        $limit: Int!
+        $where: bridge_operation_bool_exp!
+        $order_by: [bridge_operation_order_by!]
+    ) {
+        bridge_operation(where: $where, order_by: $order_by, limit: $limit) {
+            id
+            created_at
+            updated_at
+            is_completed
             status
             kind
             withdrawal { l2_transaction { ticket { token { symbol id } } } }
         }
-        bridge_operation_aggregate(where: {type: {_eq: "withdrawal"}}) {
-            aggregate { count }
-        }
     }
     """
 )
@@ -52,9 +53,7 @@ def withdrawal_token(operation: dict) -> str:
     withdrawal = operation.get('withdrawal') or {}
     l2_transaction = withdrawal.get('l2_transaction') or {}
     ticket = l2_transaction.get('ticket') or {}
-    token = ticket.get('token') or {}
-    # Fall back to the token id (address) when the symbol is not in the indexer.
-    return token.get('symbol') or token.get('id') or 'unknown'
+    return token_label(ticket.get('token') or {})
 
 
 def withdrawal_kind(operation: dict) -> str:
@@ -64,6 +63,22 @@ def withdrawal_kind(operation: dict) -> str:
     return KIND_LABELS.get(kind, kind or 'unknown')
 
 
+WITHDRAWALS = OperationSpec(
+    title='Withdrawals',
+    operation_type='withdrawal',
+    query=QUERY,
+    breakdowns={
+        'token': withdrawal_token,
+        'status': lambda operation: operation['status'],
+        'kind': withdrawal_kind,
+    },
+    token_filter=lambda token_id: {
+        'withdrawal': {
+            'l2_transaction': {'ticket': {'token': {'id': {'_eq': token_id}}}}
+        }
+    },
+)
+
 limit_option = click.option(
     '--limit',
     default=1000,
@@ -72,24 +87,16 @@ limit_option = click.option(
 )
 
 
-def monitor_withdrawals(limit: int) -> None:
+def monitor_withdrawals(
+    limit: int, full_history: bool, page_size: int, exact: bool
+) -> None:
     """Prints withdrawal stats from the active network's indexer (NETWORK env)."""
 
-    client, url = make_client()
-    click.echo(f'Indexer: {url}')
-
-    data = run_query(client, QUERY, limit)
-    operations = data['bridge_operation']
-    total = data['bridge_operation_aggregate']['aggregate']['count']
-
-    print_breakdown('Withdrawals by token', Counter(map(withdrawal_token, operations)))
-    print_breakdown('Withdrawals by status', Counter(op['status'] for op in operations))
-    print_breakdown('Withdrawals by kind', Counter(map(withdrawal_kind, operations)))
-    print_coverage(len(operations), total, limit)
+    monitor_operations(WITHDRAWALS, limit, full_history, page_size, exact)
 
 
 monitor_withdrawals_command = cli_options.command(
     monitor_withdrawals,
     name='monitor_withdrawals',
-    options=[limit_option],
+    options=[limit_option, full_history_option, page_size_option, exact_option],
 )
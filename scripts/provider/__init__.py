@@ -0,0 +1,12 @@
+from scripts.provider.liquidity import forecast_liquidity
+from scripts.provider.mirror import mirror_withdrawals
+from scripts.provider.payouts import payout_fast_withdrawals
+
+
+# Re-export the typed core functions for programmatic callers; the CLI wiring
+# lives in scripts/cli.py.
+__all__ = [
+    'forecast_liquidity',
+    'mirror_withdrawals',
+    'payout_fast_withdrawals',
+]
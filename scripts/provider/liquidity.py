@@ -0,0 +1,304 @@
+"""Liquidity forecast of a fast-withdrawal service provider.
+
+A payout advances XTZ that comes back, as the full withdrawal amount, only
+when the outbox message of the withdrawal is executed on L1: one commitment
+period plus the challenge window after the withdrawal was made on L2 (both
+L1 protocol constants, in blocks). The forecast keeps the provider's payouts
+still waiting for settlement, sorted by when they free up, so the balance
+curve is a running sum over them.
+
+A payout gives the withdrawal two indexer rows: the withdrawer's
+`fast_withdrawal_payed_out` one, completed right away, and the provider's
+`fast_withdrawal_service_provider` one, whose `l1_account` is the provider
+and which goes CREATED, SEALED and FINISHED, completed only at settlement.
+The forecast follows the latter with an `updated_at` cursor and drops a
+payout as soon as its row is completed.
+"""
+
+import bisect
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import click
+from gql import Client
+from tabulate import tabulate
+
+from scripts import cli_options
+from scripts.etherlink.xtz_fast_withdraw import fast_withdrawal_contract_option
+from scripts.helpers.contracts.fast_withdrawal import (
+    FastWithdrawal,
+    Withdrawal,
+    create_withdrawal_from_l2_transaction,
+)
+from scripts.helpers.formatting import accent, echo_variable
+from scripts.helpers.rollup_timing import RollupTiming
+from scripts.helpers.utility import get_tezos_client
+from scripts.monitoring.common import iter_pages, make_client, page_size_option
+from scripts.monitoring.follow import follow_option, interval_option
+from scripts.monitoring.latency import format_duration, parse_timestamp
+from scripts.provider.payouts import FAST_WITHDRAWALS, make_candidate
+
+# bridge_operation.kind of the provider's side of a paid out withdrawal, not
+# completed until the withdrawal settles:
+PROVIDER_KIND = 'fast_withdrawal_service_provider'
+
+
+@dataclass(frozen=True)
+class LockedPayout:
+    operation_id: str
+    withdrawal_id: int
+    # Mutez advanced by the provider, and paid back at settlement:
+    advanced: int
+    returns: int
+    frees_at: int
+
+
+class LiquidityForecast:
+    """Payouts waiting for settlement, ordered by when they free up. Adding
+    or dropping one is a sorted insert or delete; the totals are kept as
+    running sums."""
+
+    def __init__(self) -> None:
+        self.payouts: dict[str, LockedPayout] = {}
+        self.schedule: list[tuple[int, str]] = []
+        self.locked = 0
+        self.returns = 0
+
+    def add(self, payout: LockedPayout) -> None:
+        self.remove(payout.operation_id)
+        self.payouts[payout.operation_id] = payout
+        bisect.insort(self.schedule, (payout.frees_at, payout.operation_id))
+        self.locked += payout.advanced
+        self.returns += payout.returns
+
+    def remove(self, operation_id: str) -> None:
+        payout = self.payouts.pop(operation_id, None)
+        if payout is None:
+            return
+        del self.schedule[
+            bisect.bisect_left(self.schedule, (payout.frees_at, operation_id))
+        ]
+        self.locked -= payout.advanced
+        self.returns -= payout.returns
+
+    def overdue(self, now: int) -> list[LockedPayout]:
+        """Payouts settleable already, waiting for their outbox execution"""
+
+        end = bisect.bisect_right(self.schedule, now, key=lambda item: item[0])
+        return [self.payouts[operation_id] for _, operation_id in self.schedule[:end]]
+
+    def curve(
+        self, balance: int, now: int, bucket: int
+    ) -> list[tuple[int, int, int, int]]:
+        """The balance curve starting from `balance` at `now`: one
+        `(until, freed, balance, locked)` step per `bucket` seconds in which
+        some payouts free up. Overdue ones count as freed in the first step."""
+
+        steps: list[tuple[int, int, int, int]] = []
+        locked = self.locked
+        for frees_at, operation_id in self.schedule:
+            # Rounded up to the end of its bucket:
+            until = now - (-max(frees_at - now, 0) // bucket) * bucket
+            payout = self.payouts[operation_id]
+            if not steps or steps[-1][0] != until:
+                steps.append((until, 0, balance, locked))
+            _, freed, balance, locked = steps[-1]
+            balance += payout.returns
+            locked -= payout.advanced
+            steps[-1] = (until, freed + payout.returns, balance, locked)
+        return steps
+
+
+class LiquidityTracker:
+    """The forecast of one provider on one FastWithdrawal contract, kept up
+    to date from the indexer."""
+
+    def __init__(
+        self,
+        fast_withdrawal: FastWithdrawal,
+        indexer: Client,
+        provider: str,
+        timing: RollupTiming,
+        page_size: int,
+    ) -> None:
+        self.fast_withdrawal = fast_withdrawal
+        self.indexer = indexer
+        self.provider = provider
+        self.timing = timing
+        self.page_size = page_size
+        config = fast_withdrawal.read_storage()['config']
+        self.expiration_seconds = int(config['expiration_seconds']())
+        self.forecast = LiquidityForecast()
+        self.cursor: Optional[dict] = None
+
+    def make_payout(self, operation: dict, withdrawal: Withdrawal) -> LockedPayout:
+        # The provider's row is created when the payout is indexed, so its
+        # creation time tells whether the discounted or the full amount was
+        # advanced:
+        paid_at = parse_timestamp(operation['created_at'])
+        now = int(paid_at.timestamp()) if paid_at else withdrawal.timestamp
+        candidate = make_candidate(withdrawal, self.expiration_seconds, now, 0)
+        advanced = candidate.payout if candidate else withdrawal.full_amount
+        return LockedPayout(
+            operation_id=operation['id'],
+            withdrawal_id=withdrawal.withdrawal_id,
+            advanced=advanced,
+            returns=withdrawal.full_amount,
+            frees_at=withdrawal.timestamp + self.timing.settlement_delay,
+        )
+
+    def apply(self, operations: Iterable[dict]) -> None:
+        """Folds in a page of rows: the provider's unsettled ones are locked,
+        any other state of a row unlocks it."""
+
+        for operation in operations:
+            transaction = (operation.get('withdrawal') or {}).get('l2_transaction')
+            self.forecast.remove(operation['id'])
+            if (
+                operation['kind'] == PROVIDER_KIND
+                and operation['l1_account'] == self.provider
+                and not operation['is_completed']
+                and transaction
+                and transaction.get('fast_payload')
+            ):
+                withdrawal = create_withdrawal_from_l2_transaction(transaction)
+                self.forecast.add(self.make_payout(operation, withdrawal))
+
+    def seed(self) -> None:
+        """Loads the provider's payouts not settled yet and starts the cursor
+        at the most recently updated row."""
+
+        newest = [
+            operation
+            for page in iter_pages(
+                self.indexer, FAST_WITHDRAWALS, 1, 1, column='updated_at'
+            )
+            for operation in page
+        ]
+        pending = {
+            'kind': {'_eq': PROVIDER_KIND},
+            'l1_account': {'_eq': self.provider},
+            'is_completed': {'_eq': False},
+        }
+        for page in iter_pages(
+            self.indexer, FAST_WITHDRAWALS, self.page_size, where=pending
+        ):
+            self.apply(page)
+        self.cursor = newest[0] if newest else None
+
+    def follow(self) -> None:
+        """Folds in every row created or updated since the cursor."""
+
+        pages = iter_pages(
+            self.indexer,
+            FAST_WITHDRAWALS,
+            self.page_size,
+            column='updated_at',
+            ascending=True,
+            cursor=self.cursor,
+        )
+        for page in pages:
+            self.apply(page)
+            self.cursor = page[-1]
+
+
+def format_xtz(mutez: int) -> str:
+    return f'{mutez / 10**6:,.6f}'
+
+
+def print_forecast(
+    forecast: LiquidityForecast, balance: int, now: int, bucket: int
+) -> None:
+    click.echo()
+    click.echo(
+        accent('Locked: ')
+        + f'{format_xtz(forecast.locked)} XTZ in {len(forecast.payouts)} payouts, '
+        + f'returning {format_xtz(forecast.returns)} XTZ'
+    )
+    overdue = forecast.overdue(now)
+    if overdue:
+        click.echo(
+            f'{len(overdue)} payouts are settleable already, '
+            + 'waiting for their outbox message execution'
+        )
+    rows = [
+        (
+            f'in {format_duration(until - now)}' if until > now else 'now',
+            format_xtz(freed),
+            format_xtz(balance),
+            format_xtz(locked),
+        )
+        for until, freed, balance, locked in forecast.curve(balance, now, bucket)
+    ]
+    click.echo(
+        tabulate(
+            rows,
+            headers=['frees up', 'freed XTZ', 'balance XTZ', 'still locked XTZ'],
+            tablefmt='simple',
+        )
+    )
+
+
+def forecast_liquidity(
+    fast_withdrawal_contract: str,
+    provider: Optional[str],
+    bucket: int,
+    follow: bool,
+    interval: int,
+    page_size: int,
+    tezos_private_key: str,
+    tezos_rpc_url: str,
+) -> None:
+    """Forecasts when the capital a provider advanced in payouts frees up"""
+
+    manager = get_tezos_client(tezos_rpc_url, tezos_private_key)
+    provider = provider or manager.key.public_key_hash()
+    fast_withdrawal = FastWithdrawal.from_address(manager, fast_withdrawal_contract)
+    timing = RollupTiming.from_client(manager)
+    indexer, indexer_url = make_client()
+    tracker = LiquidityTracker(fast_withdrawal, indexer, provider, timing, page_size)
+
+    click.echo('Forecasting fast withdrawal liquidity:')
+    echo_variable('  - ', 'Service provider', provider)
+    echo_variable('  - ', 'Fast Withdrawal contract', fast_withdrawal_contract)
+    echo_variable('  - ', 'Indexer', indexer_url)
+    echo_variable('  - ', 'Settlement delay', format_duration(timing.settlement_delay))
+
+    tracker.seed()
+    while True:
+        balance = int(manager.account(provider)['balance'])
+        print_forecast(tracker.forecast, balance, int(time.time()), bucket)
+        if not follow:
+            return
+        time.sleep(interval)
+        tracker.follow()
+
+
+provider_option = click.option(
+    '--provider',
+    default=None,
+    help='Service provider address (default: the address of the Tezos key).',
+)
+bucket_option = click.option(
+    '--bucket',
+    default=3600,
+    show_default=True,
+    help='Seconds per step of the balance curve.',
+)
+
+
+forecast_liquidity_command = cli_options.command(
+    forecast_liquidity,
+    name='forecast_liquidity',
+    options=[
+        fast_withdrawal_contract_option,
+        provider_option,
+        bucket_option,
+        follow_option,
+        interval_option,
+        page_size_option,
+        cli_options.tezos_private_key,
+        cli_options.tezos_rpc_url,
+    ],
+)
@@ -0,0 +1,448 @@
+"""Local mirror of the FastWithdrawal `withdrawals` big_map.
+
+The contract answers status queries only through its `get_status` view, one
+withdrawal per simulation. The mirror follows the big_map diffs instead: the
+`lazy_storage_diff` of every applied operation in the L1 blocks (or the big_map
+updates of a TzKT-compatible API), and keeps a key hash -> status map, saved to
+a JSON file so that later runs only read the blocks produced since. A status
+lookup is a dict read. Every change is handed to the subscribed listeners, so
+the payout and settlement engines react to payouts and cementations as they
+are included instead of polling.
+"""
+
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Protocol
+
+import click
+import requests
+from pytezos import pytezos
+from pytezos.michelson.types.big_map import BigMapType
+
+from scripts import cli_options
+from scripts.etherlink.xtz_fast_withdraw import fast_withdrawal_contract_option
+from scripts.helpers.contracts.fast_withdrawal import (
+    Cemented,
+    FastWithdrawal,
+    PaidOut,
+    Status,
+    Withdrawal,
+)
+from scripts.helpers.formatting import accent, echo_variable, error
+from scripts.helpers.utility import make_rpc_session
+from scripts.networks import load_network
+
+# Blocks behind head before their diffs are applied; Tenderbake blocks are
+# final after two more, so the mirror never has to roll back:
+DEFAULT_CONFIRMATIONS = 2
+# Blocks fetched concurrently from the node in one round:
+DEFAULT_CONCURRENCY = 8
+TZKT_PAGE_SIZE = 1000
+# Levels read and applied between two saves of the mirror file:
+SYNC_CHUNK_LEVELS = 1000
+
+
+@dataclass(frozen=True)
+class BigMapUpdate:
+    level: int
+    key_hash: str
+    # Micheline of the new value, None when the key is removed:
+    value: Optional[dict]
+
+
+@dataclass(frozen=True)
+class StatusChange:
+    level: int
+    key_hash: str
+    old: Status
+    new: Status
+
+
+StatusListener = Callable[[StatusChange], None]
+
+
+class DiffSource(Protocol):
+    def head_level(self) -> int: ...
+
+    def read(self, ptr: int, from_level: int, to_level: int) -> list[BigMapUpdate]:
+        """Updates of the big_map `ptr` in the levels, in the order applied"""
+
+
+def iter_operation_results(operation: dict) -> Iterator[dict]:
+    """Results of the applied contents of a manager operation, including the
+    internal operations (e.g. the transfers of an executed outbox message)."""
+
+    for content in operation.get('contents', []):
+        metadata = content.get('metadata') or {}
+        results = [metadata.get('operation_result') or {}]
+        results += [
+            internal.get('result') or {}
+            for internal in metadata.get('internal_operation_results', [])
+        ]
+        for result in results:
+            if result.get('status') == 'applied':
+                yield result
+
+
+def read_block_updates(
+    operations: list[dict], ptr: int, level: int
+) -> list[BigMapUpdate]:
+    updates = []
+    for operation in operations:
+        for result in iter_operation_results(operation):
+            for diff in result.get('lazy_storage_diff', []):
+                if diff.get('kind') != 'big_map' or int(diff['id']) != ptr:
+                    continue
+                for update in diff['diff'].get('updates', []):
+                    updates.append(
+                        BigMapUpdate(level, update['key_hash'], update.get('value'))
+                    )
+    return updates
+
+
+class NodeDiffSource:
+    """Reads the diffs from the manager operations of the L1 blocks, fetching
+    up to `concurrency` blocks at a time over one pooled session."""
+
+    def __init__(self, rpc_url: str, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        self.base_url = rpc_url.rstrip('/')
+        self.concurrency = concurrency
+        self.session = make_rpc_session(concurrency)
+
+    def get(self, path: str) -> requests.Response:
+        response = self.session.get(
+            f'{self.base_url}/chains/main/blocks/{path}', timeout=60
+        )
+        response.raise_for_status()
+        return response
+
+    def head_level(self) -> int:
+        return int(self.get('head/header').json()['level'])
+
+    def read(self, ptr: int, from_level: int, to_level: int) -> list[BigMapUpdate]:
+        def read_level(level: int) -> list[BigMapUpdate]:
+            # Validation pass 3 holds the manager operations:
+            operations = self.get(f'{level}/operations/3').json()
+            return read_block_updates(operations, ptr, level)
+
+        levels = range(from_level, to_level + 1)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return [u for updates in executor.map(read_level, levels) for u in updates]
+
+
+class TzktDiffSource:
+    """Reads the big_map updates of a TzKT-compatible API (e.g. a local TzKT
+    instance), a page of `page_size` updates per request."""
+
+    def __init__(self, api_url: str, page_size: int = TZKT_PAGE_SIZE) -> None:
+        self.api_url = api_url.rstrip('/')
+        self.page_size = page_size
+        self.session = requests.Session()
+
+    def get(self, path: str, params: Optional[dict] = None) -> list | dict:
+        response = self.session.get(
+            f'{self.api_url}/v1/{path}', params=params, timeout=60
+        )
+        response.raise_for_status()
+        result: list | dict = response.json()
+        return result
+
+    def head_level(self) -> int:
+        head = self.get('head')
+        assert isinstance(head, dict)
+        return int(head['level'])
+
+    def read(self, ptr: int, from_level: int, to_level: int) -> list[BigMapUpdate]:
+        updates: list[BigMapUpdate] = []
+        last_id = -1
+        while True:
+            page = self.get(
+                f'bigmaps/{ptr}/updates',
+                {
+                    'level.ge': from_level,
+                    'level.le': to_level,
+                    'id.gt': last_id,
+                    'sort.asc': 'id',
+                    'limit': self.page_size,
+                    # Raw Micheline, decoded the same way as node diffs:
+                    'micheline': 2,
+                },
+            )
+            assert isinstance(page, list)
+            for item in page:
+                if item['action'] in ('add_key', 'update_key', 'remove_key'):
+                    value = (
+                        None
+                        if item['action'] == 'remove_key'
+                        else item['content']['value']
+                    )
+                    updates.append(
+                        BigMapUpdate(item['level'], item['content']['hash'], value)
+                    )
+            if len(page) < self.page_size:
+                return updates
+            last_id = page[-1]['id']
+
+
+def status_to_dict(status: Status) -> Optional[dict]:
+    """The inverse of `Status.from_dict`, JSON-serializable"""
+
+    if isinstance(status.value, PaidOut):
+        return {'paid_out': status.value.provider}
+    if isinstance(status.value, Cemented):
+        return {'cemented': None}
+    return None
+
+
+class WithdrawalsMirror:
+    """Statuses of the withdrawals in the `withdrawals` big_map, by key hash,
+    as of `next_level - 1`. `sync` reads the new blocks; queries never reach
+    the node. Withdrawals missing from the mirror are reported with an empty
+    status, so it has to follow the big_map from the contract origination
+    (`start_level`) to be complete."""
+
+    def __init__(
+        self,
+        big_map: BigMapType,
+        source: DiffSource,
+        start_level: Optional[int] = None,
+        path: Optional[Path] = None,
+        confirmations: int = DEFAULT_CONFIRMATIONS,
+    ) -> None:
+        self.big_map = big_map
+        self.value_type = type(big_map).args[1]
+        self.source = source
+        self.path = path
+        self.next_level = start_level
+        self.confirmations = confirmations
+        self.statuses: dict[str, Status] = {}
+        self.listeners: list[StatusListener] = []
+        self.key_hashes: dict[tuple, str] = {}
+        self.lock = threading.RLock()
+        # Modification time of the mirror file as last loaded or saved:
+        self.file_mtime: Optional[int] = None
+        if path is not None and path.exists():
+            self.load(path)
+
+    @property
+    def ptr(self) -> int:
+        return int(self.big_map.ptr)  # type: ignore[arg-type]
+
+    def subscribe(self, listener: StatusListener) -> None:
+        self.listeners.append(listener)
+
+    def key_hash(self, withdrawal: Withdrawal) -> str:
+        # Packing the key is the slow part of a lookup, so it is done once:
+        key = withdrawal.as_tuple()
+        if key not in self.key_hashes:
+            self.key_hashes[key] = self.big_map.get_key_hash(key)  # type: ignore[no-untyped-call]
+        return self.key_hashes[key]
+
+    def get_status(self, withdrawal: Withdrawal) -> Status:
+        return self.get_status_by_key_hash(self.key_hash(withdrawal))
+
+    def get_status_by_key_hash(self, key_hash: str) -> Status:
+        return self.statuses.get(key_hash) or Status(value=None)
+
+    def apply(self, update: BigMapUpdate) -> Optional[StatusChange]:
+        old = self.get_status_by_key_hash(update.key_hash)
+        if update.value is None:
+            new = Status(value=None)
+            self.statuses.pop(update.key_hash, None)
+        else:
+            value = self.value_type.from_micheline_value(update.value)
+            new = Status.from_dict(value.to_python_object())
+            self.statuses[update.key_hash] = new
+        if new == old:
+            return None
+        return StatusChange(update.level, update.key_hash, old, new)
+
+    def sync(self, to_level: Optional[int] = None) -> list[StatusChange]:
+        """Applies the diffs up to `to_level` (the last confirmed level by
+        default), notifies the listeners and returns the changes. The range is
+        read, applied and saved `SYNC_CHUNK_LEVELS` levels at a time, so that
+        a long catch-up keeps its progress if it is interrupted."""
+
+        with self.lock:
+            confirmed = self.source.head_level() - self.confirmations
+            to_level = confirmed if to_level is None else min(to_level, confirmed)
+            if self.next_level is None:
+                self.next_level = confirmed + 1
+        changes = []
+        while True:
+            with self.lock:
+                assert self.next_level is not None
+                if self.next_level > to_level:
+                    break
+                chunk_end = min(to_level, self.next_level + SYNC_CHUNK_LEVELS - 1)
+                chunk_changes = []
+                for update in self.source.read(self.ptr, self.next_level, chunk_end):
+                    change = self.apply(update)
+                    if change is not None:
+                        chunk_changes.append(change)
+                self.next_level = chunk_end + 1
+                if self.path is not None:
+                    self.save(self.path)
+            for change in chunk_changes:
+                for listener in self.listeners:
+                    listener(change)
+            changes += chunk_changes
+        return changes
+
+    def reload(self) -> bool:
+        """Re-reads the mirror file if another process saved it since, for a
+        reader of the file kept by `mirror_withdrawals`, which is its only
+        writer. Listeners are not notified. Returns whether it was re-read."""
+
+        if self.path is None or not self.path.exists():
+            return False
+        with self.lock:
+            if self.path.stat().st_mtime_ns == self.file_mtime:
+                return False
+            self.load(self.path)
+        return True
+
+    def load(self, path: Path) -> None:
+        self.file_mtime = path.stat().st_mtime_ns
+        data = json.loads(path.read_text())
+        if data['big_map'] != self.ptr:
+            raise click.ClickException(
+                f'Mirror {path} follows big_map {data["big_map"]}, not {self.ptr}.'
+            )
+        self.next_level = data['next_level']
+        self.statuses = {
+            key_hash: Status.from_dict(status)
+            for key_hash, status in data['statuses'].items()
+        }
+
+    def save(self, path: Path) -> None:
+        data = {
+            'big_map': self.ptr,
+            'next_level': self.next_level,
+            'statuses': {
+                key_hash: status_to_dict(status)
+                for key_hash, status in self.statuses.items()
+            },
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temporary name, so that two writers by mistake cannot
+        # rename each other's half-written file:
+        with tempfile.NamedTemporaryFile(
+            'w', dir=path.parent, prefix=path.name, suffix='.tmp', delete=False
+        ) as tmp:
+            tmp.write(json.dumps(data))
+        Path(tmp.name).replace(path)
+        self.file_mtime = path.stat().st_mtime_ns
+
+
+def describe_change(change: StatusChange) -> str:
+    status = change.new.value
+    if isinstance(status, PaidOut):
+        event = f'paid out by {status.provider}'
+    elif isinstance(status, Cemented):
+        event = 'cemented'
+    else:
+        event = 'removed'
+    return f'Level {change.level}: withdrawal {accent(change.key_hash)} {event}'
+
+
+def default_mirror_path() -> Path:
+    return Path(f'.withdrawals-{load_network().name}.json')
+
+
+def mirror_withdrawals(
+    fast_withdrawal_contract: str,
+    mirror: Optional[Path],
+    tzkt_api_url: Optional[str],
+    start_level: Optional[int],
+    interval: int,
+    once: bool,
+    tezos_rpc_url: str,
+) -> None:
+    """Mirrors the FastWithdrawal withdrawal statuses and prints their changes"""
+
+    client = pytezos.using(shell=tezos_rpc_url)
+    fast_withdrawal = FastWithdrawal.from_address(client, fast_withdrawal_contract)
+    source: DiffSource = (
+        TzktDiffSource(tzkt_api_url) if tzkt_api_url else NodeDiffSource(tezos_rpc_url)
+    )
+    path = mirror or default_mirror_path()
+    withdrawals = WithdrawalsMirror(
+        fast_withdrawal.get_withdrawals_big_map(), source, start_level, path
+    )
+    withdrawals.subscribe(lambda change: click.echo(describe_change(change)))
+
+    click.echo('Mirroring fast withdrawal statuses:')
+    echo_variable('  - ', 'Fast Withdrawal contract', fast_withdrawal_contract)
+    echo_variable('  - ', 'Big map', str(withdrawals.ptr))
+    echo_variable('  - ', 'Source', tzkt_api_url or tezos_rpc_url)
+    echo_variable('  - ', 'Mirror file', str(path))
+
+    while True:
+        try:
+            withdrawals.sync()
+            click.echo(
+                f'Mirrored {len(withdrawals.statuses)} withdrawals up to level '
+                + f'{(withdrawals.next_level or 1) - 1}'
+            )
+        except Exception as exc:
+            if once:
+                raise
+            # Resumed on the next round from the last saved chunk:
+            click.echo(error(f'Mirror sync failed: {exc}'), err=True)
+        if once:
+            return
+        time.sleep(interval)
+
+
+mirror_option = click.option(
+    '--mirror',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help='Mirror file (default: `.withdrawals-<network>.json` in the current dir).',
+)
+tzkt_api_url_option = click.option(
+    '--tzkt-api-url',
+    default=None,
+    help='Read the big_map updates from this TzKT-compatible API instead of '
+    + 'the L1 blocks of the RPC node.',
+)
+start_level_option = click.option(
+    '--start-level',
+    type=int,
+    default=None,
+    help='L1 level to start mirroring from when there is no mirror file; pass '
+    + 'the contract origination level for a full mirror (default: head).',
+)
+interval_option = click.option(
+    '--interval',
+    default=5,
+    show_default=True,
+    help='Seconds between sync rounds.',
+)
+once_option = click.option(
+    '--once',
+    is_flag=True,
+    default=False,
+    help='Sync once and exit.',
+)
+
+
+mirror_withdrawals_command = cli_options.command(
+    mirror_withdrawals,
+    name='mirror_withdrawals',
+    options=[
+        fast_withdrawal_contract_option,
+        mirror_option,
+        tzkt_api_url_option,
+        start_level_option,
+        interval_option,
+        once_option,
+        cli_options.tezos_rpc_url,
+    ],
+)
@@ -0,0 +1,393 @@
+"""Fast-withdrawal payouts for a service provider.
+
+The engine follows the withdrawals of the bridge indexer with an `updated_at`
+cursor, so each round reads only the rows created or changed since the last
+one, and keeps the unpaid fast withdrawals in memory. Each round it ranks them
+by what a payout earns per mutez advanced, then by how soon the discount
+expires, and pays out as many as the provider's balance covers, in batched
+operation groups. The ranking is pure in-memory work, so a decision takes
+milliseconds; the round time is dominated by the indexer poll and injection.
+"""
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import click
+from gql import Client, gql
+from pytezos.client import PyTezosClient
+from pytezos.michelson.micheline import MichelsonRuntimeError
+
+from scripts import cli_options
+from scripts.etherlink.xtz_fast_withdraw import fast_withdrawal_contract_option
+from scripts.helpers.addressable import get_address
+from scripts.helpers.batching import inject_in_groups
+from scripts.helpers.contracts.fast_withdrawal import (
+    FastWithdrawal,
+    Withdrawal,
+    create_withdrawal_from_l2_transaction,
+    decode_michelson_nat,
+)
+from scripts.helpers.formatting import accent, echo_variable, error, wrap
+from scripts.helpers.utility import get_tezos_client
+from scripts.monitoring.common import (
+    OperationSpec,
+    iter_pages,
+    make_client,
+    page_size_option,
+)
+from scripts.provider.mirror import NodeDiffSource, WithdrawalsMirror
+
+# bridge_operation.kind of a fast withdrawal nobody has paid out yet:
+UNPAID_KIND = 'fast_withdrawal'
+
+QUERY = gql(
+    """
+    query FastWithdrawals(
+        $limit: Int!
+        $where: bridge_operation_bool_exp!
+        $order_by: [bridge_operation_order_by!]
+    ) {
+        bridge_operation(where: $where, order_by: $order_by, limit: $limit) {
+            id
+            created_at
+            updated_at
+            is_completed
+            kind
+            l1_account
+            withdrawal {
+                l2_transaction {
+                    kernel_withdrawal_id
+                    amount
+                    l1_account
+                    l2_account
+                    timestamp
+                    fast_payload
+                    ticket { ticketer_address metadata ticket_id }
+                }
+            }
+        }
+    }
+    """
+)
+
+FAST_WITHDRAWALS = OperationSpec(
+    title='Fast withdrawals',
+    operation_type='withdrawal',
+    query=QUERY,
+    breakdowns={},
+    token_filter=lambda token_id: {},
+)
+
+
+@dataclass(frozen=True)
+class PayoutCandidate:
+    withdrawal: Withdrawal
+    # Mutez attached to the payout, and what the provider earns at settlement:
+    payout: int
+    fee: int
+    expires_at: int
+
+    @property
+    def fee_rate(self) -> float:
+        return self.fee / self.payout if self.payout else 0.0
+
+
+def make_candidate(
+    withdrawal: Withdrawal,
+    expiration_seconds: int,
+    now: int,
+    expiry_margin: int,
+) -> Optional[PayoutCandidate]:
+    """The payout `payout_withdrawal` would accept at `now`, or None when it
+    would fail: a withdrawal from the future, an undecodable payload, or one
+    expiring within `expiry_margin` seconds (the amount due could change from
+    the discounted to the full one before the operation is included)."""
+
+    if withdrawal.timestamp > now:
+        return None
+    expires_at = withdrawal.timestamp + expiration_seconds
+    if now <= expires_at < now + expiry_margin:
+        return None
+    if now > expires_at:
+        payout = withdrawal.full_amount
+    else:
+        try:
+            payout = decode_michelson_nat(withdrawal.payload)
+        except MichelsonRuntimeError:
+            return None
+    if payout > withdrawal.full_amount:
+        return None
+    return PayoutCandidate(
+        withdrawal, payout, withdrawal.full_amount - payout, expires_at
+    )
+
+
+def select_payouts(
+    candidates: Iterable[PayoutCandidate], balance: int, min_fee: int
+) -> list[PayoutCandidate]:
+    """Best first: the highest fee per mutez advanced, then the soonest to
+    expire (its discount is lost after that), then the oldest; taken greedily
+    while `balance` covers them."""
+
+    ranked = sorted(
+        (c for c in candidates if c.fee >= min_fee),
+        key=lambda c: (-c.fee_rate, c.expires_at, c.withdrawal.withdrawal_id),
+    )
+    selected = []
+    for candidate in ranked:
+        if candidate.payout <= balance:
+            selected.append(candidate)
+            balance -= candidate.payout
+    return selected
+
+
+class PayoutEngine:
+    """Unpaid XTZ fast withdrawals of one FastWithdrawal contract, kept up to
+    date from the indexer, and the payouts made for them. With a `mirror` of
+    the withdrawals big_map, the ones it knows to be paid out or cemented are
+    skipped even before the indexer catches up."""
+
+    def __init__(
+        self,
+        manager: PyTezosClient,
+        fast_withdrawal: FastWithdrawal,
+        indexer: Client,
+        page_size: int,
+        mirror: Optional[WithdrawalsMirror] = None,
+    ) -> None:
+        self.manager = manager
+        self.fast_withdrawal = fast_withdrawal
+        self.indexer = indexer
+        self.page_size = page_size
+        self.mirror = mirror
+        config = fast_withdrawal.read_storage()['config']
+        self.expiration_seconds = int(config['expiration_seconds']())
+        self.xtz_ticketer = str(config['xtz_ticketer']())
+        self.unpaid: dict[str, Withdrawal] = {}
+        self.cursor: Optional[dict] = None
+
+    def apply(self, operation: dict) -> None:
+        transaction = (operation.get('withdrawal') or {}).get('l2_transaction')
+        if (
+            operation['kind'] != UNPAID_KIND
+            or operation['is_completed']
+            or not transaction
+            or not transaction.get('fast_payload')
+        ):
+            self.unpaid.pop(operation['id'], None)
+            return
+        withdrawal = create_withdrawal_from_l2_transaction(transaction)
+        if get_address(withdrawal.ticketer) == self.xtz_ticketer:
+            self.unpaid[operation['id']] = withdrawal
+
+    def seed(self) -> None:
+        """Loads the fast withdrawals not paid out yet and starts the cursor
+        at the most recently updated row."""
+
+        newest = [
+            operation
+            for page in iter_pages(
+                self.indexer, FAST_WITHDRAWALS, 1, 1, column='updated_at'
+            )
+            for operation in page
+        ]
+        unpaid = {'kind': {'_eq': UNPAID_KIND}, 'is_completed': {'_eq': False}}
+        for page in iter_pages(
+            self.indexer, FAST_WITHDRAWALS, self.page_size, where=unpaid
+        ):
+            for operation in page:
+                self.apply(operation)
+        self.cursor = newest[0] if newest else None
+
+    def follow(self) -> None:
+        """Folds in every row created or updated since the cursor."""
+
+        pages = iter_pages(
+            self.indexer,
+            FAST_WITHDRAWALS,
+            self.page_size,
+            column='updated_at',
+            ascending=True,
+            cursor=self.cursor,
+        )
+        for page in pages:
+            for operation in page:
+                self.apply(operation)
+            self.cursor = page[-1]
+
+    def decide(
+        self, now: int, balance: int, min_fee: int, expiry_margin: int
+    ) -> list[PayoutCandidate]:
+        candidates = []
+        for withdrawal in self.unpaid.values():
+            if self.mirror and not self.mirror.get_status(withdrawal).is_none():
+                continue
+            candidate = make_candidate(
+                withdrawal, self.expiration_seconds, now, expiry_margin
+            )
+            if candidate is not None:
+                candidates.append(candidate)
+        return select_payouts(candidates, balance, min_fee)
+
+    def payout(
+        self, selected: list[PayoutCandidate], batch_size: int
+    ) -> list[PayoutCandidate]:
+        """Pays the selected withdrawals out in batched groups; a payout
+        failing simulation (e.g. paid out by another provider meanwhile) is
+        dropped. Returns the ones paid out."""
+
+        paid = []
+        groups = inject_in_groups(
+            self.manager,
+            selected,
+            lambda c: self.fast_withdrawal.payout_withdrawal(
+                c.withdrawal, self.manager, c.payout
+            ),
+            batch_size,
+        )
+        for group, operation_hash in groups:
+            if operation_hash is None:
+                for candidate in group:
+                    withdrawal_id = candidate.withdrawal.withdrawal_id
+                    click.echo(error(f'Payout of withdrawal {withdrawal_id} failed'))
+            else:
+                paid.extend(group)
+                click.echo(
+                    f'Paid out {len(group)} withdrawals, tx hash: '
+                    + wrap(accent(operation_hash))
+                )
+            ids = {candidate.withdrawal.withdrawal_id for candidate in group}
+            self.unpaid = {
+                key: withdrawal
+                for key, withdrawal in self.unpaid.items()
+                if withdrawal.withdrawal_id not in ids
+            }
+        return paid
+
+
+def payout_fast_withdrawals(
+    fast_withdrawal_contract: str,
+    min_fee: int,
+    reserve: float,
+    expiry_margin: int,
+    batch_size: int,
+    interval: int,
+    once: bool,
+    page_size: int,
+    mirror: Optional[Path],
+    tezos_private_key: str,
+    tezos_rpc_url: str,
+) -> None:
+    """Pays out the most profitable XTZ fast withdrawals as a service provider"""
+
+    manager = get_tezos_client(tezos_rpc_url, tezos_private_key)
+    fast_withdrawal = FastWithdrawal.from_address(manager, fast_withdrawal_contract)
+    indexer, indexer_url = make_client()
+    withdrawals = None
+    if mirror is not None:
+        # Read only: the file is written by `mirror_withdrawals` alone.
+        withdrawals = WithdrawalsMirror(
+            fast_withdrawal.get_withdrawals_big_map(),
+            NodeDiffSource(tezos_rpc_url),
+            path=mirror,
+        )
+    engine = PayoutEngine(manager, fast_withdrawal, indexer, page_size, withdrawals)
+    reserve_mutez = int(reserve * 10**6)
+
+    click.echo('Paying out fast withdrawals:')
+    echo_variable('  - ', 'Service provider', manager.key.public_key_hash())
+    echo_variable('  - ', 'Fast Withdrawal contract', fast_withdrawal_contract)
+    echo_variable('  - ', 'Indexer', indexer_url)
+    echo_variable('  - ', 'Expiration seconds', str(engine.expiration_seconds))
+
+    engine.seed()
+    while True:
+        try:
+            engine.follow()
+            if withdrawals is not None:
+                withdrawals.reload()
+            balance = int(manager.account()['balance']) - reserve_mutez
+            now = int(time.time())
+            selected = engine.decide(now, balance, min_fee, expiry_margin)
+            if selected:
+                paid = engine.payout(selected, batch_size)
+                fees = sum(candidate.fee for candidate in paid)
+                click.echo(
+                    f'Paid out {len(paid)} of {len(selected)}, fees {fees} mutez'
+                )
+        except Exception as exc:
+            if once:
+                raise
+            # Retried on the next round; the cursor keeps the pages read:
+            click.echo(error(f'Payout round failed: {exc}'), err=True)
+        if once:
+            return
+        time.sleep(interval)
+
+
+min_fee_option = click.option(
+    '--min-fee',
+    default=1,
+    show_default=True,
+    help='Min fee (full minus discounted amount, mutez) a payout must earn.',
+)
+reserve_option = click.option(
+    '--reserve',
+    default=1.0,
+    show_default=True,
+    help='XTZ kept on the provider balance (for operation fees), not paid out.',
+)
+expiry_margin_option = click.option(
+    '--expiry-margin',
+    default=60,
+    show_default=True,
+    help='Withdrawals expiring within this many seconds are not paid out, as '
+    + 'the amount due could change before the payout is included.',
+)
+batch_size_option = click.option(
+    '--batch-size',
+    default=20,
+    show_default=True,
+    help='Max payouts per operation group.',
+)
+interval_option = click.option(
+    '--interval',
+    default=5,
+    show_default=True,
+    help='Seconds between payout rounds.',
+)
+mirror_option = click.option(
+    '--mirror',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help='Mirror file of the withdrawals big_map kept by a running '
+    + '`mirror_withdrawals`, re-read every round; withdrawals it knows to be '
+    + 'paid out are skipped without waiting for the indexer.',
+)
+once_option = click.option(
+    '--once',
+    is_flag=True,
+    default=False,
+    help='Make a single payout round and exit.',
+)
+
+
+payout_fast_withdrawals_command = cli_options.command(
+    payout_fast_withdrawals,
+    name='payout_fast_withdrawals',
+    options=[
+        fast_withdrawal_contract_option,
+        min_fee_option,
+        reserve_option,
+        expiry_margin_option,
+        batch_size_option,
+        interval_option,
+        once_option,
+        page_size_option,
+        mirror_option,
+        cli_options.tezos_private_key,
+        cli_options.tezos_rpc_url,
+    ],
+)
@@ -1,8 +1,12 @@
 import click
-from scripts.helpers.rollup_node import get_messages
+from scripts.helpers.rollup_node import RollupNodeClient
+from scripts.helpers.rate_limiter import TokenBucket
 from scripts import cli_options
 from scripts.helpers.formatting import accent
-import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
 import json
 
 level_from_option = click.option(
@@ -23,18 +27,83 @@ echo_content_option = click.option(
     help='If set to True - the messages content will be shown, if set to False - only messages count per block will be shown.',
     show_default=True,
 )
-sleep_time_option = click.option(
-    '--sleep-time',
-    default=1,
-    help='Time between requests in seconds.',
+concurrency_option = click.option(
+    '--concurrency',
+    default=8,
+    help='Max number of requests in flight.',
     show_default=True,
 )
+rate_option = click.option(
+    '--rate',
+    default=10.0,
+    help='Max requests per second (token bucket, bursts up to --concurrency).',
+    show_default=True,
+)
+output_option = click.option(
+    '--output',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help='Append `{"level", "messages"}` JSON lines to this file in level order; '
+    + 'a rerun resumes after the last level written.',
+)
+
+
+def last_written_level(output: Path) -> Optional[int]:
+    """The level of the last complete line of a previous scan's output. A line
+    cut short by an interrupted run is dropped so that the scan rewrites it."""
+
+    if not output.exists():
+        return None
+    content = output.read_bytes()
+    complete = content[: content.rfind(b'\n') + 1]
+    if complete != content:
+        output.write_bytes(complete)
+    lines = complete.splitlines()
+    return int(json.loads(lines[-1])['level']) if lines else None
+
+
+def iter_outbox(
+    client: RollupNodeClient,
+    levels: Iterable[int],
+    concurrency: int,
+    rate: float,
+    cemented: bool = False,
+) -> Iterator[tuple[int, Any]]:
+    """Yields `(level, messages)` in level order while fetching up to
+    `concurrency` levels ahead over the client's pooled session, at most `rate`
+    requests per second. With `cemented`, only cemented messages are read."""
+
+    bucket = TokenBucket(rate, burst=concurrency)
+    get_messages = client.get_cemented_messages if cemented else client.get_messages
+
+    def fetch(level: int) -> Any:
+        bucket.acquire()
+        return get_messages(level)
+
+    remaining = iter(levels)
+    in_flight: deque[tuple[int, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+        def submit() -> None:
+            level = next(remaining, None)
+            if level is not None:
+                in_flight.append((level, executor.submit(fetch, level)))
+
+        for _ in range(concurrency):
+            submit()
+        while in_flight:
+            level, future = in_flight.popleft()
+            messages = future.result()
+            submit()
+            yield level, messages
 
 
 def scan_outbox(
     level_from: int,
     max_levels: int,
-    sleep_time: int,
+    concurrency: int,
+    rate: float,
+    output: Optional[Path],
     echo_content: bool,
     etherlink_rollup_node_url: str,
     silent: bool,
@@ -42,6 +111,11 @@ def scan_outbox(
     """Echoes all outbox messages in the specified range of levels."""
 
     level_to = level_from + max_levels
+    if output is not None:
+        last_level = last_written_level(output)
+        if last_level is not None and last_level >= level_from:
+            level_from = last_level + 1
+            click.echo(f'Resuming after level {last_level} from {output}')
     click.echo(
         'Scan outbox messages from '
         + accent(str(level_from))
@@ -49,11 +123,33 @@ def scan_outbox(
         + accent(str(level_to))
     )
 
-    for level in range(level_from, level_from + max_levels):
-        messages = get_messages(etherlink_rollup_node_url, level)
-        info = json.dumps(messages, indent=2) if echo_content else str(len(messages))
-        click.echo(accent(str(level)) + ': ' + info)
-        time.sleep(sleep_time)
+    client = RollupNodeClient(etherlink_rollup_node_url, pool_size=concurrency)
+    results = iter_outbox(client, range(level_from, level_to), concurrency, rate)
+    file = output.open('a') if output is not None else None
+    try:
+        for level, messages in results:
+            if file is not None:
+                file.write(json.dumps({'level': level, 'messages': messages}) + '\n')
+                file.flush()
+            if not silent:
+                info = (
+                    json.dumps(messages, indent=2)
+                    if echo_content
+                    else str(len(messages))
+                )
+                click.echo(accent(str(level)) + ': ' + info)
+    finally:
+        if file is not None:
+            file.close()
+        client.close()
+
+    if not silent:
+        for endpoint, stats in client.stats.items():
+            click.echo(
+                f'{endpoint}: {stats.requests} requests, '
+                + f'mean {stats.mean_seconds:.3f}s, max {stats.max_seconds:.3f}s, '
+                + f'{stats.retries} retries, {stats.failures} failed'
+            )
 
 
 scan_outbox_command = cli_options.command(
@@ -62,8 +158,10 @@ scan_outbox_command = cli_options.command(
     options=[
         level_from_option,
         max_levels_option,
+        concurrency_option,
+        rate_option,
+        output_option,
         echo_content_option,
-        sleep_time_option,
         cli_options.etherlink_rollup_node_url,
         cli_options.silent,
     ],
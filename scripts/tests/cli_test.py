@@ -21,6 +21,8 @@ from scripts.etherlink.build_contracts import (
 )
 from scripts.etherlink.deploy_erc20 import deploy_erc20_command
 from scripts.etherlink.fa_withdraw import fa_withdraw_command
+from scripts.etherlink.fa_withdraw_bulk import fa_withdraw_bulk_command
+from scripts.etherlink.claim_deposits import claim_deposits_command
 from scripts.etherlink.parse_withdrawal_event import parse_withdrawal_event_command
 
 # aliased so pytest doesn't try to collect the `test_`-prefixed name as a test
@@ -34,6 +36,12 @@ from scripts.rollup_node.get_proof import get_proof_command
 from scripts.rollup_node.scan_outbox import scan_outbox_command
 from scripts.monitoring.deposits import monitor_deposits_command
 from scripts.monitoring.withdrawals import monitor_withdrawals_command
+from scripts.monitoring.follow import monitor_command
+from scripts.monitoring.exporter import monitor_exporter_command
+from scripts.monitoring.latency import monitor_latency_command
+from scripts.provider.liquidity import forecast_liquidity_command
+from scripts.provider.mirror import mirror_withdrawals_command
+from scripts.provider.payouts import payout_fast_withdrawals_command
 from scripts.tezos.build_contracts import (
     build_contracts_command as build_tezos_contracts_command,
 )
@@ -44,7 +52,10 @@ from scripts.tezos.deploy_ticketer import deploy_ticketer_command
 from scripts.tezos.deploy_token import deploy_token_command
 from scripts.tezos.deploy_token_bridge_helper import deploy_token_bridge_helper_command
 from scripts.tezos.execute_outbox_message import execute_outbox_message_command
+from scripts.tezos.execute_outbox_messages import execute_outbox_messages_command
+from scripts.tezos.outbox_executor import outbox_executor_command
 from scripts.tezos.fa_deposit import fa_deposit_command
+from scripts.tezos.fa_deposit_bulk import fa_deposit_bulk_command
 from scripts.tezos.get_ticketer_params import get_ticketer_params_command
 from scripts.tezos.xtz_deposit import xtz_deposit_command
 from scripts.tezos.xtz_deposit_michelson import (
@@ -54,7 +65,10 @@ from scripts.tezos.xtz_deposit_michelson import (
 
 COMMANDS = [
     fa_deposit_command,
+    fa_deposit_bulk_command,
     fa_withdraw_command,
+    fa_withdraw_bulk_command,
+    claim_deposits_command,
     xtz_deposit_command,
     xtz_deposit_michelson_command,
     xtz_withdraw_command,
@@ -68,6 +82,8 @@ COMMANDS = [
     deploy_fast_withdrawal_command,
     get_ticketer_params_command,
     execute_outbox_message_command,
+    execute_outbox_messages_command,
+    outbox_executor_command,
     parse_withdrawal_event_command,
     get_proof_command,
     scan_outbox_command,
@@ -77,6 +93,12 @@ COMMANDS = [
     etherlink_tests_command,
     monitor_deposits_command,
     monitor_withdrawals_command,
+    monitor_command,
+    monitor_exporter_command,
+    monitor_latency_command,
+    payout_fast_withdrawals_command,
+    mirror_withdrawals_command,
+    forecast_liquidity_command,
 ]
 
 
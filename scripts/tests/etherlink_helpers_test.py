@@ -0,0 +1,353 @@
+"""Offline tests for the Etherlink helpers: web3 is replaced by mocks."""
+
+import json
+from pathlib import Path
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+from eth_account import Account
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from scripts.etherlink.claim_deposits import DepositClaimer, render_claimer_metrics
+from scripts.etherlink.fa_withdraw_bulk import (
+    TokenRoute,
+    WithdrawalRequest,
+    done_rows,
+    make_route,
+    read_withdrawals,
+    submit_withdrawals,
+)
+from scripts.helpers.etherlink import (
+    FaWithdrawalPrecompileHelper,
+    NonceManager,
+    QueuedDepositIndex,
+)
+from scripts.helpers.etherlink import queued_deposits
+from scripts.helpers.ticket_identity import TicketIdentity
+from scripts.networks import TokenConfig
+from scripts.tezos.fa_deposit_bulk import (
+    DepositRequest,
+    HelperRoute,
+    claim_queued_deposits,
+)
+
+ACCOUNT = Account.from_key('0x' + '11' * 32)
+
+
+def make_web3() -> Mock:
+    web3 = Mock()
+    web3.eth.chain_id = 128123
+    web3.eth.get_transaction_count.return_value = 7
+    return web3
+
+
+def test_nonce_manager_hands_out_consecutive_nonces() -> None:
+    web3 = make_web3()
+    nonces = NonceManager(web3, ACCOUNT.address)
+
+    for _ in range(3):
+        nonces.send(ACCOUNT, {'to': ACCOUNT.address})
+
+    signed = [call.args[0] for call in web3.eth.account.sign_transaction.call_args_list]
+    assert [tx['nonce'] for tx in signed] == [7, 8, 9]
+    web3.eth.get_transaction_count.assert_called_once_with(ACCOUNT.address, 'pending')
+    assert nonces.chain_id == 128123
+
+
+def test_nonce_manager_resyncs_after_failed_send() -> None:
+    web3 = make_web3()
+    nonces = NonceManager(web3, ACCOUNT.address)
+    web3.eth.send_raw_transaction.side_effect = [b'ok', ValueError('rejected'), b'ok']
+
+    nonces.send(ACCOUNT, {})
+    with pytest.raises(ValueError):
+        nonces.send(ACCOUNT, {})
+    web3.eth.get_transaction_count.return_value = 8
+    nonces.send(ACCOUNT, {})
+
+    signed = [call.args[0] for call in web3.eth.account.sign_transaction.call_args_list]
+    assert [tx['nonce'] for tx in signed] == [7, 8, 8]
+    assert web3.eth.get_transaction_count.call_count == 2
+
+
+def test_read_withdrawals_from_csv_and_jsonl(tmp_path: Path) -> None:
+    csv_file = tmp_path / 'payouts.csv'
+    csv_file.write_text('receiver,amount,token\ntz1a, 10 ,USDt\ntz1b,20,0xAbC\n')
+    jsonl_file = tmp_path / 'payouts.jsonl'
+    jsonl_file.write_text(
+        '{"receiver": "tz1a", "amount": 10, "token": "USDt"}\n\n'
+        + '{"receiver": "tz1b", "amount": "20", "token": "0xAbC"}\n'
+    )
+
+    expected = [
+        WithdrawalRequest(0, 'tz1a', 10, 'USDt'),
+        WithdrawalRequest(1, 'tz1b', 20, '0xAbC'),
+    ]
+    assert read_withdrawals(csv_file) == expected
+    assert read_withdrawals(jsonl_file) == expected
+
+
+def test_submit_withdrawals_pipelines_and_parses_outbox() -> None:
+    kernel = '0x' + '00' * 20
+    route = TokenRoute('0xproxy', b'\x01' * 22, b'\x05', '01' * 22)
+    withdrawals = [
+        WithdrawalRequest(row, 'tz1burnburnburnburnburnburnburjAYjjX', 5, 'USDt')
+        for row in range(3)
+    ]
+    precompile = Mock()
+    precompile.send.side_effect = [b'h0', b'h1', b'h2']
+
+    def wait(tx_hashes: list[bytes]) -> list[dict[str, Any]]:
+        # Nothing is awaited before the whole window is sent:
+        assert precompile.send.call_count in (2, 3)
+        return [
+            {
+                'transactionHash': HexBytes(tx_hash),
+                'status': 1,
+                'logs': [
+                    {'address': '0x' + 'ff' * 20, 'data': b''},
+                    {'address': kernel, 'data': (7).to_bytes(32) * 3},
+                ],
+            }
+            for tx_hash in tx_hashes
+        ]
+
+    precompile.nonces.wait.side_effect = wait
+    records = list(
+        submit_withdrawals(precompile, withdrawals, {'USDt': route}, kernel, 2)
+    )
+
+    # Each withdrawal is recorded as sent before the window is awaited:
+    assert [(r['row'], r['status']) for r in records] == [
+        (0, None),
+        (1, None),
+        (0, 1),
+        (1, 1),
+        (2, None),
+        (2, 1),
+    ]
+    results = [r for r in records if r['status'] is not None]
+    assert [r['tx_hash'] for r in results] == [
+        HexBytes(h).hex() for h in (b'h0', b'h1', b'h2')
+    ]
+    assert all((r['outbox_level'], r['outbox_index']) == (7, 7) for r in results)
+    assert precompile.nonces.wait.call_count == 2
+    routing_info = precompile.build_withdraw.call_args.kwargs['routing_info']
+    assert routing_info.hex().endswith('01' * 22)
+
+
+def test_submit_withdrawals_records_build_failures(tmp_path: Path) -> None:
+    route = TokenRoute('0xproxy', b'\x01' * 22, b'\x05', '01' * 22)
+    withdrawals = [
+        WithdrawalRequest(row, 'tz1burnburnburnburnburnburnburjAYjjX', row, 'USDt')
+        for row in range(2)
+    ] + [WithdrawalRequest(2, 'tz1notanaddress', 5, 'USDt')]
+    precompile = Mock()
+
+    def build_withdraw(amount: int, **kwargs: Any) -> dict[str, Any]:
+        if amount == 0:
+            raise ContractLogicError('execution reverted')
+        return {'amount': amount}
+
+    precompile.build_withdraw.side_effect = build_withdraw
+    precompile.send.return_value = b'h1'
+    precompile.nonces.wait.side_effect = TimeoutError('no receipt')
+    output = tmp_path / 'results.jsonl'
+
+    # An interrupted run: the receipt of row 1 never arrives.
+    with pytest.raises(TimeoutError), output.open('a') as results:
+        for record in submit_withdrawals(
+            precompile, withdrawals, {'USDt': route}, '0x' + '00' * 20, 3
+        ):
+            results.write(json.dumps(record) + '\n')
+
+    lines = output.read_text().splitlines()
+    failed, sent, malformed = [json.loads(line) for line in lines]
+    assert (failed['row'], failed['status'], failed['tx_hash']) == (0, 0, None)
+    assert 'execution reverted' in failed['error']
+    assert (sent['row'], sent['status']) == (1, None)
+    assert (malformed['row'], malformed['status']) == (2, 0)
+    assert done_rows(output) == {0, 1, 2}
+
+
+def test_withdraw_route_encodes_with_the_precompile_abi() -> None:
+    proxy = '0x' + 'ab' * 20
+    config = TokenConfig('USDt', 'FA2', 'KT1', 'KT1', 'KT1', proxy.upper())
+    identity = TicketIdentity('01' * 22, '05', 42)
+    route = make_route(config, identity)
+    precompile = FaWithdrawalPrecompileHelper.from_address(
+        Web3(), ACCOUNT, '0xff00000000000000000000000000000000000002'
+    )
+
+    data = precompile.contract.encode_abi(
+        fn_name='withdraw',
+        args=[route.erc20_proxy, b'\x02' * 44, 5, route.ticketer, route.content],
+    )
+
+    assert route.erc20_proxy == Web3.to_checksum_address(proxy)
+    assert proxy.removeprefix('0x') in data
+
+
+PROXY = '0x' + 'aa' * 20
+RECEIVER = '0x' + 'bb' * 20
+
+
+def make_event(nonce: int, block: int, receiver: str = RECEIVER) -> dict[str, Any]:
+    args = {
+        'nonce': nonce,
+        'ticketHash': 42,
+        'proxy': PROXY,
+        'receiver': receiver,
+        'amount': 10,
+        'inboxLevel': 1,
+        'inboxMsgId': nonce,
+    }
+    return {'args': args, 'blockNumber': block}
+
+
+def test_queued_deposit_index_adapts_ranges_and_persists(tmp_path: Path) -> None:
+    events = [make_event(1, 5), make_event(2, 30, '0x' + 'cc' * 20), make_event(3, 70)]
+    ranges = []
+
+    def get_logs(fromBlock: int, toBlock: int) -> list[dict[str, Any]]:
+        ranges.append((fromBlock, toBlock))
+        if toBlock - fromBlock >= 50:
+            raise ValueError('query returned more than 10000 results')
+        return [e for e in events if fromBlock <= e['blockNumber'] <= toBlock]
+
+    contract = Mock()
+    contract.w3.eth.block_number = 100
+    contract.events.QueuedDeposit.return_value.get_logs.side_effect = get_logs
+    path = tmp_path / 'deposits.json'
+    index = QueuedDepositIndex(contract, start_block=0, path=path)
+
+    assert index.sync() == 3
+    assert index.find(42, PROXY, RECEIVER) == [1, 3]
+    # Rejected ranges are halved until accepted, and the blocks are read once:
+    accepted = [(lo, hi) for lo, hi in ranges if hi - lo < 50]
+    assert accepted[0][0] == 0 and accepted[-1][1] == 100
+    assert all(a[1] + 1 == b[0] for a, b in zip(accepted, accepted[1:]))
+
+    index.mark_claimed([1])
+    reloaded = QueuedDepositIndex(contract, path=path)
+    assert reloaded.next_block == 101
+    assert [d.nonce for d in reloaded.pending()] == [2, 3]
+    assert [d.nonce for d in reloaded.pending(reloaded.deposits[3].key)] == [3]
+
+
+def test_shared_index_starts_at_the_configured_block(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(queued_deposits, '_indexes', {})
+    monkeypatch.setattr(queued_deposits, '_start_block', None)
+    contract = Mock()
+    contract.address = PROXY
+
+    queued_deposits.index_queued_deposits_from(1234)
+
+    assert queued_deposits.get_queued_deposit_index(contract).next_block == 1234
+
+
+def test_deposit_claimer_pipelines_claims_within_fee_budget() -> None:
+    contract = Mock()
+    contract.w3.eth.block_number = 10
+    contract.events.QueuedDeposit.return_value.get_logs.return_value = [
+        make_event(nonce, 5) for nonce in range(1, 6)
+    ]
+    precompile = Mock()
+    precompile.queued_deposits = QueuedDepositIndex(contract, start_block=0)
+    precompile.web3.eth.get_block.return_value = {'timestamp': 1_700_000_000}
+
+    def build_claim(nonce: int) -> dict[str, Any]:
+        if nonce == 1:
+            raise ContractLogicError('execution reverted')
+        return {'nonce': nonce, 'gas': 100, 'gasPrice': 10}
+
+    precompile.build_claim.side_effect = build_claim
+    precompile.send.side_effect = lambda tx: tx['nonce']
+    precompile.nonces.wait.side_effect = lambda hashes: [
+        {'status': int(h != 3), 'gasUsed': 50, 'effectiveGasPrice': 10} for h in hashes
+    ]
+    # Estimated at 1000 each but paid 500; the third claim goes over:
+    claimer = DepositClaimer(precompile, fee_budget=2_400, window=2)
+    claimer.tick()
+
+    stats = claimer.stats
+    assert (stats.claimed, stats.failed, stats.skipped) == (1, 1, 1)
+    assert stats.fees_spent == 2 * 500
+    assert [d.nonce for d in precompile.queued_deposits.pending()] == [3, 4, 5]
+    assert stats.budget_exhausted
+    assert precompile.send.call_count == 2
+
+    metrics = render_claimer_metrics(stats, 2_400, 0.0, 0)
+    assert 'bridge_claimer_queue_depth 3' in metrics
+    assert 'bridge_claimer_claims_total{result="skipped"} 1' in metrics
+    assert 'bridge_claimer_claim_latency_seconds_count 1' in metrics
+
+
+def test_deposit_claimer_keeps_claims_in_flight_across_failed_rounds() -> None:
+    contract = Mock()
+    contract.w3.eth.block_number = 10
+    contract.events.QueuedDeposit.return_value.get_logs.return_value = [
+        make_event(nonce, 5) for nonce in (1, 2)
+    ]
+    precompile = Mock()
+    precompile.queued_deposits = QueuedDepositIndex(contract, start_block=0)
+    precompile.web3.eth.get_block.return_value = {'timestamp': 1_700_000_000}
+    precompile.build_claim.side_effect = lambda nonce: {'nonce': nonce, 'gas': 1}
+    precompile.send.side_effect = lambda tx: HexBytes(bytes([tx['nonce']]))
+    receipt = {'status': 1, 'gasUsed': 1, 'effectiveGasPrice': 0}
+    precompile.nonces.wait.side_effect = TimeoutError('no receipt')
+    claimer = DepositClaimer(precompile, fee_budget=10**18, window=2)
+
+    with pytest.raises(TimeoutError):
+        claimer.tick()
+    assert sorted(claimer.in_flight) == [1, 2]
+
+    # The next round waits for the sent claims instead of claiming again:
+    precompile.nonces.wait.side_effect = lambda hashes: [receipt for _ in hashes]
+    claimer.tick()
+
+    assert precompile.send.call_count == 2
+    assert claimer.in_flight == {}
+    assert claimer.stats.claimed == 2
+    assert precompile.queued_deposits.pending() == []
+    precompile.web3.eth.get_block.assert_called_once_with(5)
+
+
+def test_claim_queued_deposits_skips_nonces_claimed_by_others() -> None:
+    contract = Mock()
+    contract.w3.eth.block_number = 10
+    contract.events.QueuedDeposit.return_value.get_logs.return_value = [
+        make_event(nonce, 5) for nonce in (1, 2, 3)
+    ]
+    index = QueuedDepositIndex(contract, start_block=0)
+    index.sync()
+    index.mark_claimed([1])
+    claimer = Mock()
+    claimer.queued_deposits = index
+    claimer.queued_nonces_since.side_effect = lambda *key: index.find(*key[:3])
+
+    def build_claim(nonce: int) -> dict[str, Any]:
+        if nonce == 2:
+            raise ContractLogicError('execution reverted')
+        return {'nonce': nonce}
+
+    claimer.build_claim.side_effect = build_claim
+    claimer.send.side_effect = lambda tx: HexBytes(bytes([tx['nonce']]))
+    claimer.nonces.wait.side_effect = lambda hashes: [
+        {'transactionHash': h, 'status': 1} for h in hashes
+    ]
+    route = HelperRoute(Mock(), Mock(), ticket_hash=42, erc20_proxy=PROXY)
+    deposits = [DepositRequest(row, 'helper', RECEIVER, 10) for row in range(3)]
+    key = (42, PROXY, RECEIVER)
+
+    tx_hashes = claim_queued_deposits(
+        claimer, deposits, {'helper': route}, {key: 0}, timeout=0
+    )
+
+    assert tx_hashes == [HexBytes(b'\x03').hex()]
+    assert index.pending() == []
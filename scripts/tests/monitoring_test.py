@@ -0,0 +1,303 @@
+"""Offline tests for the monitoring helpers: the indexer is replaced by an
+in-memory fake that evaluates the few `bridge_operation_bool_exp` shapes the
+helpers emit."""
+
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import click
+import pytest
+from gql import Client
+
+from scripts.monitoring.common import (
+    Breakdowns,
+    aggregate_breakdowns,
+    collect_breakdowns,
+    iter_pages,
+)
+from scripts.monitoring import exporter, follow
+from scripts.monitoring.exporter import (
+    exporter_checkpoint_path,
+    render_family,
+    render_metrics,
+)
+from scripts.monitoring.follow import FollowedOperations
+from scripts.helpers.rollup_timing import RollupTiming
+from scripts.monitoring.latency import Latencies, LatencyHistogram, latency_specs
+from scripts.monitoring.withdrawals import WITHDRAWALS
+
+
+def _matches(row: dict, where: dict[str, Any]) -> bool:
+    for field, condition in where.items():
+        if field == '_and':
+            if not all(_matches(row, part) for part in condition):
+                return False
+        elif field == '_or':
+            if not any(_matches(row, part) for part in condition):
+                return False
+        elif field == '_not':
+            if _matches(row, condition):
+                return False
+        elif all(op.startswith('_') for op in condition):
+            value = row.get(field)
+            for op, expected in condition.items():
+                if op == '_eq' and value != expected:
+                    return False
+                if op == '_lt' and not value < expected:
+                    return False
+                if op == '_gt' and not value > expected:
+                    return False
+                if op == '_is_null' and (value is None) != expected:
+                    return False
+        elif not isinstance(row.get(field), dict):
+            return False
+        elif not _matches(row[field], condition):
+            return False
+    return True
+
+
+class FakeIndexer:
+    def __init__(self, rows: list[dict], tokens: list[dict] | None = None) -> None:
+        self.tokens = tokens or []
+        self.rows = rows
+        self.requests: list[int] = []
+
+    def __enter__(self) -> 'FakeIndexer':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def execute(self, query: Any, variable_values: dict) -> dict:
+        if 'total' in variable_values:
+            return self._aggregates(variable_values)
+        if 'limit' not in variable_values:
+            return self._groups(variable_values['where'])
+        self.requests.append(variable_values['limit'])
+        [(column, direction)] = variable_values['order_by'][0].items()
+        matched = sorted(
+            (r for r in self.rows if _matches(r, variable_values['where'])),
+            key=lambda row: (row[column], row['id']),
+            reverse=direction == 'desc',
+        )
+        return {'bridge_operation': matched[: variable_values['limit']]}
+
+    def _groups(self, where: dict) -> dict:
+        matched = [r for r in self.rows if _matches(r, where)]
+        return {
+            'status': [{'status': s} for s in {r['status'] for r in matched}],
+            'kind': [{'kind': k} for k in {r['kind'] for r in matched}],
+            'tezos_token': self.tokens,
+        }
+
+    def _aggregates(self, variables: dict) -> dict:
+        return {
+            alias: {
+                'aggregate': {'count': sum(_matches(row, where) for row in self.rows)}
+            }
+            for alias, where in variables.items()
+        }
+
+
+def _withdrawal(
+    n: int, created_at: str, kind: str | None = None, token_id: str | None = None
+) -> dict:
+    token = {'id': token_id, 'symbol': None} if token_id else None
+    return {
+        'id': f'{n:04d}',
+        'created_at': created_at,
+        'updated_at': created_at,
+        'is_completed': n % 2 == 1,
+        'type': 'withdrawal',
+        'status': 'FINISHED' if n % 2 else 'CREATED',
+        'kind': kind,
+        'withdrawal': {'l2_transaction': {'ticket': {'token': token}}},
+    }
+
+
+def test_iter_pages_walks_ties_without_gaps_or_repeats() -> None:
+    # Many rows share a timestamp, so the cursor must break ties by id.
+    rows = [_withdrawal(n, f'2024-01-0{n % 3 + 1}') for n in range(25)]
+    indexer = FakeIndexer(rows)
+    client: Client = indexer  # type: ignore[assignment]
+
+    pages = list(iter_pages(client, WITHDRAWALS, page_size=4))
+
+    seen = [row['id'] for page in pages for row in page]
+    newest_first = sorted(rows, key=lambda r: (r['created_at'], r['id']))[::-1]
+    assert seen == [row['id'] for row in newest_first]
+    assert all(len(page) <= 4 for page in pages)
+
+
+def test_iter_pages_stops_at_limit() -> None:
+    indexer = FakeIndexer([_withdrawal(n, '2024-01-01') for n in range(10)])
+    client: Client = indexer  # type: ignore[assignment]
+
+    pages = list(iter_pages(client, WITHDRAWALS, page_size=4, limit=6))
+
+    assert [len(page) for page in pages] == [4, 2]
+    assert indexer.requests == [4, 2]
+
+
+def test_breakdowns_fold_pages() -> None:
+    breakdowns = Breakdowns(WITHDRAWALS)
+    breakdowns.fold([_withdrawal(1, 'a'), _withdrawal(2, 'b', 'fast_withdrawal')])
+    breakdowns.fold([_withdrawal(3, 'c')])
+
+    assert breakdowns.total == 3
+    assert breakdowns.counters['kind'] == {'regular': 2, 'fast (user)': 1}
+    assert breakdowns.counters['status'] == {'FINISHED': 2, 'CREATED': 1}
+    assert breakdowns.counters['token'] == {'unknown': 3}
+
+
+def test_aggregate_breakdowns_match_client_side_counts() -> None:
+    rows = [
+        _withdrawal(n, 'a', kind, token)
+        for n, (kind, token) in enumerate(
+            [(None, 'KT1A_0'), ('fast_withdrawal', 'KT1A_0'), (None, 'KT1B_0')] * 3
+            + [(None, None)]
+        )
+    ]
+    tokens: list[dict] = [
+        {'id': 'KT1A_0', 'symbol': 'tzBTC'},
+        {'id': 'KT1B_0', 'symbol': None},
+        {'id': 'KT1C_0', 'symbol': 'unused'},
+    ]
+    indexer = FakeIndexer(rows, tokens)
+    client: Client = indexer  # type: ignore[assignment]
+
+    exact = aggregate_breakdowns(client, WITHDRAWALS)
+    streamed = collect_breakdowns(client, WITHDRAWALS, page_size=3)
+
+    assert exact.total == streamed.total == 10
+    assert exact.counters['kind'] == streamed.counters['kind']
+    assert exact.counters['status'] == streamed.counters['status']
+    # The fake rows carry no symbols, so only the exact side resolves them.
+    assert exact.counters['token'] == {'tzBTC': 6, 'KT1B_0': 3, 'unknown': 1}
+
+
+def test_followed_operations_count_changes_once() -> None:
+    rows = [_withdrawal(n, f'2024-01-0{n + 1}') for n in range(4)]
+    indexer = FakeIndexer(rows)
+    client: Client = indexer  # type: ignore[assignment]
+    followed = FollowedOperations.from_dict(WITHDRAWALS, None)
+
+    followed.seed(client, page_size=2)
+    assert followed.breakdowns.total == 4
+    assert set(followed.pending) == {'0000', '0002'}
+    assert followed.tick(client, page_size=2).created == 0
+
+    # An in-flight withdrawal completes and a new one shows up.
+    rows[0].update(status='FINISHED', is_completed=True, updated_at='2024-02-01')
+    rows.append(_withdrawal(4, '2024-02-02'))
+    result = followed.tick(client, page_size=2)
+
+    assert (result.created, result.updated) == (1, 1)
+    assert followed.breakdowns.total == 5
+    assert followed.breakdowns.counters['status'] == {'FINISHED': 3, 'CREATED': 2}
+    assert set(followed.pending) == {'0002', '0004'}
+
+    restored = FollowedOperations.from_dict(WITHDRAWALS, followed.to_dict())
+    assert restored.breakdowns.counters == followed.breakdowns.counters
+    assert restored.tick(client, page_size=2).created == 0
+
+
+def test_seed_leaves_rows_written_meanwhile_to_the_first_tick() -> None:
+    rows = [_withdrawal(n, f'2024-01-0{n + 1}') for n in range(4)]
+
+    class RacingIndexer(FakeIndexer):
+        def _groups(self, where: dict) -> dict:
+            # Written after the cursor was taken, before the aggregates ran:
+            if len(self.rows) == 4:
+                self.rows.append(_withdrawal(4, '2024-02-01'))
+            return super()._groups(where)
+
+    client: Client = RacingIndexer(rows)  # type: ignore[assignment]
+    followed = FollowedOperations.from_dict(WITHDRAWALS, None)
+
+    followed.seed(client, page_size=2)
+    assert followed.breakdowns.total == 4
+    assert set(followed.pending) == {'0000', '0002'}
+
+    assert followed.tick(client, page_size=2).created == 1
+    assert followed.breakdowns.total == 5
+    assert set(followed.pending) == {'0000', '0002', '0004'}
+
+
+def test_render_metrics() -> None:
+    followed = FollowedOperations.from_dict(WITHDRAWALS, None)
+    followed.apply(_withdrawal(0, 'a', 'fast_withdrawal', 'KT1A_0'))
+    followed.apply(_withdrawal(1, 'b'))
+
+    text = render_metrics([followed], {'bridge_"x"': 3}, 1700000000.0, 0)
+
+    assert 'bridge_operations_total{type="withdrawal"} 2' in text
+    assert 'bridge_operations_in_flight{type="withdrawal"} 1' in text
+    assert 'bridge_operations_by_kind{type="withdrawal",kind="fast (user)"} 1' in text
+    assert 'bridge_operations_by_token{type="withdrawal",token="KT1A_0"} 1' in text
+    assert 'bridge_indexer_lag_blocks{index="bridge_\\"x\\""} 3' in text
+    assert '# TYPE bridge_operations_by_status gauge' in text
+    assert 'bridge_exporter_last_refresh_timestamp_seconds 1700000000.0' in text
+
+
+def test_exporter_does_not_share_the_monitor_checkpoint(
+    tmp_path: Path, monkeypatch: Any
+) -> None:
+    network = SimpleNamespace(name='testnet')
+    monkeypatch.setattr(follow, 'load_network', lambda: network)
+    monkeypatch.setattr(exporter, 'load_network', lambda: network)
+    monkeypatch.chdir(tmp_path)
+
+    assert exporter_checkpoint_path(None) == Path('.monitor-exporter-testnet.json')
+    assert exporter_checkpoint_path(Path('x.json')) == Path('x.json')
+    with pytest.raises(click.BadParameter):
+        exporter_checkpoint_path(tmp_path / '.monitor-testnet.json')
+
+
+def test_render_family_keeps_full_precision() -> None:
+    lines = render_family(
+        'x', 'gauge', 'X.', [({}, 1763456789.25), ({'a': 'b'}, 1234567), ({}, 0.1)]
+    )
+
+    assert lines[2:] == ['x 1763456789.25', 'x{a="b"} 1234567', 'x 0.1']
+
+
+def test_latency_histogram_quantiles_within_bucket_error() -> None:
+    histogram = LatencyHistogram()
+    for seconds in range(1, 1001):
+        histogram.add(seconds)
+
+    for q, exact in [(0.5, 500), (0.9, 900), (0.99, 990)]:
+        estimate = histogram.quantile(q)
+        assert estimate is not None
+        assert exact <= estimate <= exact * histogram.growth
+    assert histogram.quantile(1.0) == 1000
+    assert LatencyHistogram().quantile(0.5) is None
+
+
+def test_latencies_skip_incomplete_stages() -> None:
+    completed = _withdrawal(1, 'a', 'fast_withdrawal', 'KT1A_0')
+    completed['withdrawal'].update(
+        l2_transaction={'timestamp': '2024-01-01T00:00:00+00:00'},
+        outbox_message={'level': 100, 'commitment': {'inbox_level': 120}},
+        l1_transaction={'timestamp': '2024-01-15T00:00:00+00:00'},
+    )
+    pending = _withdrawal(2, 'b')
+    pending['withdrawal'].update(
+        l2_transaction={'timestamp': '2024-01-01T00:00:00+00:00'},
+        outbox_message={'level': 130, 'commitment': None},
+    )
+    timing = RollupTiming(commitment_period=20, challenge_window=40, block_time=8)
+    [_, withdrawals] = latency_specs(timing)
+
+    latencies = Latencies(withdrawals)
+    latencies.fold([completed, pending])
+
+    cementation = latencies.stages['L2 withdrawal -> cementation (estimated)']
+    assert cementation.overall.count == 1
+    # (120 + 40 - 100) blocks of 8 seconds:
+    assert cementation.overall.quantile(0.5) == 480
+    execution = latencies.stages['L2 withdrawal -> L1 execution']
+    assert execution.overall.count == 1
+    assert execution.groups['kind', 'fast (user)'].quantile(0.99) == 14 * 86400
@@ -0,0 +1,368 @@
+"""Offline tests for the service provider tools: the indexer is the in-memory
+fake of the monitoring tests and the Tezos side is mocked."""
+
+from pathlib import Path
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+from pytezos.contract.interface import ContractInterface
+from pytezos.michelson.types.big_map import BigMapType
+
+from scripts.helpers.contracts.fast_withdrawal import (
+    Cemented,
+    PaidOut,
+    Status,
+    Withdrawal,
+)
+from scripts.helpers.rollup_timing import RollupTiming
+from scripts.helpers.ticket_content import TicketContent
+from scripts.helpers.utility import get_build_dir, pack
+from scripts.provider.liquidity import (
+    LiquidityForecast,
+    LiquidityTracker,
+    LockedPayout,
+)
+from scripts.provider import mirror as mirror_module
+from scripts.provider.mirror import (
+    BigMapUpdate,
+    StatusChange,
+    WithdrawalsMirror,
+    read_block_updates,
+)
+from scripts.provider.payouts import PayoutEngine, make_candidate, select_payouts
+from scripts.tests.monitoring_test import FakeIndexer
+
+XTZ_TICKETER = 'KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjdeW'
+BASE_WITHDRAWER = 'tz1burnburnburnburnburnburnburjAYjjX'
+
+
+def make_withdrawal(
+    withdrawal_id: int, full_amount: int, discounted: int, timestamp: int = 1000
+) -> Withdrawal:
+    return Withdrawal(
+        withdrawal_id=withdrawal_id,
+        full_amount=full_amount,
+        ticketer=XTZ_TICKETER,
+        content=TicketContent(0, None),
+        timestamp=timestamp,
+        base_withdrawer=BASE_WITHDRAWER,
+        payload=pack(discounted, 'nat'),
+        l2_caller=b'\x00' * 20,
+    )
+
+
+def test_payout_is_discounted_until_expiry_and_full_after() -> None:
+    withdrawal = make_withdrawal(1, 1000, 900, timestamp=1000)
+
+    early = make_candidate(withdrawal, 100, now=1010, expiry_margin=10)
+    assert early is not None and (early.payout, early.fee) == (900, 100)
+    late = make_candidate(withdrawal, 100, now=1101, expiry_margin=10)
+    assert late is not None and (late.payout, late.fee) == (1000, 0)
+    # Too close to the expiry, or not applied on L2 yet at `now`:
+    assert make_candidate(withdrawal, 100, now=1095, expiry_margin=10) is None
+    assert make_candidate(withdrawal, 100, now=999, expiry_margin=10) is None
+    # A payload above the full amount is rejected by the contract:
+    greedy = make_withdrawal(2, 1000, 1001)
+    assert make_candidate(greedy, 100, now=1010, expiry_margin=10) is None
+
+
+def test_payouts_are_ranked_by_fee_rate_then_expiry_within_balance() -> None:
+    withdrawals = [
+        make_withdrawal(1, 1000, 990, timestamp=1000),  # 1% fee
+        make_withdrawal(2, 1000, 900, timestamp=1000),  # 11% fee
+        make_withdrawal(3, 2000, 1800, timestamp=900),  # 11%, expires sooner
+        make_withdrawal(4, 500, 500, timestamp=1000),  # no fee
+    ]
+    candidates = [make_candidate(w, 1000, 1500, 60) for w in withdrawals]
+
+    selected = select_payouts([c for c in candidates if c], 2800, min_fee=1)
+
+    assert [c.withdrawal.withdrawal_id for c in selected] == [3, 2]
+    # Withdrawal 1 would earn less per mutez and does not fit in what is left:
+    assert sum(c.payout for c in selected) == 2700
+
+
+def _fast_withdrawal_row(
+    n: int,
+    updated_at: str,
+    kind: str = 'fast_withdrawal',
+    payload: int = 900,
+    l1_account: str = BASE_WITHDRAWER,
+) -> dict[str, Any]:
+    return {
+        'id': f'{n:04d}',
+        'created_at': '2025-01-01',
+        'updated_at': updated_at,
+        'is_completed': False,
+        'type': 'withdrawal',
+        'kind': kind,
+        'l1_account': l1_account,
+        'withdrawal': {
+            'l2_transaction': {
+                'kernel_withdrawal_id': n,
+                'amount': str(1000 * 10**12),
+                'l1_account': BASE_WITHDRAWER,
+                'l2_account': '00' * 20,
+                'timestamp': '2025-01-01T00:00:00+00:00',
+                'fast_payload': '0x' + pack(payload, 'nat').hex(),
+                'ticket': {
+                    'ticketer_address': XTZ_TICKETER,
+                    'metadata': None,
+                    'ticket_id': '0',
+                },
+            }
+        },
+    }
+
+
+def test_engine_follows_unpaid_withdrawals_from_the_indexer() -> None:
+    rows = [_fast_withdrawal_row(n, f'2025-01-0{n}') for n in (1, 2, 3)]
+    indexer = FakeIndexer(rows)
+    fast_withdrawal = Mock()
+    fast_withdrawal.read_storage.return_value = {
+        'config': {
+            'expiration_seconds': lambda: 3600,
+            'xtz_ticketer': lambda: XTZ_TICKETER,
+        }
+    }
+    engine = PayoutEngine(Mock(), fast_withdrawal, indexer, page_size=2)  # type: ignore[arg-type]
+
+    engine.seed()
+    assert sorted(w.withdrawal_id for w in engine.unpaid.values()) == [1, 2, 3]
+
+    # Withdrawal 2 is paid out by someone else, and a new one comes in:
+    rows[1] = _fast_withdrawal_row(2, '2025-01-04', kind='fast_withdrawal_payed_out')
+    rows.append(_fast_withdrawal_row(5, '2025-01-05'))
+    engine.follow()
+    assert sorted(w.withdrawal_id for w in engine.unpaid.values()) == [1, 3, 5]
+    assert engine.cursor is not None and engine.cursor['id'] == '0005'
+
+
+def make_withdrawals_big_map(ptr: int) -> BigMapType:
+    build_file = Path(get_build_dir()) / 'fast-withdrawal.tz'
+    contract = ContractInterface.from_file(str(build_file))
+    big_map = contract.program.storage.args[0].args[0].from_python_object(ptr)
+    assert isinstance(big_map, BigMapType)
+    return big_map
+
+
+class FakeDiffSource:
+    def __init__(self, head: int, updates: list[BigMapUpdate]) -> None:
+        self.head = head
+        self.updates = updates
+        self.reads: list[tuple[int, int]] = []
+
+    def head_level(self) -> int:
+        return self.head
+
+    def read(self, ptr: int, from_level: int, to_level: int) -> list[BigMapUpdate]:
+        self.reads.append((from_level, to_level))
+        return [u for u in self.updates if from_level <= u.level <= to_level]
+
+
+def _paid_out(provider: str) -> dict:
+    return {'prim': 'Left', 'args': [{'string': provider}]}
+
+
+CEMENTED = {'prim': 'Right', 'args': [{'prim': 'Unit'}]}
+
+
+def test_block_updates_include_internal_results_of_the_big_map_only() -> None:
+    def result(ptr: int, key_hash: str, status: str = 'applied') -> dict:
+        diff = {
+            'action': 'update',
+            'updates': [{'key_hash': key_hash, 'value': CEMENTED}],
+        }
+        return {
+            'status': status,
+            'lazy_storage_diff': [{'kind': 'big_map', 'id': str(ptr), 'diff': diff}],
+        }
+
+    operations: list[dict] = [
+        {'contents': [{'metadata': {'operation_result': result(17, 'expr1')}}]},
+        {
+            'contents': [
+                {
+                    'metadata': {
+                        'operation_result': {'status': 'applied'},
+                        'internal_operation_results': [
+                            {'result': result(17, 'expr2')},
+                            {'result': result(18, 'expr3')},
+                        ],
+                    }
+                },
+                {'metadata': {'operation_result': result(17, 'expr4', 'backtracked')}},
+            ]
+        },
+    ]
+
+    updates = read_block_updates(operations, 17, 100)
+
+    assert updates == [
+        BigMapUpdate(100, 'expr1', CEMENTED),
+        BigMapUpdate(100, 'expr2', CEMENTED),
+    ]
+
+
+def test_mirror_follows_confirmed_diffs_and_feeds_changes(tmp_path: Path) -> None:
+    withdrawal = make_withdrawal(1, 1000, 900)
+    mirror_file = tmp_path / 'mirror.json'
+    mirror = WithdrawalsMirror(
+        make_withdrawals_big_map(17), FakeDiffSource(0, []), start_level=10
+    )
+    key_hash = mirror.key_hash(withdrawal)
+    source = FakeDiffSource(
+        14,
+        [
+            BigMapUpdate(11, key_hash, _paid_out(BASE_WITHDRAWER)),
+            BigMapUpdate(13, key_hash, CEMENTED),
+        ],
+    )
+    mirror.source = source
+    mirror.path = mirror_file
+    feed: list[StatusChange] = []
+    mirror.subscribe(feed.append)
+    # A reader of the file, as in payout_fast_withdrawals:
+    reader = WithdrawalsMirror(make_withdrawals_big_map(17), source, path=mirror_file)
+    assert not reader.reload()
+
+    # Level 13 is not confirmed at head 14 yet:
+    mirror.sync()
+    assert reader.reload()
+    assert not reader.reload()
+    assert reader.get_status(withdrawal).value == PaidOut(BASE_WITHDRAWER)
+    assert source.reads == [(10, 12)]
+    assert mirror.get_status(withdrawal).value == PaidOut(BASE_WITHDRAWER)
+    assert feed == [
+        StatusChange(11, key_hash, Status(None), Status(PaidOut(BASE_WITHDRAWER)))
+    ]
+
+    source.head = 20
+    changes = mirror.sync()
+    assert [c.new.value for c in changes] == [Cemented()]
+    assert mirror.next_level == 19
+
+    reloaded = WithdrawalsMirror(make_withdrawals_big_map(17), source, path=mirror_file)
+    assert reloaded.next_level == 19
+    assert reloaded.get_status(withdrawal).value == Cemented()
+
+
+def test_mirror_saves_each_chunk_of_a_long_catch_up(
+    tmp_path: Path, monkeypatch: Any
+) -> None:
+    monkeypatch.setattr(mirror_module, 'SYNC_CHUNK_LEVELS', 3)
+    withdrawal = make_withdrawal(1, 1000, 900)
+    mirror_file = tmp_path / 'mirror.json'
+    source = FakeDiffSource(12, [])
+    mirror = WithdrawalsMirror(
+        make_withdrawals_big_map(17), source, start_level=1, path=mirror_file
+    )
+    source.updates = [
+        BigMapUpdate(2, mirror.key_hash(withdrawal), _paid_out(BASE_WITHDRAWER))
+    ]
+    failing_read = source.read
+
+    def read(ptr: int, from_level: int, to_level: int) -> list[BigMapUpdate]:
+        if from_level > 3:
+            raise ConnectionError('node went away')
+        return failing_read(ptr, from_level, to_level)
+
+    source.read = read  # type: ignore[method-assign]
+    with pytest.raises(ConnectionError):
+        mirror.sync()
+    reloaded = WithdrawalsMirror(make_withdrawals_big_map(17), source, path=mirror_file)
+    assert reloaded.next_level == 4
+    assert reloaded.get_status(withdrawal).value == PaidOut(BASE_WITHDRAWER)
+
+    source.read = failing_read  # type: ignore[method-assign]
+    mirror.sync()
+    assert source.reads == [(1, 3), (4, 6), (7, 9), (10, 10)]
+    assert mirror.next_level == 11
+    assert reloaded.get_status(make_withdrawal(2, 1000, 900)).is_none()
+    assert [path.name for path in tmp_path.iterdir()] == ['mirror.json']
+
+
+def test_engine_skips_withdrawals_the_mirror_knows_are_paid_out() -> None:
+    fast_withdrawal = Mock()
+    fast_withdrawal.read_storage.return_value = {
+        'config': {
+            'expiration_seconds': lambda: 3600,
+            'xtz_ticketer': lambda: XTZ_TICKETER,
+        }
+    }
+    mirror = WithdrawalsMirror(make_withdrawals_big_map(17), FakeDiffSource(0, []))
+    engine = PayoutEngine(Mock(), fast_withdrawal, Mock(), 10, mirror)
+    engine.unpaid = {f'{n}': make_withdrawal(n, 1000, 900) for n in (1, 2)}
+    paid_out = Status(PaidOut(BASE_WITHDRAWER))
+    mirror.statuses[mirror.key_hash(engine.unpaid['1'])] = paid_out
+
+    selected = engine.decide(now=1010, balance=10**6, min_fee=1, expiry_margin=60)
+
+    assert [c.withdrawal.withdrawal_id for c in selected] == [2]
+
+
+def test_forecast_curve_frees_payouts_by_bucket() -> None:
+    forecast = LiquidityForecast()
+    forecast.add(LockedPayout('a', 1, advanced=90, returns=100, frees_at=950))
+    forecast.add(LockedPayout('b', 2, advanced=180, returns=200, frees_at=1500))
+    forecast.add(LockedPayout('c', 3, advanced=270, returns=300, frees_at=1100))
+    forecast.add(LockedPayout('d', 4, advanced=360, returns=400, frees_at=2000))
+    forecast.remove('d')
+    assert (forecast.locked, forecast.returns) == (540, 600)
+
+    assert [p.operation_id for p in forecast.overdue(now=1000)] == ['a']
+    # `a` is overdue, `c` and `b` free up in the first and second hour:
+    assert forecast.curve(balance=1000, now=1000, bucket=3600) == [
+        (1000, 100, 1100, 450),
+        (4600, 500, 1600, 0),
+    ]
+    assert forecast.curve(balance=1000, now=1000, bucket=100) == [
+        (1000, 100, 1100, 450),
+        (1100, 300, 1400, 180),
+        (1500, 200, 1600, 0),
+    ]
+
+
+def test_tracker_locks_only_the_providers_unsettled_payouts() -> None:
+    fast_withdrawal = Mock()
+    fast_withdrawal.read_storage.return_value = {
+        'config': {'expiration_seconds': lambda: 3600}
+    }
+    provider = 'tz1Ke2h7sDdakHJQh8WX4Z372du1KChsksyU'
+    other = 'tz1ekkzEN2LB1cpf7dCaonKt6x9KVd9YVydc'
+    timing = RollupTiming(commitment_period=20, challenge_window=40, block_time=8)
+
+    def row(n: int, kind: str, l1_account: str, **fields: Any) -> dict[str, Any]:
+        row = _fast_withdrawal_row(
+            n, '2025-01-01T00:10:00+00:00', kind=kind, l1_account=l1_account
+        )
+        return {**row, 'created_at': '2025-01-01T00:10:00+00:00', **fields}
+
+    # A payout gives the withdrawal a completed row for the withdrawer and
+    # an unsettled one for the provider:
+    provider_side = row(1, 'fast_withdrawal_service_provider', provider)
+    rows = [
+        provider_side,
+        row(2, 'fast_withdrawal_payed_out', BASE_WITHDRAWER, is_completed=True),
+        row(3, 'fast_withdrawal_service_provider', other),
+        row(4, 'fast_withdrawal', BASE_WITHDRAWER),
+    ]
+    indexer = FakeIndexer(rows)
+    tracker = LiquidityTracker(
+        fast_withdrawal, indexer, provider, timing, page_size=10  # type: ignore[arg-type]
+    )
+
+    tracker.seed()
+
+    assert list(tracker.forecast.payouts) == ['0001']
+    payout = tracker.forecast.payouts['0001']
+    # Paid out within the expiration, so the discounted amount was advanced:
+    assert (payout.advanced, payout.returns) == (900, 1000)
+    assert payout.frees_at == 1735689600 + 60 * 8
+
+    # Still locked once sealed, unlocked when settled:
+    tracker.apply([{**provider_side, 'status': 'SEALED'}])
+    assert tracker.forecast.locked == 900
+    tracker.apply([{**provider_side, 'status': 'FINISHED', 'is_completed': True}])
+    assert tracker.forecast.locked == 0
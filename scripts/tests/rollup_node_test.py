@@ -0,0 +1,174 @@
+"""Offline tests for the rollup node helpers: the node RPC is replaced by stubs."""
+
+import random
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+import requests
+
+from scripts.helpers.rate_limiter import TokenBucket
+from scripts.helpers.rollup_node import RollupNodeClient
+from scripts.rollup_node.scan_outbox import iter_outbox, last_written_level
+from scripts.tezos.outbox_executor import ExecutorState, scan_cemented
+from scripts.tezos.execute_outbox_messages import (
+    OutboxMessage,
+    fetch_proofs,
+    pack_batches,
+)
+
+
+def test_iter_outbox_yields_in_level_order(monkeypatch: pytest.MonkeyPatch) -> None:
+    def get_messages(self: RollupNodeClient, level: int) -> Any:
+        # Out-of-order completion must not reorder the results.
+        time.sleep(random.random() / 100)
+        return [level]
+
+    monkeypatch.setattr(RollupNodeClient, 'get_messages', get_messages)
+    client = RollupNodeClient('http://node')
+
+    results = list(iter_outbox(client, range(100, 140), 8, rate=10_000))
+
+    assert results == [(level, [level]) for level in range(100, 140)]
+
+
+def test_last_written_level_drops_truncated_line(tmp_path: Path) -> None:
+    output = tmp_path / 'outbox.jsonl'
+    assert last_written_level(output) is None
+
+    output.write_text('{"level": 5, "messages": []}\n{"level": 6, "mess')
+
+    assert last_written_level(output) == 5
+    assert output.read_text() == '{"level": 5, "messages": []}\n'
+
+
+def test_token_bucket_limits_rate() -> None:
+    bucket = TokenBucket(rate=200, burst=5)
+    start = time.monotonic()
+    for _ in range(25):
+        bucket.acquire()
+
+    # 5 tokens are available upfront, the other 20 arrive at 200/s.
+    assert time.monotonic() - start >= 0.09
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: Any) -> None:
+        self.status_code = status_code
+        self.body = body
+
+    def json(self) -> Any:
+        return self.body
+
+
+def test_client_retries_connection_errors_and_overload(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    outcomes: list[Exception | FakeResponse] = [
+        requests.ConnectionError('reset'),
+        FakeResponse(503, None),
+        FakeResponse(200, {'commitment': 'src1', 'proof': '0x00'}),
+    ]
+    urls = []
+
+    def get(url: str, timeout: Any) -> FakeResponse:
+        urls.append(url)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    client = RollupNodeClient('http://node:8932', backoff=0)
+    monkeypatch.setattr(client.session, 'get', get)
+
+    assert client.get_proof(7, 2) == {'commitment': 'src1', 'proof': '0x00'}
+    assert (
+        urls
+        == [
+            'http://node:8932/global/block/head/helpers/proofs/outbox/7/messages?index=2'
+        ]
+        * 3
+    )
+    stats = client.stats['proofs/outbox']
+    assert (stats.requests, stats.retries, stats.failures) == (1, 2, 0)
+
+
+def test_client_gives_up_after_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    def get(url: str, timeout: Any) -> FakeResponse:
+        raise requests.Timeout('slow')
+
+    client = RollupNodeClient('http://node', retries=2, backoff=0)
+    monkeypatch.setattr(client.session, 'get', get)
+
+    with pytest.raises(requests.Timeout):
+        client.get_messages(1)
+    assert client.stats['head/outbox'].failures == 1
+
+
+def test_fetch_proofs_splits_missing(monkeypatch: pytest.MonkeyPatch) -> None:
+    def get_proof(self: RollupNodeClient, level: int, index: int) -> Any:
+        if level > 10:
+            return [{'kind': 'permanent', 'id': 'not_cemented'}]
+        return {'commitment': f'src{level}', 'proof': '00' * index}
+
+    monkeypatch.setattr(RollupNodeClient, 'get_proof', get_proof)
+    client = RollupNodeClient('http://node')
+
+    ready, missing = fetch_proofs(client, [(1, 2), (11, 0), (3, 4)], 2)
+
+    assert ready == [
+        OutboxMessage(1, 2, 'src1', '0000'),
+        OutboxMessage(3, 4, 'src3', '00000000'),
+    ]
+    assert missing == [(11, 0)]
+
+
+def test_pack_batches_by_count_and_proof_size() -> None:
+    messages = [
+        OutboxMessage(1, n, 'src1', 'ab' * size)
+        for n, size in enumerate([10, 10, 10, 50, 10, 10, 10, 10])
+    ]
+
+    batches = pack_batches(messages, max_count=3, max_proof_bytes=40)
+
+    assert [[m.index for m in batch] for batch in batches] == [
+        [0, 1, 2],
+        [3],
+        [4, 5, 6],
+        [7],
+    ]
+
+
+def test_scan_cemented_queues_each_message_once(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    cemented = {10: [{'message_index': 0}, {'message_index': 1}], 12: [{}]}
+    monkeypatch.setattr(RollupNodeClient, 'get_cemented_level', lambda self: 12)
+    monkeypatch.setattr(
+        RollupNodeClient,
+        'get_cemented_messages',
+        lambda self, level: cemented.get(level, []),
+    )
+    client = RollupNodeClient('http://node')
+    state = ExecutorState(tmp_path / 'state.json', next_level=10)
+    state.executed['10/1'] = 'oo1'
+
+    assert scan_cemented(client, state, 4, rate=10_000) == 2
+    assert state.queue == [(10, 0), (12, 0)]
+    assert state.next_level == 13
+
+    restored = ExecutorState.load(state.path)
+    assert restored == state
+    assert scan_cemented(client, restored, 4, rate=10_000) == 0
+
+
+def test_executor_state_forgets_outcomes_behind_the_history(tmp_path: Path) -> None:
+    state = ExecutorState(tmp_path / 'state.json', next_level=1500)
+    state.executed = {'400/0': 'oo1', '500/0': 'oo2', '1400/1': 'oo3'}
+    state.failed = ['499/2', '500/1']
+
+    state.prune()
+
+    assert state.executed == {'500/0': 'oo2', '1400/1': 'oo3'}
+    assert state.failed == ['500/1']
@@ -5,6 +5,7 @@ from scripts.tezos.deploy_ticketer import deploy_ticketer
 from scripts.tezos.deploy_router import deploy_router
 from scripts.tezos.deploy_token_bridge_helper import deploy_token_bridge_helper
 from scripts.tezos.fa_deposit import fa_deposit
+from scripts.tezos.fa_deposit_bulk import fa_deposit_bulk
 from scripts.tezos.execute_outbox_message import execute_outbox_message
 from scripts.tezos.get_ticketer_params import get_ticketer_params
 from scripts.tezos.xtz_deposit import xtz_deposit
@@ -22,6 +23,7 @@ __all__ = [
     'deploy_router',
     'deploy_token_bridge_helper',
     'fa_deposit',
+    'fa_deposit_bulk',
     'execute_outbox_message',
     'get_ticketer_params',
     'xtz_deposit',
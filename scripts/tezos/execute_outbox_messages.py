@@ -0,0 +1,236 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence
+
+import click
+from gql import gql
+from pytezos.client import PyTezosClient
+from pytezos.operation.group import OperationGroup
+
+from scripts import cli_options
+from scripts.helpers.batching import inject_in_groups
+from scripts.helpers.formatting import accent, echo_variable, error, wrap
+from scripts.helpers.rollup_node import RollupNodeClient
+from scripts.helpers.utility import get_tezos_client
+from scripts.monitoring.common import make_client, run_query
+
+# An operation is at most `max_operation_data_length` (32 KiB) bytes; leave room
+# for the rollup address, commitment and signature of each content.
+MAX_BATCH_PROOF_BYTES = 28_000
+
+SEALED_WITHDRAWALS_QUERY = gql(
+    """
+    query SealedWithdrawals($limit: Int!) {
+        bridge_operation(
+            where: {type: {_eq: "withdrawal"}, status: {_eq: "SEALED"}}
+            order_by: {created_at: asc}
+            limit: $limit
+        ) {
+            withdrawal { outbox_message { level index } }
+        }
+    }
+    """
+)
+
+
+@dataclass(frozen=True)
+class OutboxMessage:
+    level: int
+    index: int
+    commitment: str
+    proof: str
+
+    @property
+    def proof_size(self) -> int:
+        return len(self.proof) // 2
+
+    def __str__(self) -> str:
+        return f'{self.level}/{self.index}'
+
+
+def parse_messages(
+    ctx: click.Context, param: click.Parameter, values: Sequence[str]
+) -> list[tuple[int, int]]:
+    messages = []
+    for value in values:
+        level, sep, index = value.partition('/')
+        if not sep or not level.isdigit() or not index.isdigit():
+            raise click.BadParameter(f'expected LEVEL/INDEX, got `{value}`')
+        messages.append((int(level), int(index)))
+    return messages
+
+
+def sealed_withdrawals(limit: int) -> list[tuple[int, int]]:
+    """`(level, index)` of the withdrawals the indexer sees as ready to execute."""
+
+    client, _ = make_client()
+    data = run_query(client, SEALED_WITHDRAWALS_QUERY, {'limit': limit})
+    messages = []
+    for operation in data['bridge_operation']:
+        outbox_message = operation['withdrawal']['outbox_message']
+        messages.append((int(outbox_message['level']), int(outbox_message['index'])))
+    return messages
+
+
+def fetch_proofs(
+    client: RollupNodeClient,
+    messages: Sequence[tuple[int, int]],
+    concurrency: int,
+) -> tuple[list[OutboxMessage], list[tuple[int, int]]]:
+    """Fetches the proofs of `messages` concurrently; returns the messages with
+    a proof and those the node has none for (e.g. not cemented yet)."""
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        proofs = executor.map(lambda m: client.get_proof(*m), messages)
+        ready: list[OutboxMessage] = []
+        missing: list[tuple[int, int]] = []
+        for (level, index), proof in zip(messages, proofs):
+            if 'commitment' in proof:
+                ready.append(
+                    OutboxMessage(level, index, proof['commitment'], proof['proof'])
+                )
+            else:
+                missing.append((level, index))
+    return ready, missing
+
+
+def pack_batches(
+    messages: Sequence[OutboxMessage],
+    max_count: int,
+    max_proof_bytes: int = MAX_BATCH_PROOF_BYTES,
+) -> list[list[OutboxMessage]]:
+    """Greedily packs messages into batches of at most `max_count` contents and
+    `max_proof_bytes` of proofs (a larger proof gets a batch of its own)."""
+
+    batches: list[list[OutboxMessage]] = []
+    batch: list[OutboxMessage] = []
+    size = 0
+    for message in messages:
+        if batch and (
+            len(batch) >= max_count or size + message.proof_size > max_proof_bytes
+        ):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(message)
+        size += message.proof_size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def execute_batches(
+    manager: PyTezosClient,
+    smart_rollup_address: str,
+    messages: Sequence[OutboxMessage],
+    batch_size: int,
+) -> Iterator[tuple[list[OutboxMessage], Optional[str]]]:
+    """Executes `messages` in bulk, yielding each group's messages with its
+    operation hash (None for messages that failed simulation)."""
+
+    def make_call(message: OutboxMessage) -> OperationGroup:
+        operation: OperationGroup = manager.smart_rollup_execute_outbox_message(
+            smart_rollup_address, message.commitment, bytes.fromhex(message.proof)
+        )
+        return operation
+
+    # Only one manager operation group per account fits in a block, so each
+    # group is confirmed before the next one is injected.
+    for batch in pack_batches(messages, batch_size):
+        yield from inject_in_groups(manager, batch, make_call, len(batch))
+
+
+def execute_outbox_messages(
+    message: list[tuple[int, int]],
+    sealed: bool,
+    limit: int,
+    concurrency: int,
+    batch_size: int,
+    smart_rollup_address: str,
+    tezos_private_key: str,
+    tezos_rpc_url: str,
+    etherlink_rollup_node_url: str,
+) -> list[str]:
+    """Fetches proofs for many outbox messages and executes them in bulk"""
+
+    messages = list(message)
+    if sealed:
+        messages += sealed_withdrawals(limit)
+    if not messages:
+        click.echo('No outbox messages to execute.')
+        return []
+
+    manager = get_tezos_client(tezos_rpc_url, tezos_private_key)
+    click.echo('Executing outbox messages:')
+    echo_variable('  - ', 'Messages', str(len(messages)))
+    echo_variable('  - ', 'Smart Rollup address', smart_rollup_address)
+    echo_variable('  - ', 'Executor', manager.key.public_key_hash())
+    echo_variable('  - ', 'Tezos RPC node', tezos_rpc_url)
+
+    node = RollupNodeClient(etherlink_rollup_node_url, pool_size=concurrency)
+    ready, missing = fetch_proofs(node, messages, concurrency)
+    node.close()
+    for level, index in missing:
+        click.echo(error(f'No proof for outbox message {level}/{index} yet.'))
+
+    operation_hashes = []
+    for executed, operation_hash in execute_batches(
+        manager, smart_rollup_address, ready, batch_size
+    ):
+        if operation_hash is None:
+            continue
+        operation_hashes.append(operation_hash)
+        click.echo(
+            f'Executed {len(executed)} outbox messages '
+            + f'({", ".join(map(str, executed))}), tx hash: '
+            + wrap(accent(operation_hash))
+        )
+    return operation_hashes
+
+
+message_option = click.option(
+    '--message',
+    multiple=True,
+    callback=parse_messages,
+    help='Outbox message to execute as LEVEL/INDEX; can be repeated.',
+)
+sealed_option = click.option(
+    '--sealed',
+    is_flag=True,
+    default=False,
+    help='Also execute the withdrawals the indexer reports as SEALED.',
+)
+limit_option = click.option(
+    '--limit',
+    default=200,
+    show_default=True,
+    help='Max number of SEALED withdrawals to take from the indexer.',
+)
+concurrency_option = click.option(
+    '--concurrency',
+    default=8,
+    show_default=True,
+    help='Max number of proof requests in flight.',
+)
+batch_size_option = click.option(
+    '--batch-size',
+    default=20,
+    show_default=True,
+    help='Max outbox messages per operation group.',
+)
+
+
+execute_outbox_messages_command = cli_options.command(
+    execute_outbox_messages,
+    name='execute_outbox_messages',
+    options=[
+        message_option,
+        sealed_option,
+        limit_option,
+        concurrency_option,
+        batch_size_option,
+        cli_options.smart_rollup_address,
+        cli_options.tezos_private_key,
+        cli_options.tezos_rpc_url,
+        cli_options.etherlink_rollup_node_url,
+    ],
+)
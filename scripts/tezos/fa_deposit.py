@@ -1,5 +1,6 @@
 import click
 from scripts.helpers.contracts.token_bridge_helper import TokenBridgeHelper
+from scripts.helpers.snapshot import at_block
 from scripts.helpers.utility import get_tezos_client
 from scripts.helpers.formatting import (
     accent,
@@ -25,8 +26,9 @@ def fa_deposit(
     token_bridge_helper = TokenBridgeHelper.from_address(
         manager, token_bridge_helper_address
     )
-    ticketer = token_bridge_helper.get_ticketer()
-    token = ticketer.get_token()
+    with at_block(manager):
+        ticketer = token_bridge_helper.get_ticketer()
+        token = ticketer.get_token()
     # TODO: validate manager has tokens in the token contract
 
     click.echo(
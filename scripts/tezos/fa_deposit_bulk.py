@@ -0,0 +1,291 @@
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import click
+from pytezos.client import PyTezosClient
+from pytezos.contract.call import ContractCall
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from scripts import cli_options
+from scripts.helpers.batching import inject_in_groups
+from scripts.helpers.contracts.token_bridge_helper import TokenBridgeHelper
+from scripts.helpers.contracts.tokens.token import TokenHelper
+from scripts.helpers.etherlink import FaWithdrawalPrecompileHelper
+from scripts.helpers.formatting import accent, echo_variable, error, wrap
+from scripts.helpers.records import read_records
+from scripts.helpers.snapshot import at_block
+from scripts.helpers.ticket_identity import get_ticket_identity
+from scripts.helpers.utility import (
+    get_etherlink_account,
+    get_etherlink_web3,
+    get_tezos_client,
+)
+from scripts.networks import load_network
+
+
+@dataclass(frozen=True)
+class DepositRequest:
+    row: int
+    helper: str
+    receiver: str
+    amount: int
+
+
+@dataclass(frozen=True)
+class HelperRoute:
+    """What deposits through one Token Bridge Helper need: the helper and its
+    token (for approvals), and the L2 side keys of the resulting queued deposits."""
+
+    helper: TokenBridgeHelper
+    token: TokenHelper
+    ticket_hash: int
+    erc20_proxy: str
+
+
+@dataclass(frozen=True)
+class PlannedOperation:
+    call: ContractCall
+    # None for approvals:
+    deposit: Optional[DepositRequest] = None
+
+
+def read_deposits(path: Path) -> list[DepositRequest]:
+    """Reads `helper, receiver, amount` rows from a CSV file (with a header) or
+    from JSON lines; `helper` is a Token Bridge Helper address or a token
+    symbol from the network config."""
+
+    helpers = {t.symbol: t.l1_ticket_helper_address for t in load_network().tokens}
+    deposits = []
+    for row, fields in enumerate(read_records(path)):
+        helper = str(fields['helper']).strip()
+        deposits.append(
+            DepositRequest(
+                row=row,
+                helper=helpers.get(helper, helper),
+                receiver=str(fields['receiver']).strip(),
+                amount=int(fields['amount']),
+            )
+        )
+    return deposits
+
+
+def resolve_helpers(
+    manager: PyTezosClient, addresses: set[str]
+) -> dict[str, HelperRoute]:
+    """Loads every helper's ticketer, token, ticket hash and ERC20 Proxy once,
+    all read at the same block."""
+
+    routes = {}
+    with at_block(manager):
+        for address in sorted(addresses):
+            helper = TokenBridgeHelper.from_address(manager, address)
+            ticketer = helper.get_ticketer()
+            identity = get_ticket_identity(ticketer.address, ticketer.read_content())
+            erc_proxy: bytes = helper.read_storage()['erc_proxy']()
+            routes[address] = HelperRoute(
+                helper=helper,
+                token=ticketer.get_token(),
+                ticket_hash=identity.hash,
+                erc20_proxy=Web3.to_checksum_address('0x' + erc_proxy.hex()),
+            )
+    return routes
+
+
+def plan_operations(
+    manager: PyTezosClient,
+    deposits: Sequence[DepositRequest],
+    routes: dict[str, HelperRoute],
+    smart_rollup_address: str,
+) -> list[PlannedOperation]:
+    """Orders the contents of all deposits: each token is approved for each of
+    its helpers once (disallow + allow, as FA1.2 forbids changing a non-zero
+    allowance), right before that helper's deposits."""
+
+    operations = []
+    for address in dict.fromkeys(d.helper for d in deposits):
+        route = routes[address]
+        operations.append(PlannedOperation(route.token.disallow(manager, route.helper)))
+        operations.append(PlannedOperation(route.token.allow(manager, route.helper)))
+        for deposit in deposits:
+            if deposit.helper == address:
+                receiver = bytes.fromhex(deposit.receiver.replace('0x', ''))
+                call = route.helper.deposit(
+                    smart_rollup_address, receiver, deposit.amount
+                )
+                operations.append(PlannedOperation(call, deposit))
+    return operations
+
+
+def claim_queued_deposits(
+    claimer: FaWithdrawalPrecompileHelper,
+    deposits: Sequence[DepositRequest],
+    routes: dict[str, HelperRoute],
+    baselines: dict[tuple[int, str, str], int],
+    timeout: int,
+) -> list[str]:
+    """Waits until every deposit shows up as a `QueuedDeposit` on L2, then
+    claims all of them in one pipelined pass. Returns the tx hashes of the
+    claims sent; nonces already claimed are skipped."""
+
+    expected: Counter[tuple[int, str, str]] = Counter()
+    for deposit in deposits:
+        route = routes[deposit.helper]
+        expected[route.ticket_hash, route.erc20_proxy, deposit.receiver] += 1
+
+    nonces: dict[tuple[int, str, str], list[int]] = {}
+    deadline = time.monotonic() + timeout
+    while True:
+        for key, count in expected.items():
+            if len(nonces.get(key, [])) < count:
+                nonces[key] = claimer.queued_nonces_since(*key, baselines[key])
+        if all(len(nonces[key]) >= count for key, count in expected.items()):
+            break
+        if time.monotonic() > deadline:
+            click.echo(
+                error('Not all deposits are queued on L2 yet, claiming the found ones')
+            )
+            break
+        time.sleep(3)
+
+    # The nonces of a key since the baseline may include deposits someone
+    # else (e.g. the watchtower) claimed meanwhile; their claims revert in gas
+    # estimation and are only marked as claimed:
+    index = claimer.queued_deposits
+    gone, sent, tx_hashes = [], [], []
+    for key in expected:
+        for nonce in nonces[key]:
+            if nonce in index.claimed:
+                continue
+            try:
+                transaction = claimer.build_claim(nonce)
+            except ContractLogicError:
+                gone.append(nonce)
+                continue
+            tx_hashes.append(claimer.send(transaction))
+            sent.append(nonce)
+    index.mark_claimed(gone)
+    receipts = claimer.nonces.wait(tx_hashes)
+    index.mark_claimed(
+        [nonce for nonce, receipt in zip(sent, receipts) if receipt['status'] == 1]
+    )
+    return [receipt['transactionHash'].hex() for receipt in receipts]
+
+
+def fa_deposit_bulk(
+    input_file: Path,
+    batch_size: int,
+    claim: bool,
+    claim_timeout: int,
+    smart_rollup_address: str,
+    withdraw_precompile: str,
+    tezos_private_key: str,
+    tezos_rpc_url: str,
+    etherlink_private_key: str,
+    etherlink_rpc_url: str,
+) -> list[str]:
+    """Deposits many FA tokens at once, packing them into few operation groups"""
+
+    deposits = read_deposits(input_file)
+    manager = get_tezos_client(tezos_rpc_url, tezos_private_key)
+    routes = resolve_helpers(manager, {d.helper for d in deposits})
+
+    click.echo('Making bulk FA deposit:')
+    echo_variable('  - ', 'Executor', manager.key.public_key_hash())
+    echo_variable('  - ', 'Tezos RPC node', tezos_rpc_url)
+    echo_variable('  - ', 'Smart Rollup address', smart_rollup_address)
+    echo_variable('  - ', 'Deposits', str(len(deposits)))
+    echo_variable('  - ', 'Token Bridge Helpers', str(len(routes)))
+
+    claimer = None
+    baselines: dict[tuple[int, str, str], int] = {}
+    if claim:
+        web3 = get_etherlink_web3(etherlink_rpc_url)
+        account = get_etherlink_account(web3, etherlink_private_key)
+        claimer = FaWithdrawalPrecompileHelper.from_address(
+            web3=web3, account=account, address=withdraw_precompile
+        )
+        # Queued deposits newer than these nonces are the ones made below:
+        for deposit in deposits:
+            route = routes[deposit.helper]
+            key = (route.ticket_hash, route.erc20_proxy, deposit.receiver)
+            if key not in baselines:
+                baselines[key] = claimer.latest_queued_nonce(*key)
+
+    operations = plan_operations(manager, deposits, routes, smart_rollup_address)
+    operation_hashes = []
+    deposited = []
+    for group, operation_hash in inject_in_groups(
+        manager, operations, lambda op: op.call, batch_size
+    ):
+        group_deposits = [op.deposit for op in group if op.deposit is not None]
+        if operation_hash is None:
+            for deposit in group_deposits:
+                click.echo(error(f'Deposit in row {deposit.row} failed'))
+            continue
+        operation_hashes.append(operation_hash)
+        deposited.extend(group_deposits)
+        click.echo(
+            f'Injected {len(group)} operations ({len(group_deposits)} deposits), '
+            + 'tx hash: '
+            + wrap(accent(operation_hash))
+        )
+
+    if claimer is not None and deposited:
+        claim_hashes = claim_queued_deposits(
+            claimer, deposited, routes, baselines, claim_timeout
+        )
+        click.echo(f'Claimed {len(claim_hashes)} queued deposits on L2')
+        for claim_hash in claim_hashes:
+            click.echo('  - claim tx hash: ' + wrap(accent(claim_hash)))
+    return operation_hashes
+
+
+input_file_option = click.option(
+    '--input-file',
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help='CSV (with a `helper,receiver,amount` header) or JSON lines file of '
+    + 'deposits; `helper` is a Token Bridge Helper address or a token symbol '
+    + 'from the network config.',
+)
+batch_size_option = click.option(
+    '--batch-size',
+    default=30,
+    show_default=True,
+    help='Max contents per operation group (approvals included); groups over '
+    + 'the gas or size limits are split.',
+)
+claim_option = click.option(
+    '--claim/--no-claim',
+    default=True,
+    show_default=True,
+    help='Claim the queued deposits on L2 once they appear.',
+)
+claim_timeout_option = click.option(
+    '--claim-timeout',
+    default=300,
+    show_default=True,
+    help='Seconds to wait for the deposits to be queued on L2.',
+)
+
+
+fa_deposit_bulk_command = cli_options.command(
+    fa_deposit_bulk,
+    name='fa_deposit_bulk',
+    options=[
+        input_file_option,
+        batch_size_option,
+        claim_option,
+        claim_timeout_option,
+        cli_options.smart_rollup_address,
+        cli_options.withdraw_precompile,
+        cli_options.tezos_private_key,
+        cli_options.tezos_rpc_url,
+        cli_options.etherlink_private_key,
+        cli_options.etherlink_rpc_url,
+    ],
+)
@@ -1,9 +1,7 @@
 import click
 from scripts.helpers.contracts.ticketer import Ticketer
-from scripts.helpers.utility import (
-    get_tezos_client,
-    make_address_bytes,
-)
+from scripts.helpers.ticket_identity import get_ticket_identity
+from scripts.helpers.utility import get_tezos_client
 from scripts.helpers.formatting import accent
 from scripts import cli_options
 
@@ -19,9 +17,10 @@ def get_ticketer_params(
     manager = get_tezos_client(tezos_rpc_url, tezos_private_key)
     # TODO: add ticketer validation by checking storage?
     ticketer = Ticketer.from_address(manager, ticketer_address)
-    content_bytes = ticketer.get_content_bytes_hex()
-    address_bytes = make_address_bytes(ticketer_address)
-    ticket_hash = ticketer.read_ticket().hash()
+    identity = get_ticket_identity(ticketer_address, ticketer.read_content())
+    content_bytes = identity.content_bytes
+    address_bytes = identity.address_bytes
+    ticket_hash = identity.hash
 
     if not silent:
         click.echo('Ticketer params:')
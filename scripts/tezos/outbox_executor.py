@@ -0,0 +1,257 @@
+"""Long-running executor of cemented outbox messages.
+
+Follows the rollup node's cemented outbox level by level, queues every message it
+finds and executes the queue in bulk (see `execute_outbox_messages`) as soon as
+the proofs are available. The scanned level, the queue and what was recently
+executed are kept in a JSON state file, so a restart neither rescans nor
+re-executes. A failed round is logged and retried on the next one.
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import click
+
+from scripts import cli_options
+from scripts.helpers.formatting import accent, echo_variable, error, wrap
+from scripts.helpers.rollup_node import RollupNodeClient
+from scripts.helpers.utility import get_tezos_client
+from scripts.networks import load_network
+from scripts.rollup_node.scan_outbox import iter_outbox
+from scripts.tezos.execute_outbox_messages import (
+    batch_size_option,
+    concurrency_option,
+    execute_batches,
+    fetch_proofs,
+)
+
+
+# Outbox levels behind the scan position for which the executed and failed
+# messages are remembered. The scan never goes back, except to rescan the
+# levels since the last save after a crash (at most 100, see
+# `scan_cemented`), so older outcomes are dropped to keep the state bounded:
+HISTORY_LEVELS = 1000
+
+
+def message_key(level: int, index: int) -> str:
+    return f'{level}/{index}'
+
+
+def key_level(key: str) -> int:
+    return int(key.split('/')[0])
+
+
+@dataclass
+class ExecutorState:
+    """Persisted progress: the next outbox level to scan, the messages waiting
+    for execution and the outcome of the ones already handled."""
+
+    path: Path
+    next_level: Optional[int] = None
+    queue: list[tuple[int, int]] = field(default_factory=list)
+    # 'level/index' -> operation hash
+    executed: dict[str, str] = field(default_factory=dict)
+    # 'level/index' of the messages that failed simulation; they are not retried
+    failed: list[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Path) -> 'ExecutorState':
+        if not path.exists():
+            return cls(path)
+        data = json.loads(path.read_text())
+        return cls(
+            path=path,
+            next_level=data['next_level'],
+            queue=[(level, index) for level, index in data['queue']],
+            executed=data['executed'],
+            failed=data['failed'],
+        )
+
+    def save(self) -> None:
+        data = {
+            'next_level': self.next_level,
+            'queue': self.queue,
+            'executed': self.executed,
+            'failed': self.failed,
+        }
+        # Write-then-rename so that a crash mid-write never loses the state.
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp.write_text(json.dumps(data))
+        tmp.replace(self.path)
+
+    def prune(self, history_levels: int = HISTORY_LEVELS) -> None:
+        """Forgets the outcomes of the messages more than `history_levels`
+        below the next level to scan"""
+
+        if self.next_level is None:
+            return
+        oldest = self.next_level - history_levels
+        self.executed = {
+            key: operation_hash
+            for key, operation_hash in self.executed.items()
+            if key_level(key) >= oldest
+        }
+        self.failed = [key for key in self.failed if key_level(key) >= oldest]
+
+    def enqueue(self, level: int, index: int) -> bool:
+        key = message_key(level, index)
+        if key in self.executed or key in self.failed or (level, index) in self.queue:
+            return False
+        self.queue.append((level, index))
+        return True
+
+
+def message_index(message: Any, position: int) -> int:
+    """The index of a message in its outbox level; the node lists them in order
+    and, depending on its version, also reports the index itself."""
+
+    if isinstance(message, dict) and 'message_index' in message:
+        return int(message['message_index'])
+    return position
+
+
+def scan_cemented(
+    node: RollupNodeClient,
+    state: ExecutorState,
+    concurrency: int,
+    rate: float,
+) -> int:
+    """Queues the messages of the levels cemented since the last scan; returns
+    how many were queued."""
+
+    assert state.next_level is not None
+    cemented_level = node.get_cemented_level()
+    levels = range(state.next_level, cemented_level + 1)
+    queued = 0
+    for level, messages in iter_outbox(node, levels, concurrency, rate, True):
+        for position, message in enumerate(messages):
+            queued += state.enqueue(level, message_index(message, position))
+        state.next_level = level + 1
+        if level % 100 == 0:
+            state.save()
+    state.prune()
+    state.save()
+    return queued
+
+
+def outbox_executor(
+    level_from: Optional[int],
+    state_file: Optional[Path],
+    interval: int,
+    concurrency: int,
+    rate: float,
+    batch_size: int,
+    smart_rollup_address: str,
+    tezos_private_key: str,
+    tezos_rpc_url: str,
+    etherlink_rollup_node_url: str,
+) -> None:
+    """Executes outbox messages in bulk as soon as they are cemented"""
+
+    manager = get_tezos_client(tezos_rpc_url, tezos_private_key)
+    node = RollupNodeClient(etherlink_rollup_node_url, pool_size=concurrency)
+    state = ExecutorState.load(
+        state_file or Path(f'.outbox-executor-{load_network().name}.json')
+    )
+    if state.next_level is None:
+        state.next_level = (
+            level_from if level_from is not None else node.get_cemented_level() + 1
+        )
+
+    click.echo('Executing cemented outbox messages:')
+    echo_variable('  - ', 'Smart Rollup address', smart_rollup_address)
+    echo_variable('  - ', 'Executor', manager.key.public_key_hash())
+    echo_variable('  - ', 'Starting at outbox level', str(state.next_level))
+    echo_variable('  - ', 'Queued', str(len(state.queue)))
+    echo_variable('  - ', 'State file', str(state.path))
+
+    try:
+        while True:
+            stamp = accent(datetime.now().strftime('%H:%M:%S'))
+            try:
+                queued = scan_cemented(node, state, concurrency, rate)
+                ready, missing = fetch_proofs(node, state.queue, concurrency)
+                click.echo(
+                    f'{stamp} scanned up to level {state.next_level - 1}: '
+                    + f'{queued} new, {len(ready)} ready, '
+                    + f'{len(missing)} without proof'
+                )
+                for executed, operation_hash in execute_batches(
+                    manager, smart_rollup_address, ready, batch_size
+                ):
+                    for message in executed:
+                        state.queue.remove((message.level, message.index))
+                        key = message_key(message.level, message.index)
+                        if operation_hash is None:
+                            state.failed.append(key)
+                        else:
+                            state.executed[key] = operation_hash
+                    state.save()
+                    if operation_hash is not None:
+                        click.echo(
+                            f'{stamp} executed {len(executed)} outbox messages, '
+                            + 'tx hash: '
+                            + wrap(accent(operation_hash))
+                        )
+            except Exception as exc:
+                # Retried on the next round from the saved progress:
+                click.echo(error(f'{stamp} round failed: {exc}'), err=True)
+                state.save()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.save()
+        node.close()
+    if state.failed:
+        click.echo(error(f'{len(state.failed)} messages failed: {state.failed}'))
+
+
+level_from_option = click.option(
+    '--level-from',
+    type=int,
+    default=None,
+    help='Outbox level to start from on the first run (default: the next '
+    + 'level to be cemented); later runs resume from the state file.',
+)
+state_file_option = click.option(
+    '--state-file',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help='Where the scanned level, queue and executed messages are kept '
+    + '(default: `.outbox-executor-<network>.json` in the current dir).',
+)
+interval_option = click.option(
+    '--interval',
+    default=60,
+    show_default=True,
+    help='Seconds between checks for newly cemented levels.',
+)
+rate_option = click.option(
+    '--rate',
+    default=10.0,
+    show_default=True,
+    help='Max rollup node requests per second while scanning levels.',
+)
+
+
+outbox_executor_command = cli_options.command(
+    outbox_executor,
+    name='outbox_executor',
+    options=[
+        level_from_option,
+        state_file_option,
+        interval_option,
+        concurrency_option,
+        rate_option,
+        batch_size_option,
+        cli_options.smart_rollup_address,
+        cli_options.tezos_private_key,
+        cli_options.tezos_rpc_url,
+        cli_options.etherlink_rollup_node_url,
+    ],
+)
@@ -1,5 +1,5 @@
 import click
-from scripts.helpers.utility import get_tezos_client
+from scripts.helpers.utility import get_tezos_client, load_contract_from_address
 from scripts.helpers.formatting import (
     accent,
     echo_variable,
@@ -22,7 +22,7 @@ def xtz_deposit(
     receiver_bytes = bytes.fromhex(receiver_address.replace('0x', ''))
     # TODO: consider reusing XtzTicketer contract helper
     manager = get_tezos_client(tezos_rpc_url, tezos_private_key)
-    helper = manager.contract(xtz_ticket_helper)
+    helper = load_contract_from_address(manager, xtz_ticket_helper)
 
     click.echo(
         'Making XTZ deposit using Helper ' + wrap(accent(xtz_ticket_helper)) + ':'
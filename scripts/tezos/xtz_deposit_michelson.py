@@ -2,7 +2,7 @@ import click
 import rlp
 from pytezos.michelson.forge import forge_address
 
-from scripts.helpers.utility import get_tezos_client
+from scripts.helpers.utility import get_tezos_client, load_contract_from_address
 from scripts.helpers.formatting import (
     accent,
     echo_variable,
@@ -37,7 +37,7 @@ def xtz_deposit_michelson(
 
     routing_data = michelson_routing_data(receiver_address)
     manager = get_tezos_client(tezos_rpc_url, tezos_private_key)
-    helper = manager.contract(xtz_ticket_helper)
+    helper = load_contract_from_address(manager, xtz_ticket_helper)
 
     click.echo(
         'Making XTZ deposit to Michelson L2 using Helper '
@@ -1,5 +1,11 @@
+import atexit
+import os
+from docker.errors import DockerException  # type: ignore[import-untyped]
+from testcontainers.core.docker_client import DockerClient
 from pytezos.client import PyTezosClient
 from pytezos.operation.group import OperationGroup
+from pytezos.sandbox import node as sandbox
+from pytezos.sandbox.node import SandboxedNodeContainer
 from pytezos.sandbox.node import SandboxedNodeTestCase
 from pytezos.contract.result import ContractCallResult
 from pytezos.operation.result import OperationResult
@@ -17,9 +23,65 @@ from typing import Optional
 from scripts.helpers.addressable import Addressable
 
 
+# pytezos stops every sandboxed node container at exit, which under pytest-xdist
+# would kill the nodes of the workers still running; each worker stops its own.
+atexit.unregister(sandbox.kill_existing_containers)
+
+
+def worker_index() -> int:
+    """Index of the pytest-xdist worker (`gw3` -> 3), 0 in a serial run"""
+
+    return int(os.environ.get('PYTEST_XDIST_WORKER', 'gw0').removeprefix('gw'))
+
+
+def stop_stale_node(port: int) -> None:
+    """Stops a sandboxed node left on `port` by an interrupted run"""
+
+    try:
+        docker = DockerClient()
+    except DockerException:
+        return
+    containers = docker.client.containers.list(
+        filters={
+            'status': 'running',
+            'ancestor': sandbox.DOCKER_IMAGE,
+            'publish': str(port),
+        }
+    )
+    for container in containers:
+        container.stop(timeout=1)
+
+
 class BaseTestCase(SandboxedNodeTestCase):
     accounts: list = []
 
+    # One sandboxed node per worker, on its own port, shared by all the test
+    # classes the worker runs (`pytest -n auto --dist loadscope`):
+    PORT = int(os.environ.get('SANDBOX_BASE_PORT', sandbox.TEZOS_NODE_PORT))
+    PORT += worker_index()
+    worker_node: Optional[SandboxedNodeContainer] = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Starts the worker's sandboxed node on first use, reuses it after"""
+
+        if BaseTestCase.worker_node is None:
+            stop_stale_node(cls.PORT)
+            node = SandboxedNodeContainer(  # type: ignore[no-untyped-call]
+                image=cls.IMAGE, port=cls.PORT
+            )
+            node.start()  # type: ignore[no-untyped-call]
+            atexit.register(node.stop, force=True, delete_volume=True)
+            if not node.wait_for_connection():
+                raise RuntimeError(f'Failed to connect to {node.url}')
+            node.activate(cls.PROTOCOL)  # type: ignore[no-untyped-call]
+            BaseTestCase.worker_node = node
+        cls.node_container = BaseTestCase.worker_node
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Keeps the node running for the next test class of the worker"""
+
     def bootstrap_account(self, n: Optional[int] = None) -> PyTezosClient:
         """Creates bootstrap account with given number"""
 
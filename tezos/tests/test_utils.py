@@ -1,8 +1,44 @@
+import tempfile
 import unittest
+from pathlib import Path
+from typing import Any
 from scripts.helpers.contracts.tokens.fa12 import CtezToken
 from scripts.helpers.contracts.tokens.fa2 import FxhashToken
+from scripts.helpers.snapshot import at_block, get_block_hash, read_storage
+from scripts.helpers.ticket import get_ticket_balances
+from scripts.helpers.contracts.fast_withdrawal import (
+    FastWithdrawal,
+    PaidOut,
+    Withdrawal,
+)
+from scripts.helpers.batching import inject_in_groups
+from scripts.tezos.fa_deposit_bulk import PlannedOperation
+from scripts.helpers.contract_scripts import (
+    contract_scripts,
+    get_chain_id,
+    load_contract,
+    load_contract_class,
+)
+from scripts.helpers.forging import forge_address, forge_addresses, unforge_address
 from scripts.helpers.ticket_content import TicketContent
-from unittest.mock import Mock
+from scripts.helpers.ticket_identity import (
+    TicketIdentityCache,
+    get_ticket_identity,
+    make_key,
+)
+from scripts.helpers.utility import (
+    get_addresses_from_op,
+    get_build_dir,
+    pack,
+    to_micheline,
+)
+from pytezos.contract.interface import ContractInterface
+from pytezos.michelson.forge import forge_script_expr
+from pytezos.michelson.parse import michelson_to_micheline
+from pytezos.rpc.node import RpcError
+
+from unittest.mock import Mock, patch
+from web3 import Web3
 
 
 class TestTicketContentGeneration(unittest.TestCase):
@@ -83,3 +119,259 @@ class TestTicketContentGeneration(unittest.TestCase):
             + '320704010000000a746f6b656e5f747970650a00000003464132'
         )
         assert token_info_bytes.hex() == expected_token_info_hex
+
+
+class TestTicketIdentity(unittest.TestCase):
+    ticketer = 'KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjdeW'
+
+    def test_identity_matches_direct_computation(self) -> None:
+        content = TicketContent(7, b'\x05\x01')
+        identity = get_ticket_identity(self.ticketer, content, TicketIdentityCache())
+
+        address_bytes = pack(self.ticketer, 'address')[-22:].hex()
+        data = Web3.solidity_keccak(
+            ['bytes22', 'bytes'],
+            ['0x' + address_bytes, '0x' + content.to_bytes_hex()],
+        )
+        assert identity.address_bytes == address_bytes
+        assert identity.content_bytes == content.to_bytes_hex()
+        assert identity.hash == int.from_bytes(data, 'big')
+
+    def test_cache_persists_across_instances(self) -> None:
+        cache = TicketIdentityCache()
+        identity = cache.get(self.ticketer, TicketContent(0, None))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'cache' / 'identities.json'
+            cache.save(path)
+            restored = TicketIdentityCache()
+            restored.load(path)
+            # Nothing new memoized, so the file is not rewritten:
+            path.unlink()
+            restored.save(path)
+            self.assertFalse(path.exists())
+
+        key = make_key(self.ticketer, TicketContent(0, None))
+        self.assertEqual(restored.identities, {key: identity})
+
+
+class TestAddressForging(unittest.TestCase):
+    addresses = [
+        'tz1burnburnburnburnburnburnburjAYjjX',
+        'tz2G3JtFrHVmPCMtmmwxbBfkVbMWujD1Mpbb',
+        'tz3eWDqCk2z6uP4DJWu2BEe96dVzmBRCS9ZW',
+        'tz4Rv8FtvnSd9MrM3PG11TrVd8f5Q1c6kcnW',
+        'KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjdeW',
+        'sr1BfSLq5yWzKwgyxbktdvRkVPU8A6DSZZqH',
+    ]
+
+    def test_forge_address_matches_pack(self) -> None:
+        for address in self.addresses:
+            forged = forge_address(address)
+            assert forged == pack(address, 'address')[-22:], address
+            assert unforge_address(forged) == address
+
+    def test_forge_addresses_batch(self) -> None:
+        batch = self.addresses + self.addresses[:2]
+        assert forge_addresses(batch) == [forge_address(a) for a in batch]
+
+    def test_forge_address_rejects_invalid_input(self) -> None:
+        with self.assertRaises(ValueError):
+            forge_address('KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjdeX')
+        with self.assertRaises(ValueError):
+            forge_address('KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjde0')
+        with self.assertRaises(ValueError):
+            # A valid base58check string that is not an address (block hash)
+            forge_address('BLockGenesisGenesisGenesisGenesisGenesisf79b5d1CoW2')
+
+
+class TestTicketBalances(unittest.TestCase):
+    ticketer = 'KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjdeW'
+    contract = 'KT1Hd9byYZkWQAFT6T3HPxoQZq8jnbgBnQYd'
+    account = 'tz1TZDn2NZjgjHWmPNs8ZTPMjnbe5dyS3Bwh'
+
+    def test_balances_matrix_is_read_at_one_block(self) -> None:
+        client = Mock()
+        client.shell.node.uri = ['http://node']
+        client.shell.head.hash.return_value = 'BLhead'
+        tickets = [(self.ticketer, TicketContent(0, None))]
+        tickets.append((self.ticketer, TicketContent(1, None)))
+        urls = []
+
+        def request(method: str, url: str, **kwargs: object) -> Mock:
+            urls.append(url)
+            response = Mock()
+            if url.endswith('all_ticket_balances'):
+                ticket = {
+                    'ticketer': self.ticketer,
+                    'content_type': to_micheline(TicketContent.michelson_type),
+                    'content': tickets[1][1].to_micheline(),
+                    'amount': '7',
+                }
+                response.json.return_value = [ticket]
+            else:
+                response.json.return_value = '3'
+            return response
+
+        with patch('requests.Session.request', side_effect=request):
+            balances = get_ticket_balances(
+                client, [self.contract, self.account, self.contract], tickets
+            )
+        assert balances == [[0, 7], [3, 3], [0, 7]]
+        assert len(urls) == 3
+        assert all('/blocks/BLhead/' in url for url in urls)
+
+
+class TestBlockSnapshot(unittest.TestCase):
+    def test_reads_are_pinned_and_cached(self) -> None:
+        client = Mock()
+        client.shell.head.hash.side_effect = ['BLfirst', 'BLsecond']
+        contract = Mock(address='KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjdeW')
+        fetch = Mock(return_value='value')
+
+        with at_block(client) as snapshot:
+            with at_block(client):
+                assert get_block_hash(client) == 'BLfirst'
+            with patch.object(snapshot, 'read_storage') as pinned_read:
+                read_storage(contract)
+                pinned_read.assert_called_once_with(contract)
+            for _ in range(3):
+                key = (contract.address, 0, 'exprKey')
+                assert snapshot.get_big_map_value(key, fetch) == 'value'
+        fetch.assert_called_once()
+        assert get_block_hash(client) == 'BLsecond'
+        assert read_storage(contract) is contract.storage
+
+
+class TestContractScriptCache(unittest.TestCase):
+    address = 'KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjdeW'
+    rpc_url = 'http://cached-node'
+    chain_id = 'NetXnHfVqm9iesp'
+
+    def test_contract_is_built_from_disk_cache(self) -> None:
+        source = Path(get_build_dir(), 'ticketer.tz').read_text()
+        code = michelson_to_micheline(source)  # type: ignore[no-untyped-call]
+        with tempfile.TemporaryDirectory() as directory:
+            previous_path, contract_scripts.path = contract_scripts.path, Path(
+                directory
+            )
+            try:
+                contract_scripts.save(self.chain_id, self.address, code)
+                client = Mock()
+                client.shell.node.uri = [self.rpc_url]
+                client.context.ipfs_gateway = None
+                client.context.mode = 'readable'
+                with patch('scripts.helpers.contract_scripts.ShellQuery') as shell:
+                    shell.return_value.chains.main.chain_id.return_value = self.chain_id
+                    contract = load_contract(client, self.address)
+                    again = load_contract(client, self.address)
+            finally:
+                contract_scripts.path = previous_path
+                load_contract_class.cache_clear()
+                get_chain_id.cache_clear()
+
+        assert contract.address == self.address
+        assert hasattr(contract, 'deposit')
+        assert type(contract) is type(again)
+        shell.return_value.chains.main.chain_id.assert_called_once_with()
+        shell.return_value.contracts.__getitem__.assert_not_called()
+
+
+class TestOriginatedAddresses(unittest.TestCase):
+    def test_addresses_of_bulk_origination_keep_contents_order(self) -> None:
+        def content(*addresses: str) -> dict:
+            result: dict[str, Any] = {'status': 'applied'}
+            if addresses:
+                result['originated_contracts'] = list(addresses)
+            return {'metadata': {'operation_result': result}}
+
+        op = {
+            'contents': [
+                content('KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjdeW'),
+                content(),
+                content('KT1Hd9byYZkWQAFT6T3HPxoQZq8jnbgBnQYd'),
+            ]
+        }
+        assert get_addresses_from_op(op) == [
+            'KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjdeW',
+            'KT1Hd9byYZkWQAFT6T3HPxoQZq8jnbgBnQYd',
+        ]
+
+
+class TestDepositGroups(unittest.TestCase):
+    def test_groups_are_halved_until_simulation_passes(self) -> None:
+        operations = [PlannedOperation(Mock(name=f'op{i}')) for i in range(7)]
+        manager = Mock()
+
+        def bulk(*calls: Any) -> Mock:
+            opg = Mock()
+            # Groups over 2 contents and any group with the 6th content fail:
+            if len(calls) > 2 or operations[5].call in calls:
+                opg.autofill.side_effect = RpcError('gas_exhausted')
+            opg.autofill.return_value.sign.return_value.hash.return_value = 'oo'
+            return opg
+
+        manager.bulk.side_effect = bulk
+        groups = list(inject_in_groups(manager, operations, lambda op: op.call, 4))
+
+        sizes = [(len(group), opg_hash) for group, opg_hash in groups]
+        assert sizes == [(2, 'oo'), (2, 'oo'), (1, 'oo'), (1, None), (1, 'oo')]
+        assert [op for group, _ in groups for op in group] == operations
+
+
+class TestFastWithdrawalStatuses(unittest.TestCase):
+    provider = 'tz1burnburnburnburnburnburnburjAYjjX'
+
+    def make_withdrawal(self, withdrawal_id: int) -> Withdrawal:
+        return Withdrawal(
+            withdrawal_id=withdrawal_id,
+            full_amount=1000,
+            ticketer='KT1LpdETWYvPWCQTR2FEW6jE6dVqJqxYjdeW',
+            content=TicketContent(0, None),
+            timestamp=1000,
+            base_withdrawer=self.provider,
+            payload=pack(900, 'nat'),
+            l2_caller=b'\x00' * 20,
+        )
+
+    def test_statuses_are_read_from_big_map_by_local_key_hash(self) -> None:
+        build_file = Path(get_build_dir()) / 'fast-withdrawal.tz'
+        contract = ContractInterface.from_file(str(build_file))
+        big_map_type = contract.program.storage.args[0].args[0]
+        client = Mock()
+        client.shell.node.uri = ['http://node']
+        client.shell.head.hash.return_value = 'BLhead'
+        helper = FastWithdrawal(contract=contract, client=client, address='KT1')
+        withdrawals = [self.make_withdrawal(n) for n in (1, 2, 1)]
+        key_type = big_map_type.args[0]
+        paid_key = forge_script_expr(
+            key_type.from_python_object(withdrawals[0].as_tuple()).pack(legacy=True)
+        )
+        urls = []
+
+        def request(method: str, url: str, **kwargs: object) -> Mock:
+            urls.append(url)
+            response = Mock()
+            response.status_code = 200 if url.endswith(paid_key) else 404
+            response.json.return_value = {
+                'prim': 'Left',
+                'args': [{'string': self.provider}],
+            }
+            return response
+
+        big_map = big_map_type.from_python_object(17)
+        with (
+            patch.object(helper, 'get_withdrawals_big_map', return_value=big_map),
+            patch('requests.Session.request', side_effect=request),
+        ):
+            statuses = helper.get_statuses(withdrawals)
+
+        assert [s.value for s in statuses] == [
+            PaidOut(self.provider),
+            None,
+            PaidOut(self.provider),
+        ]
+        assert len(urls) == 2
+        assert all(
+            url.startswith('http://node/chains/main/blocks/BLhead/') for url in urls
+        )
+        assert all('/context/big_maps/17/expr' in url for url in urls)